@@ -1,6 +1,8 @@
 from django.db import models
+from django.db.models.signals import post_save, post_delete
 from django.contrib.auth.models import User
-from recipes.models import Recipe
+from recipes.models import Recipe, adjust_recipe_counter
+from tt_drf_api.cache import invalidate_on_change
 
 
 class Comment(models.Model):
@@ -15,6 +17,28 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination, overall and per recipe
+            models.Index(
+                fields=['-created_at', '-id'], name='comment_created_idx'),
+            models.Index(
+                fields=['recipe', '-created_at', '-id'],
+                name='comment_recipe_created_idx'),
+        ]
 
     def __str__(self):
         return self.content
+
+
+def increment_comments_count(sender, instance, created, **kwargs):
+    if created:
+        adjust_recipe_counter(instance.recipe_id, 'comments_count', 1)
+
+
+def decrement_comments_count(sender, instance, **kwargs):
+    adjust_recipe_counter(instance.recipe_id, 'comments_count', -1)
+
+
+post_save.connect(increment_comments_count, sender=Comment)
+post_delete.connect(decrement_comments_count, sender=Comment)
+invalidate_on_change(Comment, 'recipes')
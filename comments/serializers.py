@@ -1,24 +1,27 @@
 from django.contrib.humanize.templatetags.humanize import naturaltime
 from rest_framework import serializers
+from tt_drf_api.images import ImageURLField
+from tt_drf_api.viewer import ViewerListSerializer, ViewerSerializerMixin
 from .models import Comment
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(ViewerSerializerMixin, serializers.ModelSerializer):
     """
         Serializer for Comment model.
     """
     owner = serializers.ReadOnlyField(source='owner.username')
     is_owner = serializers.SerializerMethodField()
     profile_id = serializers.ReadOnlyField(source='owner.profile.id')
-    profile_image = serializers.ReadOnlyField(
-        source='owner.profile.image.url'
-        )
+    profile_image = ImageURLField(source='owner.profile.image')
     created_at = serializers.SerializerMethodField()
     updated_at = serializers.SerializerMethodField()
 
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        return queryset.select_related('owner__profile')
+
     def get_is_owner(self, obj):
-        request = self.context['request']
-        return request.user == obj.owner
+        return self.viewer.is_owner(obj.owner_id)
     
     def get_created_at(self, obj):
         return naturaltime(obj.created_at)
@@ -32,7 +35,8 @@ class CommentSerializer(serializers.ModelSerializer):
             'id', 'owner', 'is_owner', 'profile_id', 'profile_image',
             'recipe', 'created_at', 'updated_at', 'content'
         ]
+        list_serializer_class = ViewerListSerializer
 
 
 class CommentDetailSerializer(CommentSerializer):
-    recipe = serializers.ReadOnlyField(source='recipe.id')
+    recipe = serializers.ReadOnlyField(source='recipe_id')
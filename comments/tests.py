@@ -1,7 +1,10 @@
+from asgiref.sync import async_to_sync
 from django.contrib.auth.models import User
+from django.test import AsyncRequestFactory
 from rest_framework import status
 from rest_framework.test import APITestCase
 from .models import Comment, Recipe
+from .views import CommentList
 
 
 class CommentTests(APITestCase):
@@ -106,3 +109,112 @@ class CommentTests(APITestCase):
         response = self.client.delete(f"/comments/{self.comment.id}/")
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
         self.assertEqual(Comment.objects.count(), 1)
+
+
+class CommentQueryBudgetTests(APITestCase):
+    """
+    Pin the number of queries used by the comment endpoints.
+    """
+
+    def setUp(self):
+        users = [
+            User.objects.create_user(username=f'user{i}', password='pass')
+            for i in range(3)
+        ]
+        recipe = Recipe.objects.create(
+            owner=users[0], recipe_name="Test Recipe")
+        for user in users:
+            self.comment = Comment.objects.create(
+                owner=user, recipe=recipe, content="A comment")
+
+    def test_comment_list_query_count(self):
+        """
+        Count and page, with owner and profile joined.
+        """
+        with self.assertNumQueries(2):
+            response = self.client.get("/comments/")
+        self.assertEqual(len(response.data['results']), 3)
+
+    def test_comment_detail_query_count(self):
+        """
+        The ETag validator row, then a single joined row.
+        """
+        with self.assertNumQueries(2):
+            self.client.get(f"/comments/{self.comment.id}/")
+
+
+class CommentCursorPaginationTests(APITestCase):
+    """
+    Test cases for keyset paging of the comment list.
+    """
+
+    def test_cursor_pages_through_recipe_comments(self):
+        """
+        Test that a recipe's comments can be read page by page.
+        """
+        user = User.objects.create_user(username="kalle", password="kula")
+        recipe = Recipe.objects.create(owner=user, recipe_name="Recipe")
+        for i in range(12):
+            Comment.objects.create(
+                owner=user, recipe=recipe, content=f"Comment {i}")
+
+        first = self.client.get(f"/comments/?recipe={recipe.id}&cursor=")
+        self.assertEqual(len(first.data['results']), 10)
+        second = self.client.get(first.data['next'])
+        self.assertEqual(
+            [c['content'] for c in second.data['results']],
+            ["Comment 1", "Comment 0"])
+        self.assertIsNone(second.data['next'])
+
+
+class CommentConditionalGetTests(APITestCase):
+    """
+    Test cases for ETag on the comment detail endpoint.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass')
+        recipe = Recipe.objects.create(
+            owner=self.user, recipe_name="Test Recipe")
+        self.comment = Comment.objects.create(
+            owner=self.user, recipe=recipe, content="A comment")
+        self.url = f'/comments/{self.comment.id}/'
+
+    def test_edit_changes_the_etag(self):
+        """
+        Test that the comment is not modified until it is edited.
+        """
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.comment.content = 'Edited'
+        self.comment.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class CommentAsyncReadTests(APITestCase):
+    """
+    Test cases for the async read path of the comment views.
+    """
+
+    def test_filtered_list_matches_sync_path(self):
+        """
+        Test that the async list applies the recipe filter like the sync
+        list.
+        """
+        user = User.objects.create_user(username='user', password='pass')
+        pie, soup = (
+            Recipe.objects.create(
+                owner=user, recipe_name=name, status='published')
+            for name in ('Pie', 'Soup')
+        )
+        Comment.objects.create(owner=user, recipe=pie, content='Yum')
+        Comment.objects.create(owner=user, recipe=soup, content='Hot')
+        path = f'/comments/?recipe={pie.id}'
+        expected = self.client.get(path).data
+
+        view = CommentList.as_view(async_reads=True)
+        response = async_to_sync(view)(AsyncRequestFactory().get(path))
+        self.assertEqual(response.data, expected)
+        self.assertEqual(len(response.data['results']), 1)
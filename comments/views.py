@@ -1,21 +1,29 @@
 from rest_framework import generics, permissions
 from django_filters.rest_framework import DjangoFilterBackend
+from tt_drf_api.async_views import AsyncReadMixin
+from tt_drf_api.conditional import ConditionalRetrieveMixin
+from tt_drf_api.pagination import KeysetPagination
 from tt_drf_api.permissions import IsOwnerOrReadOnly
 from .models import Comment
 from .serializers import CommentSerializer, CommentDetailSerializer
 
 
-class CommentList(generics.ListCreateAPIView):
+class CommentList(AsyncReadMixin, generics.ListCreateAPIView):
     """
     API view to retrieve a list of comments or create a new comment.
 
     - Allows authenticated users to create comments.
     - Anyone can view the list of comments.
     - Filters comments by associated recipe using query parameters.
+    - Supports keyset paging with `?cursor=`.
+    - Serves reads asynchronously when ASYNC_READ_VIEWS is set.
     """
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
-    queryset = Comment.objects.all()
+    pagination_class = KeysetPagination
+    queryset = CommentSerializer.setup_eager_loading(
+        Comment.objects.all()
+    )
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['recipe']
 
@@ -23,14 +31,21 @@ class CommentList(generics.ListCreateAPIView):
         serializer.save(owner=self.request.user)
 
 
-class CommentDetail(generics.RetrieveUpdateDestroyAPIView):
+class CommentDetail(
+        ConditionalRetrieveMixin, AsyncReadMixin,
+        generics.RetrieveUpdateDestroyAPIView):
     """
     API view to retrieve, update, or delete a specific comment.
 
     - Allows the owner of the comment to update or delete it.
     - Anyone can view the comment.
     - Ensures object-level permissions using the IsOwnerOrReadOnly permission.
+    - Answers conditional GET requests with 304 when the comment and its
+      owner's profile are unchanged.
     """
     permission_classes = [IsOwnerOrReadOnly]
+    validator_fields = ('updated_at', 'owner__profile__updated_at')
     serializer_class = CommentDetailSerializer
-    queryset = Comment.objects.all()
+    queryset = CommentDetailSerializer.setup_eager_loading(
+        Comment.objects.all()
+    )
@@ -0,0 +1,160 @@
+from collections import defaultdict
+from django.conf import settings
+from django.db.models.signals import post_save, post_delete
+from followers.models import Follower
+from profiles.models import Profile
+from recipes.models import Recipe
+from recipes.signals import recipes_status_changed
+from .models import FeedEntry
+
+"""
+Fan-out on write for the home feed.
+
+When a recipe becomes published its id is written into the timeline of
+every follower of its author; when it stops being published it is removed
+again. Authors with more than FEED_FANOUT_MAX_FOLLOWERS followers are not
+fanned out; their recipes are merged into the feed at read time instead,
+see `merged_author_ids`.
+
+Batch status changes are handled once per batch, reading each author's
+followers once.
+
+Following someone backfills their latest published recipes into the
+follower's timeline, and unfollowing trims them out again.
+"""
+
+BATCH_SIZE = 1000
+
+
+def follower_count(user_id):
+    return Profile.objects.filter(owner_id=user_id).values_list(
+        'followers_count', flat=True
+    ).first() or 0
+
+
+def is_fanout_author(user_id):
+    """
+    True if the author's recipes are written into follower timelines.
+    """
+    return follower_count(user_id) <= settings.FEED_FANOUT_MAX_FOLLOWERS
+
+
+def merged_author_ids(user_id):
+    """
+    Ids of the authors 'user_id' follows whose recipes are not fanned out
+    and have to be merged into the feed at read time.
+    """
+    return list(
+        Follower.objects.filter(
+            owner_id=user_id,
+            followed__profile__followers_count__gt=(
+                settings.FEED_FANOUT_MAX_FOLLOWERS
+            ),
+        ).values_list('followed', flat=True)
+    )
+
+
+def fan_out_recipe(recipe):
+    """
+    Write a published recipe into the timelines of its author's followers.
+    """
+    fan_out_recipes([recipe])
+
+
+def fan_out_recipes(recipes):
+    """
+    Write published recipes into the timelines of their authors'
+    followers, reading each author's followers once.
+    """
+    by_owner = defaultdict(list)
+    for recipe in recipes:
+        by_owner[recipe.owner_id].append(recipe)
+    for owner_id, owned in by_owner.items():
+        if not is_fanout_author(owner_id):
+            continue
+        follower_ids = Follower.objects.filter(
+            followed_id=owner_id
+        ).values_list('owner_id', flat=True)
+        batch = []
+        for follower_id in follower_ids.iterator(chunk_size=BATCH_SIZE):
+            batch.extend(
+                FeedEntry(
+                    follower_id=follower_id, recipe_id=recipe.pk,
+                    created_at=recipe.created_at,
+                )
+                for recipe in owned
+            )
+            if len(batch) >= BATCH_SIZE:
+                FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+                batch = []
+        if batch:
+            FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def retract_recipe(recipe_id):
+    retract_recipes([recipe_id])
+
+
+def retract_recipes(recipe_ids):
+    FeedEntry.objects.filter(recipe_id__in=recipe_ids).delete()
+
+
+def backfill_follow(follower_id, author_id):
+    """
+    Add the author's latest published recipes to a new follower's feed.
+    """
+    if not is_fanout_author(author_id):
+        return
+    recipes = Recipe.objects.filter(
+        owner_id=author_id, status='published'
+    ).order_by('-created_at').values_list('id', 'created_at')
+    FeedEntry.objects.bulk_create([
+        FeedEntry(
+            follower_id=follower_id, recipe_id=recipe_id,
+            created_at=created_at,
+        )
+        for recipe_id, created_at in recipes[:settings.FEED_BACKFILL_LIMIT]
+    ], ignore_conflicts=True)
+
+
+def trim_follow(follower_id, author_id):
+    FeedEntry.objects.filter(
+        follower_id=follower_id, recipe__owner_id=author_id
+    ).delete()
+
+
+def recipe_saved(sender, instance, created, **kwargs):
+    was_published = instance.previous_status == 'published'
+    is_published = instance.status == 'published'
+    if is_published and not was_published:
+        fan_out_recipe(instance)
+    elif was_published and not is_published:
+        retract_recipe(instance.pk)
+
+
+def batch_status_changed(sender, recipes, **kwargs):
+    fan_out_recipes([
+        recipe for recipe in recipes
+        if recipe.status == 'published'
+        and recipe.previous_status != 'published'
+    ])
+    retract_recipes([
+        recipe.pk for recipe in recipes
+        if recipe.previous_status == 'published'
+        and recipe.status != 'published'
+    ])
+
+
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        backfill_follow(instance.owner_id, instance.followed_id)
+
+
+def follow_deleted(sender, instance, **kwargs):
+    trim_follow(instance.owner_id, instance.followed_id)
+
+
+post_save.connect(recipe_saved, sender=Recipe)
+recipes_status_changed.connect(batch_status_changed, sender=Recipe)
+post_save.connect(follow_created, sender=Follower)
+post_delete.connect(follow_deleted, sender=Follower)
@@ -0,0 +1,43 @@
+from django.db import migrations
+
+# Mirrors FEED_FANOUT_MAX_FOLLOWERS and FEED_BACKFILL_LIMIT at the time
+# this migration was written.
+FANOUT_MAX_FOLLOWERS = 10000
+BACKFILL_LIMIT = 50
+
+
+def backfill_feeds(apps, schema_editor):
+    Follower = apps.get_model('followers', 'Follower')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    FeedEntry = apps.get_model('feeds', 'FeedEntry')
+
+    for author_id in Follower.objects.values_list(
+            'followed_id', flat=True).distinct():
+        follower_ids = list(Follower.objects.filter(
+            followed_id=author_id).values_list('owner_id', flat=True))
+        if len(follower_ids) > FANOUT_MAX_FOLLOWERS:
+            continue
+        recipes = list(Recipe.objects.filter(
+            owner_id=author_id, status='published'
+        ).order_by('-created_at').values_list(
+            'id', 'created_at')[:BACKFILL_LIMIT])
+        FeedEntry.objects.bulk_create([
+            FeedEntry(
+                follower_id=follower_id, recipe_id=recipe_id,
+                created_at=created_at,
+            )
+            for follower_id in follower_ids
+            for recipe_id, created_at in recipes
+        ], batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feeds', '0001_initial'),
+        ('followers', '0002_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_feeds, migrations.RunPython.noop),
+    ]
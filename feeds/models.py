@@ -0,0 +1,33 @@
+from django.db import models
+from django.contrib.auth.models import User
+from recipes.models import Recipe
+
+
+class FeedEntry(models.Model):
+    """
+    One published recipe in a follower's home feed timeline.
+
+    Rows are written when a recipe is published (fan-out on write), so
+    reading a feed is a range scan over ('follower', 'created_at').
+    'created_at' is a copy of the recipe's created_at, so the feed sorts
+    the same way as the recipe list.
+    """
+    follower = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='feed_entries'
+    )
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE, related_name='feed_entries'
+    )
+    created_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-created_at', '-recipe']
+        unique_together = ['follower', 'recipe']
+        indexes = [
+            models.Index(
+                fields=['follower', '-created_at', '-recipe'],
+                name='feed_timeline_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.follower} {self.recipe}'
@@ -0,0 +1,112 @@
+from django.contrib.auth.models import User
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+from followers.models import Follower
+from recipes.models import Recipe
+from .models import FeedEntry
+
+
+class FeedTests(APITestCase):
+    """
+    Test cases for the fanned-out home feed.
+    """
+
+    def setUp(self):
+        """
+        Create a reader who follows an author.
+        """
+        self.reader = User.objects.create_user(
+            username='reader', password='pass')
+        self.author = User.objects.create_user(
+            username='author', password='pass')
+        self.stranger = User.objects.create_user(
+            username='stranger', password='pass')
+        Follower.objects.create(owner=self.reader, followed=self.author)
+        self.client.login(username='reader', password='pass')
+
+    def feed(self, url='/feed/'):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def names(self, response):
+        return [r['recipe_name'] for r in response.data['results']]
+
+    def test_feed_requires_login(self):
+        """
+        Test that anonymous users cannot read a feed.
+        """
+        self.client.logout()
+        response = self.client.get('/feed/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_publishing_fans_out_to_followers(self):
+        """
+        Test that a recipe reaches the feed when it is published, and
+        that recipes of people the reader doesn't follow do not.
+        """
+        recipe = Recipe.objects.create(
+            owner=self.author, recipe_name='Draft')
+        Recipe.objects.create(
+            owner=self.stranger, recipe_name='Other', status='published')
+        self.assertEqual(self.names(self.feed()), [])
+
+        recipe.status = 'published'
+        recipe.save()
+        self.assertEqual(self.names(self.feed()), ['Draft'])
+
+    def test_unpublishing_retracts_from_feed(self):
+        """
+        Test that a recipe leaves the feed when it is unpublished.
+        """
+        recipe = Recipe.objects.create(
+            owner=self.author, recipe_name='Soup', status='published')
+        recipe.status = 'pending_delete'
+        recipe.save()
+        self.assertFalse(FeedEntry.objects.exists())
+
+    def test_follow_backfills_and_unfollow_trims(self):
+        """
+        Test that following copies the author's recipes into the feed and
+        unfollowing removes them.
+        """
+        Recipe.objects.create(
+            owner=self.stranger, recipe_name='Stew', status='published')
+        follow = Follower.objects.create(
+            owner=self.reader, followed=self.stranger)
+        self.assertEqual(self.names(self.feed()), ['Stew'])
+
+        follow.delete()
+        self.assertEqual(self.names(self.feed()), [])
+
+    @override_settings(FEED_FANOUT_MAX_FOLLOWERS=1)
+    def test_large_authors_are_merged_at_read_time(self):
+        """
+        Test that authors above the fan-out limit are not written to
+        timelines but still show up in the feed, in date order.
+        """
+        Follower.objects.create(owner=self.stranger, followed=self.author)
+        Recipe.objects.create(
+            owner=self.author, recipe_name='Popular', status='published')
+        self.assertFalse(FeedEntry.objects.exists())
+
+        small = User.objects.create_user(username='small', password='pass')
+        Follower.objects.create(owner=self.reader, followed=small)
+        Recipe.objects.create(
+            owner=small, recipe_name='Niche', status='published')
+        self.assertEqual(self.names(self.feed()), ['Niche', 'Popular'])
+
+    def test_feed_pages_with_cursor(self):
+        """
+        Test that 'next' links walk the whole feed once.
+        """
+        for i in range(12):
+            Recipe.objects.create(
+                owner=self.author, recipe_name=f'Recipe {i}',
+                status='published')
+        first = self.feed()
+        self.assertEqual(len(first.data['results']), 10)
+        second = self.feed(first.data['next'])
+        self.assertEqual(self.names(second), ['Recipe 1', 'Recipe 0'])
+        self.assertIsNone(second.data['next'])
@@ -0,0 +1,7 @@
+from django.urls import path
+from feeds import views
+
+
+urlpatterns = [
+    path('feed/', views.FeedList.as_view()),
+]
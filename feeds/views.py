@@ -0,0 +1,105 @@
+import heapq
+from rest_framework import generics, permissions
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+from recipes.models import Recipe
+from recipes.serializers import RecipeSerializer
+from tt_drf_api.pagination import (
+    decode_position, encode_cursor, keyset_filter
+)
+from .fanout import merged_author_ids
+from .models import FeedEntry
+
+"""
+Views for the Feeds app.
+
+Classes:
+    - FeedList: The logged-in user's home feed of recipes from the people
+      they follow, newest first, paged with a cursor.
+"""
+
+ORDERING = '-created_at'
+
+
+class FeedList(generics.ListAPIView):
+    """
+    API view to retrieve the logged-in user's home feed.
+
+    The page is read from the user's timeline with one indexed range scan,
+    merged with the latest recipes of followed authors that are too large
+    to fan out. Only the recipes on the final page are loaded.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = RecipeSerializer
+    page_size = api_settings.PAGE_SIZE
+
+    def list(self, request, *args, **kwargs):
+        position = None
+        token = request.query_params.get('cursor')
+        if token:
+            position = decode_position(
+                token, ORDERING, FeedEntry._meta.get_field('created_at')
+            )
+
+        ids = self.get_page_ids(request.user.id, position)
+        has_next = len(ids) > self.page_size
+        ids = ids[:self.page_size]
+
+        recipes = RecipeSerializer.setup_eager_loading(
+            Recipe.objects.filter(pk__in=[pk for _, pk in ids])
+        ).in_bulk()
+        page = [recipes[pk] for _, pk in ids if pk in recipes]
+        serializer = self.get_serializer(page, many=True)
+
+        next_link = None
+        if has_next:
+            next_link = replace_query_param(
+                request.build_absolute_uri(), 'cursor',
+                encode_cursor(ORDERING, ids[-1]),
+            )
+        return Response({
+            'next': next_link,
+            'previous': None,
+            'results': serializer.data,
+        })
+
+    def get_page_ids(self, user_id, position):
+        """
+        Return up to page_size + 1 (created_at, recipe id) pairs after
+        'position', newest first.
+        """
+        limit = self.page_size + 1
+        timeline = FeedEntry.objects.filter(follower_id=user_id)
+        if position:
+            timeline = timeline.filter(
+                keyset_filter('created_at', True, *position,
+                              pk_field='recipe')
+            )
+        sources = [
+            timeline.order_by('-created_at', '-recipe')
+            .values_list('created_at', 'recipe_id')[:limit]
+        ]
+
+        authors = merged_author_ids(user_id)
+        if authors:
+            merged = Recipe.objects.filter(
+                owner_id__in=authors, status='published'
+            )
+            if position:
+                merged = merged.filter(
+                    keyset_filter('created_at', True, *position)
+                )
+            sources.append(
+                merged.order_by('-created_at', '-id')
+                .values_list('created_at', 'id')[:limit]
+            )
+
+        ids, seen = [], set()
+        for created_at, pk in heapq.merge(*sources, reverse=True):
+            if pk not in seen:
+                seen.add(pk)
+                ids.append((created_at, pk))
+            if len(ids) == limit:
+                break
+        return ids
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class FollowersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'followers'
+
+    def ready(self):
+        # Connects the follow graph signal handlers
+        from . import graph  # noqa: F401
@@ -0,0 +1,280 @@
+import heapq
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from functools import partial
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.signals import post_save, post_delete
+from tt_drf_api.replicated import ReplicatedIndex
+from .models import Follower
+
+"""
+In-process index of the follow graph.
+
+FollowGraph holds, for every user, the sorted ids of the users they
+follow, the ids of those follow rows in the same order, and the sorted
+ids of their followers, each in an array('q'): 24 bytes per follow. It
+answers "does A follow B", "does B follow me back" and "who do the
+people I follow follow" with binary searches instead of queries on the
+follower table.
+
+Each process loads the graph from the database on first use and then
+keeps it current from a log in FOLLOW_GRAPH_CACHE of the users whose
+follows changed, see tt_drf_api.replicated. wsgi.py and asgi.py build it
+when a worker starts if FOLLOW_GRAPH_WARM_UP is set. Without a shared
+cache the graph is not loaded and every lookup queries the follower
+table instead.
+
+Lookups read the graph as it is; call `sync` first, once per request, so
+changes from other processes are seen.
+
+Functions:
+    - suggest_follows: Ranked friends-of-friends for a user, cached for
+      FOLLOW_SUGGESTIONS_TTL seconds.
+
+Objects:
+    - follow_graph: The graph of this process.
+"""
+
+
+def contains(ids, pk):
+    """
+    True if the sorted array 'ids' contains 'pk'.
+    """
+    index = bisect_left(ids, pk)
+    return index < len(ids) and ids[index] == pk
+
+
+class FollowGraph(ReplicatedIndex):
+    """
+    Thread-safe adjacency index of the follow graph. 'following' maps a
+    user id to the sorted ids of the users they follow, 'follow_ids' to
+    the matching Follower ids and 'followers' to the sorted ids of the
+    users following them.
+    """
+    log_name = 'follow-graph'
+    settings_prefix = 'FOLLOW_GRAPH'
+
+    def __init__(self):
+        super().__init__()
+        self.following = {}
+        self.follow_ids = {}
+        self.followers = {}
+
+    def build(self):
+        """
+        Load the whole graph from the database.
+        """
+        if not self.enabled:
+            return
+        # Read the log position first: changes made while loading are
+        # replayed afterwards.
+        sequence = self.current_sequence()
+        following, follow_ids, followers = {}, {}, {}
+        rows = Follower.objects.order_by(
+            'owner_id', 'followed_id'
+        ).values_list('owner_id', 'followed_id', 'id')
+        for owner_id, followed_id, pk in rows.iterator(chunk_size=5000):
+            following.setdefault(owner_id, array('q')).append(followed_id)
+            follow_ids.setdefault(owner_id, array('q')).append(pk)
+            # Owners come in order, so these stay sorted too.
+            followers.setdefault(followed_id, array('q')).append(owner_id)
+        with self.lock:
+            self.following = following
+            self.follow_ids = follow_ids
+            self.followers = followers
+            self.built(sequence)
+
+    def reload(self, user_ids):
+        """
+        Re-read the follows of 'user_ids' from the database.
+        """
+        following = {user_id: array('q') for user_id in user_ids}
+        follow_ids = {user_id: array('q') for user_id in user_ids}
+        rows = Follower.objects.filter(owner_id__in=user_ids).order_by(
+            'owner_id', 'followed_id'
+        ).values_list('owner_id', 'followed_id', 'id')
+        for owner_id, followed_id, pk in rows:
+            following[owner_id].append(followed_id)
+            follow_ids[owner_id].append(pk)
+        with self.lock:
+            for user_id, ids in following.items():
+                old = set(self.following.get(user_id, ()))
+                for followed_id in old.difference(ids):
+                    self._remove_follower(followed_id, user_id)
+                for followed_id in set(ids).difference(old):
+                    self._add_follower(followed_id, user_id)
+                if ids:
+                    self.following[user_id] = ids
+                    self.follow_ids[user_id] = follow_ids[user_id]
+                else:
+                    self.following.pop(user_id, None)
+                    self.follow_ids.pop(user_id, None)
+
+    # The follower arrays are replaced rather than changed in place, since
+    # lookups may hold the current array.
+
+    def _add_follower(self, user_id, follower_id):
+        ids = self.followers.get(user_id, array('q'))
+        index = bisect_left(ids, follower_id)
+        self.followers[user_id] = (
+            ids[:index] + array('q', [follower_id]) + ids[index:]
+        )
+
+    def _remove_follower(self, user_id, follower_id):
+        ids = self.followers.get(user_id, array('q'))
+        index = bisect_left(ids, follower_id)
+        if index < len(ids) and ids[index] == follower_id:
+            ids = ids[:index] + ids[index + 1:]
+            if ids:
+                self.followers[user_id] = ids
+            else:
+                del self.followers[user_id]
+
+    def following_of(self, user_id):
+        """
+        Return the sorted ids of the users 'user_id' follows.
+        """
+        if not self.enabled:
+            return array('q', Follower.objects.filter(
+                owner_id=user_id
+            ).order_by('followed_id').values_list('followed_id', flat=True))
+        with self.lock:
+            return self.following.get(user_id, array('q'))
+
+    def followers_of(self, user_id):
+        """
+        Return the sorted ids of the users following 'user_id'.
+        """
+        if not self.enabled:
+            return array('q', Follower.objects.filter(
+                followed_id=user_id
+            ).order_by('owner_id').values_list('owner_id', flat=True))
+        with self.lock:
+            return self.followers.get(user_id, array('q'))
+
+    def follow_id(self, owner_id, followed_id):
+        """
+        Return the id of the Follower row of 'owner_id' following
+        'followed_id', or None.
+        """
+        if not self.enabled:
+            return Follower.objects.filter(
+                owner_id=owner_id, followed_id=followed_id
+            ).values_list('id', flat=True).first()
+        with self.lock:
+            ids = self.following.get(owner_id, ())
+            index = bisect_left(ids, followed_id)
+            if index < len(ids) and ids[index] == followed_id:
+                return self.follow_ids[owner_id][index]
+        return None
+
+    def follows(self, owner_id, followed_id):
+        if not self.enabled:
+            return self.follow_id(owner_id, followed_id) is not None
+        return contains(self.following_of(owner_id), followed_id)
+
+    def relation(self, viewer_id, user_id):
+        """
+        Return (id of the viewer's follow of 'user_id' or None, whether
+        'user_id' follows the viewer). Both are set for mutual follows.
+        """
+        if viewer_id is None:
+            return None, False
+        return (
+            self.follow_id(viewer_id, user_id),
+            self.follows(user_id, viewer_id),
+        )
+
+    def friends_of_friends(self, user_id, limit):
+        """
+        Return up to 'limit' (user id, count) pairs of users followed by
+        the users 'user_id' follows, most counted first, leaving out
+        'user_id' and the users they already follow.
+
+        At most about FOLLOW_SUGGESTIONS_MAX_EDGES follows are read: when
+        the followed users follow more in total, an evenly spaced sample
+        of each of their lists is counted. Without the graph the counts
+        are one aggregate query over all of them.
+        """
+        if not self.enabled:
+            return self.count_friends_of_friends(user_id, limit)
+        self.sync()
+        following = self.following_of(user_id)
+        if not following:
+            return []
+        per_source = max(
+            1, settings.FOLLOW_SUGGESTIONS_MAX_EDGES // len(following)
+        )
+        counts = Counter()
+        with self.lock:
+            for source in following:
+                ids = self.following.get(source, ())
+                step = -(-len(ids) // per_source) or 1
+                counts.update(ids[::step])
+        candidates = (
+            (pk, n) for pk, n in counts.items()
+            if pk != user_id and not contains(following, pk)
+        )
+        return heapq.nlargest(
+            limit, candidates, key=lambda item: (item[1], -item[0])
+        )
+
+    def count_friends_of_friends(self, user_id, limit):
+        following = Follower.objects.filter(owner_id=user_id).values(
+            'followed_id'
+        )
+        rows = Follower.objects.filter(owner_id__in=following).exclude(
+            followed_id=user_id
+        ).exclude(followed_id__in=following).values('followed_id').annotate(
+            count=Count('id')
+        ).order_by('-count', 'followed_id').values_list(
+            'followed_id', 'count'
+        )
+        return list(rows[:limit])
+
+    def clear(self):
+        with self.lock:
+            super().clear()
+            self.following = {}
+            self.follow_ids = {}
+            self.followers = {}
+
+
+follow_graph = FollowGraph()
+
+
+def suggest_follows(user_id, limit=None):
+    """
+    Return up to 'limit' (user id, count) suggestions for 'user_id',
+    computed at most every FOLLOW_SUGGESTIONS_TTL seconds. Users followed
+    since they were computed are left out.
+    """
+    limit = limit or settings.FOLLOW_SUGGESTIONS_LIMIT
+    key = f'follow-suggestions:{user_id}:{limit}'
+    suggestions = cache.get(key)
+    if suggestions is None:
+        # A few extra to fill in for users followed in the meantime.
+        suggestions = follow_graph.friends_of_friends(user_id, limit * 2)
+        cache.set(key, suggestions, settings.FOLLOW_SUGGESTIONS_TTL)
+    else:
+        follow_graph.sync()
+
+    following = follow_graph.following_of(user_id)
+    return [
+        item for item in suggestions if not contains(following, item[0])
+    ][:limit]
+
+
+def follow_changed(sender, instance, **kwargs):
+    # Right away, so this process sees its own change, and again once the
+    # change is visible to other processes.
+    follow_graph.publish(instance.owner_id)
+    transaction.on_commit(partial(follow_graph.publish, instance.owner_id))
+
+
+post_save.connect(follow_changed, sender=Follower)
+post_delete.connect(follow_changed, sender=Follower)
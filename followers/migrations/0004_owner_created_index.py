@@ -0,0 +1,17 @@
+# Generated by Django 4.2.16 on 2026-10-17 04:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('followers', '0003_followed_created_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='follower',
+            index=models.Index(fields=['owner', '-created_at'], name='follower_owner_created_idx'),
+        ),
+    ]
@@ -1,5 +1,8 @@
 from django.db import models
+from django.db.models.signals import post_save, post_delete
 from django.contrib.auth.models import User
+from profiles.models import adjust_profile_counter
+from tt_drf_api.cache import invalidate_on_change
 
 
 class Follower(models.Model):
@@ -22,6 +25,35 @@ class Follower(models.Model):
     class Meta:
         ordering = ['-created_at']
         unique_together = ['owner', 'followed']
+        indexes = [
+            # Keyset pagination
+            models.Index(
+                fields=['-created_at', '-id'], name='follower_created_idx'),
+            # Followers of a user, and the users they follow, newest first
+            models.Index(
+                fields=['followed', '-created_at'],
+                name='follower_followed_created_idx'),
+            models.Index(
+                fields=['owner', '-created_at'],
+                name='follower_owner_created_idx'),
+        ]
 
     def __str__(self):
         return f'{self.owner} {self.followed}'
+
+
+def increment_follow_counts(sender, instance, created, **kwargs):
+    if created:
+        adjust_profile_counter(instance.followed_id, 'followers_count', 1)
+        adjust_profile_counter(instance.owner_id, 'following_count', 1)
+
+
+def decrement_follow_counts(sender, instance, **kwargs):
+    adjust_profile_counter(instance.followed_id, 'followers_count', -1)
+    adjust_profile_counter(instance.owner_id, 'following_count', -1)
+
+
+post_save.connect(increment_follow_counts, sender=Follower)
+post_delete.connect(decrement_follow_counts, sender=Follower)
+# Recipe lists can be filtered by follows.
+invalidate_on_change(Follower, 'profiles', 'recipes')
@@ -1,5 +1,6 @@
 from django.db import IntegrityError
 from rest_framework import serializers
+from tt_drf_api.images import ImageURLField
 from .models import Follower
 
 
@@ -23,6 +24,10 @@ class FollowerSerializer(serializers.ModelSerializer):
     owner = serializers.ReadOnlyField(source='owner.username')
     followed_name = serializers.ReadOnlyField(source='followed.username')
 
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        return queryset.select_related('owner', 'followed')
+
     class Meta:
         model = Follower
         fields = [
@@ -58,3 +63,62 @@ class FollowerSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError({
                 'detail': 'Already following this user.'
             })
+
+
+class FollowCounterpartSerializer(serializers.ModelSerializer):
+    """
+    Serializer for a follow in a profile's follower or following list,
+    showing the user on the other side of it. Subclasses set
+    `counterpart` to 'owner' or 'followed' and point the fields at it.
+
+    Fields:
+        - `id`: The unique identifier of the follower instance.
+        - `created_at`: When the follow relationship was created.
+        - `user`: The ID of the other user.
+        - `username`: The other user's username.
+        - `profile_id`: The ID of the other user's profile.
+        - `profile_image`: URL of the other user's profile image.
+    """
+    counterpart = None
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        """
+        Join the other user and their profile, loading only the columns
+        that are shown.
+        """
+        user = cls.counterpart
+        return queryset.select_related(f'{user}__profile').only(
+            'id', 'created_at', 'owner_id', 'followed_id',
+            f'{user}__username', f'{user}__profile__id',
+            f'{user}__profile__image',
+        )
+
+    class Meta:
+        model = Follower
+        fields = [
+            'id', 'created_at', 'user', 'username', 'profile_id',
+            'profile_image',
+        ]
+
+
+class FollowerOfProfileSerializer(FollowCounterpartSerializer):
+    """
+    A follow of the profile, shown as the user following it.
+    """
+    counterpart = 'owner'
+    user = serializers.ReadOnlyField(source='owner_id')
+    username = serializers.ReadOnlyField(source='owner.username')
+    profile_id = serializers.ReadOnlyField(source='owner.profile.id')
+    profile_image = ImageURLField(source='owner.profile.image')
+
+
+class FollowedByProfileSerializer(FollowCounterpartSerializer):
+    """
+    A follow by the profile's owner, shown as the user followed.
+    """
+    counterpart = 'followed'
+    user = serializers.ReadOnlyField(source='followed_id')
+    username = serializers.ReadOnlyField(source='followed.username')
+    profile_id = serializers.ReadOnlyField(source='followed.profile.id')
+    profile_image = ImageURLField(source='followed.profile.image')
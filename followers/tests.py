@@ -1,3 +1,224 @@
-from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+from tt_drf_api.replicated import check_shared_caches
+from .graph import FollowGraph, follow_graph
+from .models import Follower
 
-# Create your tests here.
+
+class FollowerTests(APITestCase):
+    """
+    Test cases for listing, creating and deleting follow relationships.
+    """
+
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(username=f'user{i}', password='pass')
+            for i in range(3)
+        ]
+
+    def test_user_cannot_follow_themselves(self):
+        """
+        Test that following yourself is rejected.
+        """
+        self.client.login(username='user0', password='pass')
+        response = self.client.post(
+            '/followers/', {'followed': self.users[0].id})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_follower_list_query_count(self):
+        """
+        Count and page, with owner and followed user joined.
+        """
+        for user in self.users[1:]:
+            Follower.objects.create(owner=self.users[0], followed=user)
+        with self.assertNumQueries(2):
+            response = self.client.get('/followers/')
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_follower_detail_query_count(self):
+        """
+        A single joined row.
+        """
+        follow = Follower.objects.create(
+            owner=self.users[0], followed=self.users[1])
+        with self.assertNumQueries(1):
+            self.client.get(f'/followers/{follow.id}/')
+
+
+@override_settings(FOLLOW_GRAPH_CACHE='default')
+class FollowGraphTests(APITestCase):
+    """
+    Test cases for the in-process follow graph index.
+    """
+
+    def setUp(self):
+        cache.clear()
+        follow_graph.clear()
+        self.users = [
+            User.objects.create_user(username=f'user{i}', password='pass')
+            for i in range(5)
+        ]
+        follow_graph.build()
+        self.ids = [user.id for user in self.users]
+
+    def follow(self, owner, followed):
+        return Follower.objects.create(
+            owner=self.users[owner], followed=self.users[followed])
+
+    def test_follows_update_the_graph(self):
+        """
+        Test that following and unfollowing update the index in place.
+        """
+        self.follow(0, 2)
+        follow = self.follow(0, 1)
+        self.assertEqual(
+            list(follow_graph.following_of(self.ids[0])), self.ids[1:3])
+        follow.delete()
+        self.assertEqual(
+            list(follow_graph.following_of(self.ids[0])), [self.ids[2]])
+
+    def test_relations_and_followers(self):
+        """
+        Test that the reverse index and follow ids follow the changes.
+        """
+        follow = self.follow(0, 1)
+        self.follow(2, 1)
+        back = self.follow(1, 0)
+        self.assertEqual(
+            list(follow_graph.followers_of(self.ids[1])),
+            [self.ids[0], self.ids[2]])
+        self.assertEqual(
+            follow_graph.relation(self.ids[0], self.ids[1]), (follow.id, True))
+        self.assertEqual(
+            follow_graph.relation(self.ids[2], self.ids[0]), (None, False))
+        self.assertEqual(
+            follow_graph.relation(None, self.ids[1]), (None, False))
+        follow.delete()
+        self.assertEqual(
+            list(follow_graph.followers_of(self.ids[1])), [self.ids[2]])
+        self.assertEqual(
+            follow_graph.relation(self.ids[1], self.ids[0]), (back.id, False))
+
+    def test_other_processes_replay_the_log(self):
+        """
+        Test that a second graph picks up changes from the shared log with
+        one query, and rebuilds once log entries are gone.
+        """
+        other = FollowGraph()
+        other.build()
+        self.follow(0, 1)
+        self.follow(2, 1)
+        with self.assertNumQueries(1):
+            other.sync()
+        self.assertEqual(list(other.following_of(self.ids[2])), [self.ids[1]])
+        with self.assertNumQueries(0):
+            other.sync()
+
+        self.follow(3, 1)
+        cache.delete(other.entry_key(other.current_sequence()))
+        other.gap_since = -1000
+        with self.assertNumQueries(1):
+            other.sync()
+        self.assertEqual(list(other.following_of(self.ids[3])), [self.ids[1]])
+
+    @override_settings(FOLLOW_SUGGESTIONS_MAX_EDGES=2)
+    def test_friends_of_friends_reads_a_bounded_sample(self):
+        """
+        Test that each followed user's list is sampled to fit the budget.
+        """
+        self.follow(0, 1)
+        for followed in (2, 3, 4):
+            self.follow(1, followed)
+        suggested = [
+            pk for pk, _ in follow_graph.friends_of_friends(self.ids[0], 10)
+        ]
+        self.assertEqual(suggested, [self.ids[2], self.ids[4]])
+
+    def test_disabled_without_a_shared_cache(self):
+        """
+        Test that without a shared cache the graph is not loaded and
+        lookups query the follower table.
+        """
+        follow = self.follow(0, 1)
+        self.follow(1, 2)
+        with override_settings(FOLLOW_GRAPH_CACHE=None):
+            follow_graph.clear()
+            follow_graph.sync()
+            self.assertEqual(follow_graph.following, {})
+            self.assertEqual(
+                follow_graph.relation(self.ids[0], self.ids[1]),
+                (follow.id, False))
+            self.assertEqual(
+                list(follow_graph.followers_of(self.ids[2])), [self.ids[1]])
+            self.assertEqual(
+                follow_graph.friends_of_friends(self.ids[0], 10),
+                [(self.ids[2], 1)])
+
+    def test_deploy_check_rejects_a_process_cache(self):
+        """
+        Test that `check --deploy` reports a log in a per-process cache.
+        """
+        messages = [error.msg for error in check_shared_caches(None)]
+        self.assertTrue(
+            any(msg.startswith('FOLLOW_GRAPH_CACHE') for msg in messages))
+        with override_settings(FOLLOW_GRAPH_CACHE=None):
+            messages = [error.msg for error in check_shared_caches(None)]
+        self.assertFalse(
+            any(msg.startswith('FOLLOW_GRAPH_CACHE') for msg in messages))
+
+
+class ProfileFollowListTests(APITestCase):
+    """
+    Test cases for the follower and following lists of a profile.
+    """
+
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(username=f'user{i}', password='pass')
+            for i in range(4)
+        ]
+        for owner in self.users[1:]:
+            Follower.objects.create(owner=owner, followed=self.users[0])
+        Follower.objects.create(owner=self.users[0], followed=self.users[3])
+        self.profile = self.users[0].profile
+
+    def test_lists_show_the_other_user(self):
+        """
+        Test that each list shows the users on the other side, newest
+        first, with their profile.
+        """
+        response = self.client.get(f'/profiles/{self.profile.id}/followers/')
+        self.assertEqual(
+            [row['username'] for row in response.data['results']],
+            ['user3', 'user2', 'user1'])
+        row = response.data['results'][0]
+        self.assertEqual(row['user'], self.users[3].id)
+        self.assertEqual(row['profile_id'], self.users[3].profile.id)
+        self.assertTrue(row['profile_image'])
+
+        response = self.client.get(f'/profiles/{self.profile.id}/following/')
+        self.assertEqual(
+            [row['username'] for row in response.data['results']], ['user3'])
+
+        response = self.client.get('/profiles/0/followers/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_keyset_pages_in_two_queries(self):
+        """
+        Test that a cursor page is the owner lookup plus one joined query,
+        and that following the cursors returns every follower once.
+        """
+        for i in range(4, 13):
+            user = User.objects.create_user(username=f'user{i}')
+            Follower.objects.create(owner=user, followed=self.users[0])
+        url = f'/profiles/{self.profile.id}/followers/?cursor='
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        usernames = [row['username'] for row in response.data['results']]
+        response = self.client.get(response.data['next'])
+        usernames += [row['username'] for row in response.data['results']]
+        self.assertEqual(usernames, [f'user{i}' for i in range(12, 0, -1)])
+        self.assertIsNone(response.data['next'])
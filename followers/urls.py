@@ -5,4 +5,6 @@ from followers import views
 urlpatterns = [
     path('followers/', views.FollowerList.as_view()),
     path('followers/<int:pk>/', views.FollowerDetail.as_view()),
+    path('profiles/<int:pk>/followers/', views.ProfileFollowerList.as_view()),
+    path('profiles/<int:pk>/following/', views.ProfileFollowingList.as_view()),
 ]
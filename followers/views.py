@@ -1,14 +1,21 @@
+from django.shortcuts import get_object_or_404
 from rest_framework import generics, permissions
+from profiles.models import Profile
+from tt_drf_api.pagination import KeysetPagination
 from tt_drf_api.permissions import IsOwnerOrReadOnly
 from .models import Follower
-from .serializers import FollowerSerializer
+from .serializers import (
+    FollowedByProfileSerializer, FollowerOfProfileSerializer,
+    FollowerSerializer,
+)
 
 
 class FollowerList(generics.ListCreateAPIView):
     """
     API view to retrieve the list of followers or create a new follower.
 
-    - GET: Returns a list of all followers.
+    - GET: Returns a list of all followers. Supports keyset paging with
+      `?cursor=`.
     - POST: Allows an authenticated user to follow another user.
 
     Permissions:
@@ -17,7 +24,10 @@ class FollowerList(generics.ListCreateAPIView):
     """
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     serializer_class = FollowerSerializer
-    queryset = Follower.objects.all()
+    pagination_class = KeysetPagination
+    queryset = FollowerSerializer.setup_eager_loading(
+        Follower.objects.all()
+    )
 
     def perform_create(self, serializer):
         """
@@ -39,4 +49,45 @@ class FollowerDetail(generics.RetrieveDestroyAPIView):
     """
     permission_classes = [IsOwnerOrReadOnly]
     serializer_class = FollowerSerializer
-    queryset = Follower.objects.all()
+    queryset = FollowerSerializer.setup_eager_loading(
+        Follower.objects.all()
+    )
+
+
+class ProfileFollowList(generics.ListAPIView):
+    """
+    Base API view listing the follows of the profile in the URL, newest
+    first. Supports keyset paging with `?cursor=`. Subclasses set
+    `user_field` to the Follower column holding the profile's owner.
+
+    The owner is looked up first, so the follows are then read from the
+    (owner or followed, created_at) index together with the other user
+    and their profile.
+    """
+    pagination_class = KeysetPagination
+    user_field = None
+
+    def get_queryset(self):
+        user_id = get_object_or_404(
+            Profile.objects.values_list('owner_id', flat=True),
+            pk=self.kwargs['pk'],
+        )
+        return self.serializer_class.setup_eager_loading(
+            Follower.objects.filter(**{self.user_field: user_id})
+        )
+
+
+class ProfileFollowerList(ProfileFollowList):
+    """
+    API view listing the users following a profile.
+    """
+    serializer_class = FollowerOfProfileSerializer
+    user_field = 'followed_id'
+
+
+class ProfileFollowingList(ProfileFollowList):
+    """
+    API view listing the users a profile follows.
+    """
+    serializer_class = FollowedByProfileSerializer
+    user_field = 'owner_id'
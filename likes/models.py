@@ -1,6 +1,8 @@
 from django.db import models
+from django.db.models.signals import post_save, post_delete
 from django.contrib.auth.models import User
-from recipes.models import Recipe
+from recipes.models import Recipe, adjust_recipe_counter
+from tt_drf_api.cache import invalidate_on_change
 
 
 class Like(models.Model):
@@ -30,6 +32,25 @@ class Like(models.Model):
     class Meta:
         ordering = ['-created_at']
         unique_together = ['owner', 'recipe']
+        indexes = [
+            # Keyset pagination
+            models.Index(
+                fields=['-created_at', '-id'], name='like_created_idx'),
+        ]
 
     def __str__(self):
         return f'{self.owner} {self.recipe}'
+
+
+def increment_likes_count(sender, instance, created, **kwargs):
+    if created:
+        adjust_recipe_counter(instance.recipe_id, 'likes_count', 1)
+
+
+def decrement_likes_count(sender, instance, **kwargs):
+    adjust_recipe_counter(instance.recipe_id, 'likes_count', -1)
+
+
+post_save.connect(increment_likes_count, sender=Like)
+post_delete.connect(decrement_likes_count, sender=Like)
+invalidate_on_change(Like, 'recipes')
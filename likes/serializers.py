@@ -10,6 +10,10 @@ class LikeSerializer(serializers.ModelSerializer):
     """
     owner = serializers.ReadOnlyField(source='owner.username')
 
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        return queryset.select_related('owner')
+
     class Meta:
         model = Like
         fields = ['id', 'created_at', 'owner', 'recipe']
@@ -1,3 +1,47 @@
-from django.test import TestCase
+from django.contrib.auth.models import User
+from rest_framework import status
+from rest_framework.test import APITestCase
+from recipes.models import Recipe
+from .models import Like
 
-# Create your tests here.
+
+class LikeTests(APITestCase):
+    """
+    Test cases for listing, creating and deleting likes.
+    """
+
+    def setUp(self):
+        self.kalle = User.objects.create_user(
+            username='kalle', password='kula')
+        self.other_user = User.objects.create_user(
+            username='other_user', password='password')
+        self.recipe = Recipe.objects.create(
+            owner=self.kalle, recipe_name='Test Recipe', status='published')
+
+    def test_logged_in_user_can_like_recipe(self):
+        """
+        Test that a logged-in user can like a recipe once.
+        """
+        self.client.login(username='other_user', password='password')
+        response = self.client.post('/likes/', {'recipe': self.recipe.id})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.post('/likes/', {'recipe': self.recipe.id})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_like_list_query_count(self):
+        """
+        Count and page, with the owner joined.
+        """
+        for user in [self.kalle, self.other_user]:
+            Like.objects.create(owner=user, recipe=self.recipe)
+        with self.assertNumQueries(2):
+            response = self.client.get('/likes/')
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_like_detail_query_count(self):
+        """
+        A single joined row.
+        """
+        like = Like.objects.create(owner=self.kalle, recipe=self.recipe)
+        with self.assertNumQueries(1):
+            self.client.get(f'/likes/{like.id}/')
@@ -1,4 +1,5 @@
 from rest_framework import generics, permissions
+from tt_drf_api.pagination import KeysetPagination
 from tt_drf_api.permissions import IsOwnerOrReadOnly
 from .models import Like
 from .serializers import LikeSerializer
@@ -16,6 +17,7 @@ class LikeList(generics.ListCreateAPIView):
     - permission_classes: Defines the access control for the view.
     - serializer_class: Specifies the serializer to use for the Like model.
     - queryset: Retrieves all Like objects from the database.
+    - pagination_class: Page numbers, or keyset paging with `?cursor=`.
 
     Methods:
     - perform_create: Associates the like with the current user.
@@ -23,7 +25,10 @@ class LikeList(generics.ListCreateAPIView):
 
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     serializer_class = LikeSerializer
-    queryset = Like.objects.all()
+    pagination_class = KeysetPagination
+    queryset = LikeSerializer.setup_eager_loading(
+        Like.objects.all()
+    )
 
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
@@ -44,4 +49,6 @@ class LikeDetail(generics.RetrieveDestroyAPIView):
 
     permission_classes = [IsOwnerOrReadOnly]
     serializer_class = LikeSerializer
-    queryset = Like.objects.all()
+    queryset = LikeSerializer.setup_eager_loading(
+        Like.objects.all()
+    )
@@ -0,0 +1,246 @@
+import heapq
+from bisect import bisect_left, insort
+from collections import namedtuple
+from functools import partial
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_save, post_delete
+from followers.models import Follower
+from tt_drf_api.images import storage_url
+from tt_drf_api.replicated import ReplicatedIndex
+from .models import Profile
+
+"""
+Prefix index for profile autocomplete.
+
+ProfilePrefixIndex keeps a sorted list of (term, user id) pairs, where
+the terms of a profile are its owner's username, its name and each
+later part of the name, all case-folded, so 'ann' finds 'annika' and
+'Sven Anner'. The profiles matching a prefix are a contiguous slice of
+the list found with two binary searches, and the most followed of them
+are returned. The index also holds what the response shows, so a
+lookup makes no query.
+
+A prefix matching many names, e.g. a single letter, is ranked once and
+its result kept until a profile it could contain changes
+(PROFILE_AUTOCOMPLETE_MEMO_MATCHES).
+
+Profile, username and follow changes are logged in PROFILE_INDEX_CACHE
+and replayed by every process, see tt_drf_api.replicated. The index is
+built on the first lookup, or when a worker starts if
+PROFILE_INDEX_WARM_UP is set. Without a shared cache for the log the
+index is disabled and `autocomplete` matches the profiles with a query.
+
+Functions:
+    - autocomplete: Up to PROFILE_AUTOCOMPLETE_LIMIT profiles for a
+      prefix.
+
+Objects:
+    - prefix_index: The index of this process.
+"""
+
+ProfileEntry = namedtuple(
+    'ProfileEntry',
+    'id owner name image followers_count terms',
+)
+
+
+def normalize(text):
+    return ' '.join(text.casefold().split())
+
+
+def profile_terms(username, name):
+    words = normalize(name).split(' ')
+    terms = {normalize(username)}
+    terms.update(' '.join(words[i:]) for i in range(len(words)))
+    terms.discard('')
+    return frozenset(terms)
+
+
+def make_entry(row):
+    user_id, pk, username, name, image, variants, followers_count = row
+    # The thumbnail if it is of the current image.
+    if variants and variants.get('source') == image:
+        image = variants['thumb']
+    return user_id, ProfileEntry(
+        pk, username, name, image, followers_count,
+        profile_terms(username, name),
+    )
+
+
+class ProfilePrefixIndex(ReplicatedIndex):
+    """
+    Thread-safe prefix index of profiles. 'terms' is the sorted list of
+    (term, user id) pairs, 'profiles' maps a user id to its ProfileEntry
+    and 'memo' holds the results of prefixes with many matches.
+    """
+    log_name = 'profile-index'
+    settings_prefix = 'PROFILE_INDEX'
+
+    def __init__(self):
+        super().__init__()
+        self.terms = []
+        self.profiles = {}
+        self.memo = {}
+
+    def rows(self):
+        return Profile.objects.order_by().values_list(
+            'owner_id', 'id', 'owner__username', 'name', 'image',
+            'image_variants', 'followers_count',
+        )
+
+    def build(self):
+        """
+        Load every profile from the database.
+        """
+        if not self.enabled:
+            return
+        sequence = self.current_sequence()
+        profiles = dict(
+            make_entry(row) for row in self.rows().iterator(chunk_size=5000)
+        )
+        terms = sorted(
+            (term, user_id)
+            for user_id, entry in profiles.items()
+            for term in entry.terms
+        )
+        with self.lock:
+            self.terms = terms
+            self.profiles = profiles
+            self.memo = {}
+            self.built(sequence)
+
+    def reload(self, user_ids):
+        """
+        Re-read the profiles of 'user_ids' from the database.
+        """
+        entries = dict(
+            make_entry(row) for row in self.rows().filter(
+                owner_id__in=user_ids
+            )
+        )
+        with self.lock:
+            changed = set()
+            for user_id in user_ids:
+                old = self.profiles.pop(user_id, None)
+                if old is not None:
+                    changed.update(old.terms)
+                    for term in old.terms:
+                        index = bisect_left(self.terms, (term, user_id))
+                        del self.terms[index]
+                entry = entries.get(user_id)
+                if entry is not None:
+                    changed.update(entry.terms)
+                    self.profiles[user_id] = entry
+                    for term in entry.terms:
+                        insort(self.terms, (term, user_id))
+            for key in [
+                key for key in self.memo
+                if any(term.startswith(key[0]) for term in changed)
+            ]:
+                del self.memo[key]
+
+    def search(self, query, limit):
+        """
+        Return the entries of up to 'limit' profiles with a term starting
+        with 'query', most followers first, then by username.
+        """
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        with self.lock:
+            memoized = self.memo.get((prefix, limit))
+            if memoized is not None:
+                return memoized
+            start = bisect_left(self.terms, (prefix,))
+            # Every term with the prefix sorts below this one.
+            end = bisect_left(self.terms, (prefix + '\U0010ffff',), start)
+            user_ids = {user_id for _, user_id in self.terms[start:end]}
+            profiles = self.profiles
+            result = heapq.nsmallest(
+                limit, (profiles[user_id] for user_id in user_ids),
+                key=lambda entry: (-entry.followers_count, entry.owner),
+            )
+            if end - start > settings.PROFILE_AUTOCOMPLETE_MEMO_MATCHES:
+                self.memo[(prefix, limit)] = result
+            return result
+
+    def query(self, query, limit):
+        """
+        `search` in the database, for when the index is disabled.
+        """
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        rows = self.rows().filter(
+            Q(owner__username__istartswith=prefix)
+            | Q(name__istartswith=prefix)
+            | Q(name__icontains=' ' + prefix)
+        ).order_by('-followers_count', 'owner__username')[:limit]
+        return [make_entry(row)[1] for row in rows]
+
+    def clear(self):
+        with self.lock:
+            super().clear()
+            self.terms = []
+            self.profiles = {}
+            self.memo = {}
+
+
+prefix_index = ProfilePrefixIndex()
+
+
+def autocomplete(query, limit=None):
+    """
+    Return up to 'limit' profiles whose username or name starts with
+    'query', as dicts of id, owner, name, image and followers_count.
+    """
+    limit = limit or settings.PROFILE_AUTOCOMPLETE_LIMIT
+    if prefix_index.enabled:
+        prefix_index.sync()
+        entries = prefix_index.search(query, limit)
+    else:
+        entries = prefix_index.query(query, limit)
+    storage = Profile._meta.get_field('image').storage
+    return [
+        {
+            'id': entry.id,
+            'owner': entry.owner,
+            'name': entry.name,
+            'image': storage_url(storage, entry.image),
+            'followers_count': entry.followers_count,
+        }
+        for entry in entries
+    ]
+
+
+def profile_changed(user_id):
+    # Right away, so this process sees its own change, and again once the
+    # change is visible to other processes.
+    prefix_index.publish(user_id)
+    transaction.on_commit(partial(prefix_index.publish, user_id))
+
+
+def profile_saved(sender, instance, **kwargs):
+    profile_changed(instance.owner_id)
+
+
+def username_changed(sender, instance, created, update_fields, **kwargs):
+    # New users are logged when their profile is created, and logins only
+    # save 'last_login'.
+    if created or (update_fields and 'username' not in update_fields):
+        return
+    profile_changed(instance.pk)
+
+
+def followers_changed(sender, instance, **kwargs):
+    profile_changed(instance.followed_id)
+
+
+post_save.connect(profile_saved, sender=Profile)
+post_delete.connect(profile_saved, sender=Profile)
+post_save.connect(username_changed, sender=User)
+post_save.connect(followers_changed, sender=Follower)
+post_delete.connect(followers_changed, sender=Follower)
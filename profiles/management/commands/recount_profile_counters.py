@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from followers.models import Follower
+from profiles.models import Profile
+from recipes.models import Recipe
+from tt_drf_api.counters import count_of, recount_counters
+
+"""
+Management command to reconcile the denormalized counters on Profile.
+
+'recipes_count' counts the owner's published recipes and is kept by the
+Recipe save, delete and status change handlers; 'followers_count' and
+'following_count' are kept by the Follower handlers. This command
+recounts all three against the owner and rewrites the profiles that
+disagree, see tt_drf_api.counters.
+"""
+
+
+def _actual_counts():
+    return {
+        'recipes_count': count_of(
+            Recipe.objects.filter(status='published'), 'owner', 'owner'),
+        'followers_count': count_of(
+            Follower.objects.all(), 'followed', 'owner'),
+        'following_count': count_of(
+            Follower.objects.all(), 'owner', 'owner'),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute drifted recipes_count, followers_count and '
+        'following_count on profiles.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Number of profiles checked per batch.',
+        )
+
+    def handle(self, *args, **options):
+        checked, fixed = recount_counters(
+            Profile, _actual_counts, options['chunk_size']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Checked {checked} profiles, fixed {fixed} drifted counters.'
+        ))
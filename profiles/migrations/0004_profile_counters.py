@@ -0,0 +1,65 @@
+# Generated by Django 4.2.16 on 2026-10-17 03:55
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_counters(apps, schema_editor):
+    Profile = apps.get_model('profiles', 'Profile')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Follower = apps.get_model('followers', 'Follower')
+
+    def count_of(queryset, field):
+        return Coalesce(Subquery(
+            queryset.filter(**{field: OuterRef('owner')})
+            .order_by().values(field)
+            .annotate(n=Count('id')).values('n')
+        ), 0)
+
+    Profile.objects.update(
+        recipes_count=count_of(
+            Recipe.objects.filter(status='published'), 'owner'),
+        followers_count=count_of(Follower.objects.all(), 'followed'),
+        following_count=count_of(Follower.objects.all(), 'owner'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0003_profile_image_variants'),
+        ('recipes', '0004_alter_recipe_status'),
+        ('followers', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='recipes_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(fields=['-recipes_count'], name='profile_recipes_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(fields=['-followers_count'], name='profile_followers_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(fields=['-following_count'], name='profile_following_count_idx'),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,13 @@
+from collections import defaultdict
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import Greatest
 from django.db.models.signals import post_save
 from django.contrib.auth.models import User
+from tt_drf_api.cache import invalidate_on_change
+from tt_drf_api.images import (
+    forget_urls_on_change, generate_variants_on_save,
+)
 
 """
 Models for the Profiles app.
@@ -8,7 +15,13 @@ Models for the Profiles app.
 This module defines the Profile model, which represents a user's profile
 information. Each Profile is associated with a User instance and includes
 fields for storing additional details such as the user's name, bio content,
-and profile image.
+and profile image, with the resized variants of an uploaded image.
+
+'recipes_count' (published recipes), 'followers_count' and
+'following_count' are maintained by the Recipe and Follower signal
+handlers through `adjust_profile_counter`, so profile lists don't
+aggregate over recipes and follows. The recount_profile_counters command
+corrects any drift.
 
 A signal is included to automatically create a Profile when a new User is
 registered.
@@ -19,6 +32,8 @@ Classes:
 Functions:
     - create_profile: Signal handler to create a Profile when a new User is
       registered.
+    - adjust_profile_counter / adjust_profile_counters: Add to a counter
+      of one or many users' profiles.
 """
 
 
@@ -31,9 +46,24 @@ class Profile(models.Model):
     image = models.ImageField(
         upload_to='images/', default='../default_profile_rws25d'
     )
+    image_variants = models.JSONField(default=dict, blank=True)
+    recipes_count = models.PositiveIntegerField(default=0)
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Ordering the profile list by a counter
+            models.Index(
+                fields=['-recipes_count'], name='profile_recipes_count_idx'),
+            models.Index(
+                fields=['-followers_count'],
+                name='profile_followers_count_idx'),
+            models.Index(
+                fields=['-following_count'],
+                name='profile_following_count_idx'),
+        ]
 
     def __str__(self):
         return f"{self.owner}'s profile"
@@ -44,4 +74,31 @@ def create_profile(sender, instance, created, **kwargs):
         Profile.objects.create(owner=instance)
 
 
+def adjust_profile_counter(user_id, field, delta):
+    """
+    Atomically add 'delta' to one of the counter columns on the profile
+    of 'user_id', clamped at zero.
+    """
+    adjust_profile_counters(field, {user_id: delta})
+
+
+def adjust_profile_counters(field, deltas):
+    """
+    Apply {user id: delta} to a counter, one UPDATE per distinct delta.
+    """
+    users = defaultdict(list)
+    for user_id, delta in deltas.items():
+        if delta:
+            users[delta].append(user_id)
+    for delta, user_ids in users.items():
+        Profile.objects.filter(owner_id__in=user_ids).update(
+            **{field: Greatest(F(field) + delta, 0)}
+        )
+
+
 post_save.connect(create_profile, sender=User)
+invalidate_on_change(Profile, 'profiles', 'recipes')
+# Both lists show the owner's username. Logins only save 'last_login'.
+invalidate_on_change(User, 'profiles', 'recipes', fields={'username'})
+generate_variants_on_save(Profile, 'profiles')
+forget_urls_on_change(Profile)
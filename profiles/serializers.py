@@ -1,6 +1,11 @@
 from rest_framework import serializers
 from .models import Profile
+from followers.graph import follow_graph
 from followers.models import Follower
+from tt_drf_api.fieldsets import SparseFieldsMixin
+from tt_drf_api.images import variant_urls
+from tt_drf_api.uploads import ImageUploadSerializerMixin
+from tt_drf_api.viewer import ViewerListSerializer, ViewerSerializerMixin
 
 """
 Serializers for the Profiles app.
@@ -13,34 +18,87 @@ following, as well as flags for ownership and following relationships.
 Classes:
     - ProfileSerializer: Serializes Profile model data, including related
       metadata such as ownership status, following status, and aggregate counts.
+
+The follow relationships with the logged-in user, 'following_id' and
+'follows_you', are read from the follow graph index without a query, see
+followers.graph. Without the index they are looked up for the whole page
+with one query each, see `prime_viewer`. Passing `fields` limits both the
+output and the columns that are loaded. Image uploads are size and
+dimension checked before they are decoded, see tt_drf_api.uploads, and
+`image_variants` lists the resized copies made after upload.
 """
 
 
-class ProfileSerializer(serializers.ModelSerializer):
+class ProfileSerializer(
+        SparseFieldsMixin, ImageUploadSerializerMixin, ViewerSerializerMixin,
+        serializers.ModelSerializer):
     owner = serializers.ReadOnlyField(source='owner.username')
     is_owner = serializers.SerializerMethodField()
     following_id = serializers.SerializerMethodField()
+    follows_you = serializers.SerializerMethodField()
     recipes_count = serializers.ReadOnlyField()
     followers_count = serializers.ReadOnlyField()
     following_count = serializers.ReadOnlyField()
+    image_variants = serializers.SerializerMethodField()
+
+    deferrable_fields = ('content',)
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, fields=None):
+        if fields is None:
+            fields = cls.Meta.fields
+        if 'owner' in fields:
+            queryset = queryset.select_related('owner')
+        deferred = [name for name in cls.deferrable_fields
+                    if name not in fields]
+        return queryset.defer(*deferred) if deferred else queryset
 
     def get_is_owner(self, obj):
-        request = self.context['request']
-        return request.user == obj.owner
+        return self.viewer.is_owner(obj.owner_id)
+
+    def get_image_variants(self, obj):
+        return variant_urls(obj)
+
+    def get_follow_relation(self, obj):
+        """
+        Return (following_id, follows_you) between the logged-in user and
+        the profile's owner.
+        """
+        viewer = self.viewer
+        if viewer.user_id is not None:
+            viewer.once('follow-graph', follow_graph.sync)
+        return follow_graph.relation(viewer.user_id, obj.owner_id)
 
     def get_following_id(self, obj):
-        user = self.context['request'].user
-        if user.is_authenticated:
-            following = Follower.objects.filter(
-                owner=user, followed=obj.owner
-            ).first()
-            return following.id if following else None
-        return None
+        if not follow_graph.enabled:
+            return self.viewer.lookup(Follower, 'followed', obj.owner_id)
+        return self.get_follow_relation(obj)[0]
+
+    def get_follows_you(self, obj):
+        if not follow_graph.enabled:
+            return self.viewer.lookup(
+                Follower, 'owner', obj.owner_id, viewer_field='followed'
+            ) is not None
+        return self.get_follow_relation(obj)[1]
+
+    def prime_viewer(self, instances):
+        # Only needed without the follow graph, which has every relation.
+        if follow_graph.enabled:
+            return
+        owner_ids = [obj.owner_id for obj in instances]
+        if 'following_id' in self.fields:
+            self.viewer.resolve(Follower, 'followed', owner_ids)
+        if 'follows_you' in self.fields:
+            self.viewer.resolve(
+                Follower, 'owner', owner_ids, viewer_field='followed'
+            )
 
     class Meta:
         model = Profile
         fields = [
             'id', 'owner', 'created_at', 'updated_at', 'name',
-            'content', 'image', 'is_owner', 'following_id',
+            'content', 'image', 'image_variants', 'is_owner', 'following_id',
+            'follows_you',
             'recipes_count', 'followers_count', 'following_count',
         ]
+        list_serializer_class = ViewerListSerializer
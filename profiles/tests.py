@@ -1,3 +1,694 @@
-from django.test import TestCase
+from io import BytesIO
+from asgiref.sync import async_to_sync
+from io import StringIO
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import AsyncRequestFactory, Client, override_settings
+from PIL import Image
+from rest_framework import status
+from rest_framework.test import APITestCase
+from followers.graph import follow_graph
+from followers.models import Follower
+from recipes.models import Recipe
+from recipes.moderation import change_statuses
+from .autocomplete import prefix_index
+from .models import Profile
+from .views import ProfileList
 
-# Create your tests here.
+
+class ProfileViewerTests(APITestCase):
+    """
+    Test cases for the viewer-dependent fields on profiles.
+    """
+
+    def setUp(self):
+        """
+        Create three users, where kalle follows one of the others.
+        """
+        follow_graph.clear()
+        self.kalle = User.objects.create_user(
+            username='kalle', password='kula')
+        self.followed = User.objects.create_user(
+            username='followed', password='password')
+        self.stranger = User.objects.create_user(
+            username='stranger', password='password')
+        self.follow = Follower.objects.create(
+            owner=self.kalle, followed=self.followed)
+
+    def test_following_id_resolved_for_page(self):
+        """
+        Test that following_id and is_owner are set per profile.
+        """
+        self.client.login(username='kalle', password='kula')
+        response = self.client.get('/profiles/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = {r['owner']: r for r in response.data['results']}
+        self.assertEqual(rows['followed']['following_id'], self.follow.id)
+        self.assertIsNone(rows['stranger']['following_id'])
+        self.assertTrue(rows['kalle']['is_owner'])
+        self.assertFalse(rows['followed']['is_owner'])
+
+    def test_following_id_on_detail(self):
+        """
+        Test that following_id is resolved on the detail view.
+        """
+        self.client.login(username='kalle', password='kula')
+        profile = Profile.objects.get(owner=self.followed)
+        response = self.client.get(f'/profiles/{profile.id}/')
+        self.assertEqual(response.data['following_id'], self.follow.id)
+
+    def test_follows_you_and_mutual_follows(self):
+        """
+        Test that follows_you is set for profiles following the viewer,
+        together with following_id when the follow is mutual.
+        """
+        back = Follower.objects.create(
+            owner=self.stranger, followed=self.kalle)
+        self.client.login(username='kalle', password='kula')
+        rows = {r['owner']: r for r in self.client.get(
+            '/profiles/').data['results']}
+        self.assertTrue(rows['stranger']['follows_you'])
+        self.assertIsNone(rows['stranger']['following_id'])
+        self.assertFalse(rows['followed']['follows_you'])
+
+        Follower.objects.create(owner=self.followed, followed=self.kalle)
+        rows = {r['owner']: r for r in self.client.get(
+            '/profiles/').data['results']}
+        self.assertTrue(rows['followed']['follows_you'])
+        self.assertEqual(rows['followed']['following_id'], self.follow.id)
+
+        back.delete()
+        self.client.logout()
+        rows = {r['owner']: r for r in self.client.get(
+            '/profiles/').data['results']}
+        self.assertFalse(rows['followed']['follows_you'])
+        self.assertIsNone(rows['followed']['following_id'])
+
+    def test_follow_filters(self):
+        """
+        Test that the follower and following filters list the right
+        profiles and reject unknown profiles.
+        """
+        Follower.objects.create(owner=self.stranger, followed=self.kalle)
+        kalle = self.kalle.profile.id
+        response = self.client.get(
+            f'/profiles/?owner__followed__owner__profile={kalle}')
+        self.assertEqual(
+            [r['owner'] for r in response.data['results']], ['followed'])
+        response = self.client.get(
+            f'/profiles/?owner__following__followed__profile={kalle}')
+        self.assertEqual(
+            [r['owner'] for r in response.data['results']], ['stranger'])
+        response = self.client.get(
+            '/profiles/?owner__followed__owner__profile=0')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(FOLLOW_GRAPH_FILTER_MAX_IDS=0)
+    def test_follow_filters_on_many_ids(self):
+        """
+        Test that above FOLLOW_GRAPH_FILTER_MAX_IDS the filter uses the
+        follower table and returns the same profiles.
+        """
+        response = self.client.get(
+            '/profiles/?owner__followed__owner__profile='
+            f'{self.kalle.profile.id}')
+        self.assertEqual(
+            [r['owner'] for r in response.data['results']], ['followed'])
+
+    def test_follow_filter_ordered_by_follow_date(self):
+        """
+        Test that ordering the followers of a profile by follow date
+        orders by the follows of that profile, not by the followers'
+        other follows.
+        """
+        aa = User.objects.create_user(username='aa', password='password')
+        bb = User.objects.create_user(username='bb', password='password')
+        Follower.objects.create(owner=aa, followed=self.followed)
+        Follower.objects.create(owner=bb, followed=self.followed)
+        Follower.objects.create(owner=aa, followed=self.kalle)
+        Follower.objects.create(owner=aa, followed=self.stranger)
+        response = self.client.get(
+            '/profiles/?owner__following__followed__profile='
+            f'{self.followed.profile.id}'
+            '&ordering=-owner__following__created_at')
+        self.assertEqual(
+            [r['owner'] for r in response.data['results']],
+            ['bb', 'aa', 'kalle'])
+
+
+@override_settings(FOLLOW_GRAPH_CACHE='default')
+class ProfileSharedGraphViewerTests(ProfileViewerTests):
+    """
+    The viewer tests, with the relations read from the follow graph index.
+    """
+
+
+@override_settings(FOLLOW_GRAPH_CACHE='default')
+class ProfileQueryBudgetTests(APITestCase):
+    """
+    Pin the number of queries used by the profile endpoints.
+    """
+
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(username=f'user{i}', password='pass')
+            for i in range(3)
+        ]
+        follow_graph.clear()
+        Follower.objects.create(owner=self.users[0], followed=self.users[1])
+        follow_graph.build()
+
+    def test_profile_list_query_count(self):
+        """
+        Count and page, with the owner joined.
+        """
+        with self.assertNumQueries(2):
+            response = self.client.get('/profiles/')
+        self.assertEqual(len(response.data['results']), 3)
+
+    def test_profile_list_query_count_logged_in(self):
+        """
+        Session and user lookups; following ids come from the follow graph.
+        """
+        self.client.login(username='user0', password='pass')
+        with self.assertNumQueries(4):
+            self.client.get('/profiles/')
+
+    def test_profile_detail_query_count(self):
+        """
+        The ETag validator row, then a single joined row.
+        """
+        profile = Profile.objects.get(owner=self.users[1])
+        with self.assertNumQueries(2):
+            self.client.get(f'/profiles/{profile.id}/')
+
+
+class ProfileFallbackQueryBudgetTests(APITestCase):
+    """
+    Pin the number of queries without the follow graph index, when the
+    follow relations are read from the follower table.
+    """
+
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(username=f'user{i}', password='pass')
+            for i in range(3)
+        ]
+        Follower.objects.create(owner=self.users[0], followed=self.users[1])
+        Follower.objects.create(owner=self.users[2], followed=self.users[0])
+
+    def test_profile_list_query_count_logged_in(self):
+        """
+        Session, user, count and page, then one query per relation for
+        the whole page.
+        """
+        self.client.login(username='user0', password='pass')
+        with self.assertNumQueries(6):
+            response = self.client.get('/profiles/')
+        rows = {r['owner']: r for r in response.data['results']}
+        self.assertIsNotNone(rows['user1']['following_id'])
+        self.assertTrue(rows['user2']['follows_you'])
+
+    def test_profile_detail_etag_reads_the_relations(self):
+        """
+        The validator row holds the relations, so a follow back changes
+        the ETag.
+        """
+        self.client.login(username='user0', password='pass')
+        url = f'/profiles/{self.users[1].profile.id}/'
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(3):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        Follower.objects.create(owner=self.users[1], followed=self.users[0])
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['follows_you'])
+
+
+class ProfileCounterTests(APITestCase):
+    """
+    Test cases for the stored recipe, follower and following counts.
+    """
+
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(username=f'user{i}', password='pass')
+            for i in range(3)
+        ]
+
+    def counts(self, user):
+        profile = Profile.objects.get(owner=user)
+        return (
+            profile.recipes_count, profile.followers_count,
+            profile.following_count,
+        )
+
+    def test_follows_are_counted(self):
+        """
+        Test that following and unfollowing update both profiles.
+        """
+        follow = Follower.objects.create(
+            owner=self.users[0], followed=self.users[1])
+        Follower.objects.create(owner=self.users[2], followed=self.users[1])
+        self.assertEqual(self.counts(self.users[0]), (0, 0, 1))
+        self.assertEqual(self.counts(self.users[1]), (0, 2, 0))
+        follow.delete()
+        self.assertEqual(self.counts(self.users[0]), (0, 0, 0))
+        self.assertEqual(self.counts(self.users[1]), (0, 1, 0))
+
+    def test_only_published_recipes_are_counted(self):
+        """
+        Test that publishing, unpublishing and deleting recipes update the
+        owner's recipe count, one by one and in batches.
+        """
+        draft = Recipe.objects.create(owner=self.users[0], recipe_name='A')
+        recipe = Recipe.objects.create(
+            owner=self.users[0], recipe_name='B', status='published')
+        self.assertEqual(self.counts(self.users[0])[0], 1)
+        draft.status = 'published'
+        draft.save()
+        self.assertEqual(self.counts(self.users[0])[0], 2)
+        recipe.status = 'pending_delete'
+        recipe.save()
+        self.assertEqual(self.counts(self.users[0])[0], 1)
+        draft.delete()
+        recipe.delete()
+        self.assertEqual(self.counts(self.users[0])[0], 0)
+
+        recipes = [
+            Recipe.objects.create(owner=user, recipe_name='C')
+            for user in self.users[:2] for _ in range(2)
+        ]
+        change_statuses({recipe.pk: 'published' for recipe in recipes})
+        self.assertEqual(self.counts(self.users[0])[0], 2)
+        self.assertEqual(self.counts(self.users[1])[0], 2)
+        change_statuses({recipes[0].pk: 'pending_publish'})
+        self.assertEqual(self.counts(self.users[0])[0], 1)
+
+    def test_refreshed_recipe_is_not_counted_twice(self):
+        """
+        Test that a recipe published elsewhere and then refreshed is not
+        counted again when it is saved.
+        """
+        recipe = Recipe.objects.create(owner=self.users[0], recipe_name='A')
+        change_statuses({recipe.pk: 'published'})
+        recipe.refresh_from_db()
+        recipe.recipe_name = 'B'
+        recipe.save()
+        self.assertEqual(self.counts(self.users[0])[0], 1)
+        recipe.status = 'pending_delete'
+        recipe.save()
+        self.assertEqual(self.counts(self.users[0])[0], 0)
+
+    def test_list_is_ordered_by_counter(self):
+        """
+        Test that the list orders by the stored follower count.
+        """
+        for owner in self.users[:2]:
+            Follower.objects.create(owner=owner, followed=self.users[2])
+        Follower.objects.create(owner=self.users[2], followed=self.users[0])
+        response = self.client.get('/profiles/?ordering=-followers_count')
+        self.assertEqual(
+            [row['owner'] for row in response.data['results']][:2],
+            ['user2', 'user0'])
+
+    def test_recount_command_fixes_drift(self):
+        """
+        Test that the command restores counters changed around the ORM.
+        """
+        Follower.objects.create(owner=self.users[0], followed=self.users[1])
+        Recipe.objects.create(
+            owner=self.users[1], recipe_name='A', status='published')
+        Profile.objects.update(
+            recipes_count=5, followers_count=5, following_count=5)
+        out = StringIO()
+        call_command(
+            'recount_profile_counters', '--chunk-size', '2', stdout=out)
+        self.assertIn('Checked 3 profiles, fixed 3', out.getvalue())
+        self.assertEqual(self.counts(self.users[0]), (0, 0, 1))
+        self.assertEqual(self.counts(self.users[1]), (1, 1, 0))
+        self.assertEqual(self.counts(self.users[2]), (0, 0, 0))
+
+
+class ProfileSuggestionTests(APITestCase):
+    """
+    Test cases for /profiles/suggestions/.
+    """
+
+    def setUp(self):
+        cache.clear()
+        follow_graph.clear()
+        self.users = [
+            User.objects.create_user(username=f'user{i}', password='pass')
+            for i in range(6)
+        ]
+        follows = [(0, 1), (0, 2), (1, 3), (2, 3), (1, 4), (2, 0), (1, 5)]
+        for owner, followed in follows:
+            Follower.objects.create(
+                owner=self.users[owner], followed=self.users[followed])
+
+    def suggestions(self):
+        response = self.client.get('/profiles/suggestions/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [(row['owner'], row['followed_by_count'])
+                for row in response.data]
+
+    def test_requires_login(self):
+        """
+        Test that anonymous users get no suggestions.
+        """
+        response = self.client.get('/profiles/suggestions/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_ranked_by_overlap(self):
+        """
+        Test that suggestions are ranked by how many followed users follow
+        them, leaving out the user and the users they follow.
+        """
+        self.client.force_authenticate(self.users[0])
+        self.assertEqual(
+            self.suggestions(), [('user3', 2), ('user4', 1), ('user5', 1)])
+
+    def test_cached_suggestions_drop_new_follows(self):
+        """
+        Test that suggestions are cached, without users followed since.
+        """
+        self.client.force_authenticate(self.users[0])
+        self.suggestions()
+        Follower.objects.create(owner=self.users[0], followed=self.users[3])
+        Follower.objects.create(owner=self.users[1], followed=self.users[2])
+        self.assertEqual(self.suggestions(), [('user4', 1), ('user5', 1)])
+
+
+@override_settings(FOLLOW_GRAPH_CACHE='default')
+class ProfileSharedGraphSuggestionTests(ProfileSuggestionTests):
+    """
+    The suggestion tests, computed from the follow graph index.
+    """
+
+
+class ProfileResponseCacheTests(APITestCase):
+    """
+    Test cases for the anonymous profile list response cache.
+    """
+
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(username=f'user{i}', password='pass')
+            for i in range(2)
+        ]
+
+    def test_follow_invalidates_cached_list(self):
+        """
+        Test that the cached list is reused until someone follows.
+        """
+        self.client.get('/profiles/')
+        with self.assertNumQueries(0):
+            self.client.get('/profiles/')
+        Follower.objects.create(owner=self.users[0], followed=self.users[1])
+        response = self.client.get('/profiles/')
+        counts = {p['owner']: p['followers_count']
+                  for p in response.data['results']}
+        self.assertEqual(counts['user1'], 1)
+
+
+class ProfileConditionalGetTests(APITestCase):
+    """
+    Test cases for ETag on the profile detail endpoint.
+    """
+
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(username=f'user{i}', password='pass')
+            for i in range(2)
+        ]
+        self.url = f'/profiles/{self.users[1].profile.id}/'
+        follow_graph.clear()
+
+    def test_follow_changes_the_etag(self):
+        """
+        Test that the profile is not modified until someone follows it.
+        """
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        Follower.objects.create(owner=self.users[0], followed=self.users[1])
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['followers_count'], 1)
+
+    def test_follow_back_changes_the_etag(self):
+        """
+        Test that the profile changes for its follower when it follows
+        them back, through follows_you.
+        """
+        Follower.objects.create(owner=self.users[0], followed=self.users[1])
+        self.client.login(username='user0', password='pass')
+        etag = self.client.get(self.url)['ETag']
+        Follower.objects.create(owner=self.users[1], followed=self.users[0])
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['follows_you'])
+
+
+class ProfileFieldsetTests(APITestCase):
+    """
+    Test cases for selecting profile fields with `fields` and `omit`.
+    """
+
+    def setUp(self):
+        User.objects.create_user(username='user0', password='pass')
+
+    def test_fields_and_omit(self):
+        """
+        Test that `fields` selects and `omit` drops profile fields.
+        """
+        response = self.client.get('/profiles/?fields=id,owner')
+        self.assertEqual(set(response.data['results'][0]), {'id', 'owner'})
+        response = self.client.get('/profiles/?omit=content,image')
+        self.assertNotIn('content', response.data['results'][0])
+        self.assertIn('followers_count', response.data['results'][0])
+
+
+class ProfileImageUploadTests(APITestCase):
+    """
+    Test cases for the early rejection of profile image uploads.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass')
+        self.client.login(username='user', password='pass')
+
+    def test_upload_over_size_limit_is_aborted(self):
+        """
+        Test that an oversized profile image is rejected.
+        """
+        image = SimpleUploadedFile('big.png', b'x' * 4096, 'image/png')
+        with override_settings(IMAGE_UPLOAD_MAX_SIZE=1024):
+            response = self.client.put(
+                f'/profiles/{self.user.profile.id}/',
+                {'name': 'User', 'image': image}, format='multipart',
+            )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('image', response.data)
+
+    def test_admin_upload_over_size_limit_is_a_bad_request(self):
+        """
+        Test that the size limit also stops uploads to non-API views, here
+        the admin change form, with a 400 instead of a server error.
+        """
+        User.objects.create_superuser(username='admin', password='pass')
+        client = Client(enforce_csrf_checks=True)
+        client.login(username='admin', password='pass')
+        url = f'/admin/profiles/profile/{self.user.profile.id}/change/'
+        token = client.get(url).cookies[settings.CSRF_COOKIE_NAME].value
+        image = SimpleUploadedFile('big.png', b'x' * 4096, 'image/png')
+        with override_settings(IMAGE_UPLOAD_MAX_SIZE=1024):
+            response = client.post(url, {
+                'csrfmiddlewaretoken': token, 'owner': self.user.id,
+                'name': 'User', 'image': image,
+            })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(
+    DEFAULT_FILE_STORAGE='django.core.files.storage.InMemoryStorage',
+    IMAGE_VARIANTS_SYNC=True)
+class ProfileImageVariantTests(APITestCase):
+    """
+    Test cases for the resized variants of profile images.
+    """
+
+    def test_variants_generated_after_upload(self):
+        """
+        Test that a new profile image gets variants.
+        """
+        user = User.objects.create_user(username='user', password='pass')
+        self.client.login(username='user', password='pass')
+        buffer = BytesIO()
+        Image.new('RGB', (400, 400)).save(buffer, 'PNG')
+        image = SimpleUploadedFile('me.png', buffer.getvalue(), 'image/png')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put(
+                f'/profiles/{user.profile.id}/',
+                {'name': 'User', 'image': image}, format='multipart',
+            )
+        response = self.client.get(f'/profiles/{user.profile.id}/')
+        self.assertEqual(
+            set(response.data['image_variants']), {'thumb', 'card', 'full'})
+
+
+class ProfileAsyncReadTests(APITestCase):
+    """
+    Test cases for the async read path of the profile views.
+    """
+
+    def test_list_matches_sync_path(self):
+        """
+        Test that the async list returns the same following ids and
+        counts as the sync list.
+        """
+        follow_graph.clear()
+        user = User.objects.create_user(username='user', password='pass')
+        other = User.objects.create_user(username='other', password='pass')
+        Follower.objects.create(owner=user, followed=other)
+        self.client.force_authenticate(user)
+        expected = self.client.get('/profiles/').data
+
+        request = AsyncRequestFactory().get('/profiles/')
+        request._force_auth_user = user
+        view = ProfileList.as_view(async_reads=True)
+        response = async_to_sync(view)(request)
+        self.assertEqual(response.data, expected)
+        self.assertIsNotNone(response.data['results'][0]['following_id'])
+
+
+@override_settings(PROFILE_INDEX_CACHE='default')
+class ProfileAutocompleteTests(APITestCase):
+    """
+    Test cases for completing usernames and names from the prefix index.
+    """
+
+    def setUp(self):
+        cache.clear()
+        prefix_index.clear()
+        self.users = {
+            username: User.objects.create_user(
+                username=username, password='pass')
+            for username in ('annika', 'bertil', 'anders', 'cecilia')
+        }
+        profile = self.users['bertil'].profile
+        profile.name = 'Bertil Annersson'
+        profile.save()
+        for owner in ('anders', 'cecilia'):
+            Follower.objects.create(
+                owner=self.users[owner], followed=self.users['bertil'])
+        Follower.objects.create(
+            owner=self.users['cecilia'], followed=self.users['anders'])
+
+    def complete(self, query):
+        response = self.client.get('/profiles/autocomplete/', {'q': query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row['owner'] for row in response.data]
+
+    def test_matches_usernames_and_names_by_popularity(self):
+        """
+        Test that usernames and any part of a name match, most followed
+        first, and that matching ignores case.
+        """
+        self.assertEqual(
+            self.complete('AN'), ['bertil', 'anders', 'annika'])
+        self.assertEqual(self.complete('bertil ann'), ['bertil'])
+        self.assertEqual(self.complete('x'), [])
+        self.assertEqual(self.complete(''), [])
+        row = self.client.get('/profiles/autocomplete/?q=bert').data[0]
+        self.assertEqual(row['id'], self.users['bertil'].profile.id)
+        self.assertEqual(row['name'], 'Bertil Annersson')
+        self.assertEqual(row['followers_count'], 2)
+
+    def test_served_without_queries(self):
+        """
+        Test that a loaded index answers without querying.
+        """
+        self.complete('a')
+        with self.assertNumQueries(0):
+            self.complete('ann')
+
+    def test_follows_and_renames_update_the_index(self):
+        """
+        Test that follows re-rank the matches and that username and name
+        changes are picked up.
+        """
+        self.complete('a')
+        for owner in ('bertil', 'cecilia'):
+            Follower.objects.create(
+                owner=self.users[owner], followed=self.users['annika'])
+        Follower.objects.create(
+            owner=self.users['anders'], followed=self.users['annika'])
+        self.assertEqual(
+            self.complete('an'), ['annika', 'bertil', 'anders'])
+
+        user = self.users['anders']
+        user.username = 'dag'
+        user.save()
+        profile = Profile.objects.get(owner=self.users['annika'])
+        profile.name = 'Cilla'
+        profile.save()
+        self.assertEqual(self.complete('an'), ['annika', 'bertil'])
+        self.assertEqual(self.complete('c'), ['annika', 'cecilia'])
+        self.assertEqual(self.complete('da'), ['dag'])
+
+        self.users['bertil'].delete()
+        self.assertEqual(self.complete('an'), ['annika'])
+
+    @override_settings(PROFILE_AUTOCOMPLETE_MEMO_MATCHES=0)
+    def test_memoized_results_follow_changes(self):
+        """
+        Test that a kept result is dropped when a matching profile changes,
+        and kept when an unrelated one does.
+        """
+        self.complete('an')
+        self.assertIn(
+            ('an', settings.PROFILE_AUTOCOMPLETE_LIMIT), prefix_index.memo)
+        profile = self.users['cecilia'].profile
+        profile.name = 'Cecilia'
+        profile.save()
+        self.assertIn(
+            ('an', settings.PROFILE_AUTOCOMPLETE_LIMIT), prefix_index.memo)
+        profile.name = 'Anna'
+        profile.save()
+        self.assertEqual(
+            self.complete('an'), ['bertil', 'anders', 'annika', 'cecilia'])
+
+
+@override_settings(PROFILE_INDEX_CACHE=None)
+class ProfileAutocompleteQueryTests(ProfileAutocompleteTests):
+    """
+    The autocomplete tests without a shared cache, when the profiles are
+    matched with a query instead of the prefix index.
+    """
+
+    def test_served_without_queries(self):
+        """
+        Test that the index is not loaded and each lookup is one query.
+        """
+        with self.assertNumQueries(1):
+            self.complete('ann')
+        self.assertEqual(prefix_index.profiles, {})
+
+    @override_settings(PROFILE_AUTOCOMPLETE_MEMO_MATCHES=0)
+    def test_memoized_results_follow_changes(self):
+        """
+        Test that nothing is kept between lookups.
+        """
+        self.complete('an')
+        self.assertEqual(prefix_index.memo, {})
+        profile = self.users['cecilia'].profile
+        profile.name = 'Anna'
+        profile.save()
+        self.assertEqual(
+            self.complete('an'), ['bertil', 'anders', 'annika', 'cecilia'])
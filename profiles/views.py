@@ -1,7 +1,16 @@
-from django.db.models import Count
-from rest_framework import generics, filters
-from django_filters.rest_framework import DjangoFilterBackend
+from asgiref.sync import sync_to_async
+from django.db.models import Exists, OuterRef, Subquery
+from rest_framework import generics, filters, permissions
+from rest_framework.response import Response
+from followers.filters import FollowGraphFilter
+from followers.graph import follow_graph, suggest_follows
+from followers.models import Follower
+from tt_drf_api.async_views import AsyncReadMixin
+from tt_drf_api.cache import AnonymousResponseCacheMixin
+from tt_drf_api.conditional import ConditionalRetrieveMixin
+from tt_drf_api.fieldsets import SparseFieldsetViewMixin
 from tt_drf_api.permissions import IsOwnerOrReadOnly
+from .autocomplete import autocomplete
 from .models import Profile
 from .serializers import ProfileSerializer
 
@@ -11,35 +20,41 @@ Views for the Profiles app.
 This module provides API views for managing user profiles. It allows users
 to retrieve a list of profiles, view detailed information about a specific
 profile, and update their own profile. The views include support for filtering,
-ordering, and permissions to ensure secure access control.
+ordering, and permissions to ensure secure access control. Both views can
+serve reads asynchronously, see tt_drf_api.async_views.
 
 Classes:
-    - ProfileList: Provides a list of user profiles, including aggregated
-      counts for recipes, followers, and following. Supports filtering and
-      ordering by various profile attributes.
+    - ProfileList: Provides a list of user profiles, including the stored
+      counts of published recipes, followers, and following. Supports
+      filtering and ordering by various profile attributes.
     - ProfileDetail: Allows retrieval and updating of a specific profile.
-      Updates are restricted to the profile owner via permissions.
+      Updates are restricted to the profile owner via permissions, and
+      unchanged profiles are answered with 304 Not Modified.
+    - ProfileSuggestionList: Suggests profiles to follow from the follow
+      graph index, see followers.graph.
+    - ProfileAutocomplete: Completes usernames and names from the prefix
+      index, see profiles.autocomplete.
 """
 
 
-class ProfileList(generics.ListAPIView):
+class ProfileList(
+        AnonymousResponseCacheMixin, AsyncReadMixin, SparseFieldsetViewMixin,
+        generics.ListAPIView):
     """
-    API view to retrieve a list of profiles.
+    API view to retrieve a list of profiles. Responses to anonymous
+    requests are cached.
     """
-    queryset = Profile.objects.annotate(
-        recipes_count=Count('owner__recipe', distinct=True),
-        followers_count=Count('owner__followed', distinct=True),
-        following_count=Count('owner__following', distinct=True)
-    ).order_by('-created_at')
+    cache_namespace = 'profiles'
+    queryset = Profile.objects.order_by('-created_at')
     serializer_class = ProfileSerializer
     filter_backends = [
+        FollowGraphFilter,
         filters.OrderingFilter,
-        DjangoFilterBackend,
-    ]
-    filterset_fields = [
-        'owner__following__followed__profile',
-        'owner__followed__owner__profile',
     ]
+    follow_graph_filters = {
+        'owner__following__followed__profile': 'followers',
+        'owner__followed__owner__profile': 'following',
+    }
     ordering_fields = [
         'recipes_count',
         'followers_count',
@@ -48,16 +63,114 @@ class ProfileList(generics.ListAPIView):
         'owner__followed__created_at',
     ]
 
+    def get_queryset(self):
+        return ProfileSerializer.setup_eager_loading(
+            super().get_queryset(), fields=self.get_fieldset()
+        )
+
 
-class ProfileDetail(generics.RetrieveUpdateAPIView):
+class ProfileDetail(
+        ConditionalRetrieveMixin, AsyncReadMixin, SparseFieldsetViewMixin,
+        generics.RetrieveUpdateAPIView):
     """
     API view to retrieve or update a specific profile.
     """
     permission_classes = [IsOwnerOrReadOnly]
-    # queryset = Profile.objects.all()
-    queryset = Profile.objects.annotate(
-        recipes_count=Count('owner__recipe', distinct=True),
-        followers_count=Count('owner__followed', distinct=True),
-        following_count=Count('owner__following', distinct=True)
-    ).order_by('-created_at')
+    queryset = Profile.objects.all()
+    serializer_class = ProfileSerializer
+
+    def get_queryset(self):
+        return ProfileSerializer.setup_eager_loading(
+            super().get_queryset(), fields=self.get_fieldset()
+        )
+
+    def reads_relations(self):
+        # Without the follow graph the relations are read with the row.
+        return (
+            not follow_graph.enabled and self.request.user.is_authenticated
+        )
+
+    @property
+    def validator_fields(self):
+        fields = (
+            'updated_at', 'recipes_count', 'followers_count',
+            'following_count', 'owner',
+        )
+        if self.reads_relations():
+            fields += ('viewer_following_id', 'viewer_follows_you')
+        return fields
+
+    def get_validator_queryset(self):
+        queryset = super().get_validator_queryset()
+        if not self.reads_relations():
+            return queryset
+        user_id = self.request.user.pk
+        return queryset.annotate(
+            viewer_following_id=Subquery(Follower.objects.filter(
+                owner_id=user_id, followed=OuterRef('owner')
+            ).values('id')[:1]),
+            viewer_follows_you=Exists(Follower.objects.filter(
+                owner=OuterRef('owner'), followed_id=user_id
+            )),
+        )
+
+    def get_validators(self):
+        if self.request.user.is_authenticated:
+            follow_graph.sync()
+        return super().get_validators()
+
+    async def aget_validators(self):
+        if self.request.user.is_authenticated:
+            await sync_to_async(follow_graph.sync)()
+        return await super().aget_validators()
+
+    def make_validators(self, row):
+        """
+        Add the follow relations between the logged-in user and the
+        profile's owner, which are part of the response.
+        """
+        if row is not None and follow_graph.enabled:
+            row = (*row, *follow_graph.relation(self.request.user.pk, row[-1]))
+        return super().make_validators(row)
+
+
+class ProfileSuggestionList(generics.ListAPIView):
+    """
+    API view listing the profiles followed most by the people the
+    logged-in user follows, with that number as 'followed_by_count'.
+    """
+    permission_classes = [permissions.IsAuthenticated]
     serializer_class = ProfileSerializer
+    pagination_class = None
+
+    def list(self, request, *args, **kwargs):
+        suggestions = suggest_follows(request.user.pk)
+        profiles = {
+            profile.owner_id: profile
+            for profile in ProfileSerializer.setup_eager_loading(
+                Profile.objects.filter(
+                    owner_id__in=[pk for pk, _ in suggestions]
+                )
+            )
+        }
+        ranked = [
+            (profiles[pk], count) for pk, count in suggestions
+            if pk in profiles
+        ]
+        data = self.get_serializer(
+            [profile for profile, _ in ranked], many=True
+        ).data
+        for row, (_, count) in zip(data, ranked):
+            row['followed_by_count'] = count
+        return Response(data)
+
+
+class ProfileAutocomplete(generics.GenericAPIView):
+    """
+    API view returning the most followed profiles whose username or name
+    starts with the 'q' query parameter.
+    """
+    pagination_class = None
+
+    def get(self, request, *args, **kwargs):
+        return Response(autocomplete(request.query_params.get('q', '')))
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class RecipesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recipes'
+
+    def ready(self):
+        # Connects the search document, ingredient index, trending score
+        # and vocabulary cache signal handlers
+        from . import (  # noqa: F401
+            ingredient_index, search, trending, vocabulary,
+        )
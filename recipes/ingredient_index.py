@@ -0,0 +1,184 @@
+import heapq
+from array import array
+from bisect import bisect_left, insort
+from itertools import groupby
+from operator import itemgetter
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from .models import IngredientPosting, Recipe, RecipeIngredient
+from .signals import recipes_status_changed
+
+"""
+Inverted index from ingredients to published recipes.
+
+Every IngredientPosting holds the sorted ids of the published recipes
+using that ingredient, one entry per RecipeIngredient row. Answering
+"which recipes can I cook with these ingredients" is then a k-way merge
+of a few sorted arrays, without touching the recipe table until the page
+of results is loaded.
+
+The postings are kept current by the signal handlers below: adding,
+changing or removing an ingredient row of a published recipe, and a
+recipe entering or leaving the published status.
+
+Functions:
+    - add_rows / remove_rows: Add or remove a recipe's rows from postings.
+    - batch_status_changed: The same for a batch of recipes.
+    - match_recipes: Rank recipes by how many rows the ingredients cover.
+    - build_postings: Compute every posting from scratch.
+"""
+
+
+def decode(blob):
+    ids = array('q')
+    ids.frombytes(bytes(blob))
+    return ids
+
+
+def encode(ids):
+    return ids.tobytes()
+
+
+def _update_postings(rows, add):
+    """
+    Insert or remove one entry per (recipe id, ingredient id) pair in
+    'rows', locking the postings so concurrent writers don't lose
+    updates. Postings are only created when adding.
+    """
+    rows = sorted(rows, key=itemgetter(1))
+    if not rows:
+        return
+    recipes = {
+        ingredient_id: [recipe_id for recipe_id, _ in group]
+        for ingredient_id, group in groupby(rows, key=itemgetter(1))
+    }
+    with transaction.atomic():
+        if add:
+            IngredientPosting.objects.bulk_create(
+                [IngredientPosting(ingredient_id=pk) for pk in recipes],
+                ignore_conflicts=True,
+            )
+        postings = list(
+            IngredientPosting.objects.select_for_update().filter(
+                ingredient_id__in=recipes
+            ).order_by('pk')
+        )
+        for posting in postings:
+            ids = decode(posting.recipe_ids)
+            for recipe_id in recipes[posting.pk]:
+                if add:
+                    insort(ids, recipe_id)
+                    continue
+                index = bisect_left(ids, recipe_id)
+                if index < len(ids) and ids[index] == recipe_id:
+                    ids.pop(index)
+            posting.recipe_ids = encode(ids)
+        IngredientPosting.objects.bulk_update(postings, ['recipe_ids'])
+
+
+def add_rows(recipe_id, ingredient_ids):
+    """
+    Add one entry per ingredient row of a published recipe.
+    """
+    _update_postings([(recipe_id, pk) for pk in ingredient_ids], add=True)
+
+
+def remove_rows(recipe_id, ingredient_ids):
+    """
+    Remove one entry per ingredient row. Never creates postings, so it is
+    safe to call while an ingredient is being deleted.
+    """
+    _update_postings([(recipe_id, pk) for pk in ingredient_ids], add=False)
+
+
+def match_recipes(ingredient_ids):
+    """
+    Return (recipe id, covered rows) pairs for every published recipe
+    using any of the ingredients, best matches first and newest first
+    among equal matches.
+    """
+    postings = IngredientPosting.objects.filter(
+        ingredient_id__in=ingredient_ids
+    ).values_list('recipe_ids', flat=True)
+    merged = heapq.merge(*(decode(blob) for blob in postings))
+    counts = [(pk, len(list(group))) for pk, group in groupby(merged)]
+    counts.sort(key=lambda item: (-item[1], -item[0]))
+    return counts
+
+
+def build_postings():
+    """
+    Return {ingredient id: sorted array} for all published recipes.
+    """
+    postings = {}
+    rows = RecipeIngredient.objects.filter(
+        recipe__status='published'
+    ).order_by('ingredient_id', 'recipe_id').values_list(
+        'ingredient_id', 'recipe_id'
+    )
+    for ingredient_id, recipe_id in rows.iterator(chunk_size=5000):
+        postings.setdefault(ingredient_id, array('q')).append(recipe_id)
+    return postings
+
+
+def recipe_ingredient_saved(sender, instance, created, **kwargs):
+    previous = instance.previous_ingredient_id
+    if not created and previous == instance.ingredient_id:
+        return
+    if instance.recipe.status != 'published':
+        return
+    if not created and previous is not None:
+        remove_rows(instance.recipe_id, [previous])
+    add_rows(instance.recipe_id, [instance.ingredient_id])
+
+
+def recipe_ingredient_deleted(sender, instance, **kwargs):
+    remove_rows(instance.recipe_id, [instance.ingredient_id])
+
+
+def recipe_saved(sender, instance, created, **kwargs):
+    was_published = instance.previous_status == 'published'
+    is_published = instance.status == 'published'
+    if was_published == is_published or created:
+        return
+    ingredient_ids = list(
+        RecipeIngredient.objects.filter(
+            recipe_id=instance.pk
+        ).values_list('ingredient_id', flat=True)
+    )
+    if is_published:
+        add_rows(instance.pk, ingredient_ids)
+    else:
+        remove_rows(instance.pk, ingredient_ids)
+
+
+def batch_status_changed(sender, recipes, **kwargs):
+    """
+    Add or remove the rows of a batch of recipes that entered or left the
+    published status, one pass over the postings each way.
+    """
+    published = {
+        recipe.pk for recipe in recipes
+        if recipe.status == 'published'
+        and recipe.previous_status != 'published'
+    }
+    unpublished = {
+        recipe.pk for recipe in recipes
+        if recipe.previous_status == 'published'
+        and recipe.status != 'published'
+    }
+    rows = list(
+        RecipeIngredient.objects.filter(
+            recipe_id__in=published | unpublished
+        ).values_list('recipe_id', 'ingredient_id')
+    )
+    _update_postings([row for row in rows if row[0] in published], add=True)
+    _update_postings(
+        [row for row in rows if row[0] in unpublished], add=False
+    )
+
+
+post_save.connect(recipe_ingredient_saved, sender=RecipeIngredient)
+post_delete.connect(recipe_ingredient_deleted, sender=RecipeIngredient)
+post_save.connect(recipe_saved, sender=Recipe)
+recipes_status_changed.connect(batch_status_changed, sender=Recipe)
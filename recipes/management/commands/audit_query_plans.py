@@ -0,0 +1,147 @@
+import re
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from comments.models import Comment
+from followers.models import Follower
+from likes.models import Like
+from profiles.models import Profile
+from recipes.models import Ingredient, Recipe
+
+"""
+Management command to audit the query plans of the API endpoints.
+
+Every list and detail endpoint is requested once against the current
+database, the SQL it runs is captured, and the plan of each query is read
+with EXPLAIN. Plans that read a whole table or sort rows without an index
+are flagged:
+
+    - SQLite: 'SCAN <table>' without an index, and 'USE TEMP B-TREE'.
+    - PostgreSQL: 'Seq Scan' and 'Sort' nodes.
+
+PostgreSQL picks sequential scans for small tables even when an index
+exists, so run the audit against a database of realistic size.
+"""
+
+SQLITE_FLAGS = re.compile(r'\bSCAN (?!.*(USING|VIRTUAL TABLE))|TEMP B-TREE')
+POSTGRES_FLAGS = re.compile(r'Seq Scan|(^|->\s+)Sort\b')
+
+
+class Command(BaseCommand):
+    help = (
+        'EXPLAIN the queries run by each API endpoint and flag '
+        'sequential scans and sorts.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            help='Username to send the requests as. Anonymous by default.',
+        )
+
+    def handle(self, *args, **options):
+        client = Client(HTTP_HOST='localhost')
+        if options['user']:
+            try:
+                client.force_login(User.objects.get(username=options['user']))
+            except User.DoesNotExist:
+                raise CommandError(f'No user named {options["user"]}.')
+
+        flagged = 0
+        # Cached responses would run no queries at all.
+        with override_settings(RESPONSE_CACHE_TIMEOUT=0):
+            for path in self.get_paths(logged_in=bool(options['user'])):
+                flagged += self.audit(client, path, options['verbosity'])
+
+        style = self.style.WARNING if flagged else self.style.SUCCESS
+        self.stdout.write(style(f'{flagged} flagged plan lines.'))
+
+    def get_paths(self, logged_in):
+        """
+        Return the endpoints to audit, using the newest row of each table
+        for detail endpoints and filters.
+        """
+        recipe = Recipe.objects.filter(status='published').last()
+        profile = Profile.objects.last()
+        comment = Comment.objects.last()
+        like = Like.objects.last()
+        follower = Follower.objects.last()
+        ingredient = Ingredient.objects.last()
+
+        paths = [
+            '/recipes/',
+            '/recipes/?ordering=-likes_count',
+            '/recipes/?fields=*',
+            '/recipes/?search=a',
+            '/recipes/trending/',
+            '/profiles/',
+            '/profiles/?ordering=-followers_count',
+            '/comments/',
+            '/likes/',
+            '/followers/',
+        ]
+        if recipe:
+            paths += [
+                f'/recipes/{recipe.id}/', f'/comments/?recipe={recipe.id}',
+            ]
+        if profile:
+            paths += [
+                f'/profiles/{profile.id}/',
+                f'/recipes/?owner__profile={profile.id}',
+                f'/profiles/?owner__followed__owner__profile={profile.id}',
+                f'/profiles/{profile.id}/followers/?cursor=',
+                f'/profiles/{profile.id}/following/?cursor=',
+            ]
+        if comment:
+            paths.append(f'/comments/{comment.id}/')
+        if like:
+            paths.append(f'/likes/{like.id}/')
+        if follower:
+            paths.append(f'/followers/{follower.id}/')
+        if ingredient:
+            paths.append(f'/recipes/cook-with/?ingredients={ingredient.name}')
+        if logged_in:
+            paths += [
+                '/recipes/?status=pending_publish&status=pending_delete',
+                '/feed/',
+            ]
+        return paths
+
+    def audit(self, client, path, verbosity):
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(path)
+        self.stdout.write(
+            f'{path} -> {response.status_code}, {len(queries)} queries'
+        )
+
+        flagged = 0
+        for query in queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            plan = self.explain(sql)
+            issues = [line for line in plan if self.is_flagged(line)]
+            flagged += len(issues)
+            if issues or verbosity > 1:
+                self.stdout.write(f'  {sql[:160]}')
+                for line in (plan if verbosity > 1 else issues):
+                    write = self.style.WARNING if line in issues else str
+                    self.stdout.write(write(f'    {line}'))
+        return flagged
+
+    def explain(self, sql):
+        if connection.vendor == 'sqlite':
+            sql = f'EXPLAIN QUERY PLAN {sql}'
+        else:
+            sql = f'EXPLAIN {sql}'
+        with connection.cursor() as cursor:
+            cursor.execute(sql)
+            # SQLite plan rows are (id, parent, notused, detail).
+            return [str(row[-1]) for row in cursor.fetchall()]
+
+    def is_flagged(self, line):
+        if connection.vendor == 'sqlite':
+            return bool(SQLITE_FLAGS.search(line))
+        return bool(POSTGRES_FLAGS.search(line.strip()))
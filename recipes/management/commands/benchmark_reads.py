@@ -0,0 +1,138 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+from django.test import AsyncRequestFactory, RequestFactory
+from django.test.utils import override_settings
+from django.urls import resolve
+
+"""
+Management command to compare the sync and async read paths.
+
+Each path is requested '--requests' times, '--concurrency' at a time,
+against the current database:
+
+    - sync: the DRF view on a pool of '--threads' threads (by default
+      '--concurrency'), like gunicorn workers and threads.
+    - async: the AsyncReadMixin view on one event loop, each request with
+      its own sync thread, like an ASGI worker.
+
+'--latency' adds a delay to every query to imitate a remote database,
+which is where the async path is expected to keep up concurrency. The
+response cache is disabled. Requests are sent as '--user' when given.
+"""
+
+DEFAULT_PATHS = ['/recipes/', '/recipes/?fields=*', '/profiles/', '/comments/']
+HOST = 'localhost'
+
+
+class Command(BaseCommand):
+    help = 'Measure requests per second of the sync and async read views.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', default=DEFAULT_PATHS)
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=10)
+        parser.add_argument(
+            '--threads', type=int,
+            help='Threads serving the sync path. Defaults to --concurrency.',
+        )
+        parser.add_argument(
+            '--latency', type=float, default=0,
+            help='Milliseconds added to every query.',
+        )
+        parser.add_argument('--user', help='Username to send requests as.')
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f'No user named {options["user"]}.')
+        if options['latency']:
+            self.add_latency(options['latency'] / 1000)
+
+        with override_settings(RESPONSE_CACHE_TIMEOUT=0):
+            for path in options['paths']:
+                self.benchmark(path, user, options)
+
+    def add_latency(self, seconds):
+        def delay(execute, sql, params, many, context):
+            time.sleep(seconds)
+            return execute(sql, params, many, context)
+
+        def install(sender, connection, **kwargs):
+            connection.execute_wrappers.append(delay)
+
+        connection_created.connect(install, weak=False)
+        if connection.connection is not None:
+            install(None, connection)
+
+    def get_views(self, path):
+        match = resolve(path.split('?')[0])
+        view_class = getattr(match.func, 'view_class', None)
+        if view_class is None or not hasattr(view_class, 'adispatch'):
+            raise CommandError(f'{path} is not served by an async view.')
+        initkwargs = dict(match.func.view_initkwargs)
+        initkwargs.pop('async_reads', None)
+        return (
+            view_class.as_view(async_reads=False, **initkwargs),
+            view_class.as_view(async_reads=True, **initkwargs),
+            match.kwargs,
+        )
+
+    def benchmark(self, path, user, options):
+        sync_view, async_view, kwargs = self.get_views(path)
+        total = options['requests']
+        concurrency = options['concurrency']
+
+        def sync_request(_):
+            request = RequestFactory().get(path, HTTP_HOST=HOST)
+            if user is not None:
+                request._force_auth_user = user
+            response = sync_view(request, **kwargs)
+            response.render()
+            return response.status_code
+
+        async def async_request(semaphore):
+            async with semaphore, ThreadSensitiveContext():
+                request = AsyncRequestFactory().get(path)
+                request.META['HTTP_HOST'] = HOST
+                if user is not None:
+                    request._force_auth_user = user
+                response = await async_view(request, **kwargs)
+                await sync_to_async(response.render)()
+                return response.status_code
+
+        async def run_async():
+            semaphore = asyncio.Semaphore(concurrency)
+            return await asyncio.gather(
+                *(async_request(semaphore) for _ in range(total))
+            )
+
+        started = time.perf_counter()
+        threads = options['threads'] or concurrency
+        with ThreadPoolExecutor(threads) as executor:
+            statuses = list(executor.map(sync_request, range(total)))
+        sync_rate = total / (time.perf_counter() - started)
+
+        started = time.perf_counter()
+        statuses += asyncio.run(run_async())
+        async_rate = total / (time.perf_counter() - started)
+
+        # Worker threads leave their connections open.
+        connections.close_all()
+        failed = sum(1 for code in statuses if code >= 400)
+        line = (
+            f'{path}: sync {sync_rate:.1f} req/s, '
+            f'async {async_rate:.1f} req/s '
+            f'({async_rate / sync_rate:.2f}x)'
+        )
+        if failed:
+            line += f', {failed} failed responses'
+        self.stdout.write(line)
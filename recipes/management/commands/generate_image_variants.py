@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from profiles.models import Profile
+from recipes.models import Recipe
+from tt_drf_api.images import generate_variants, needs_variants
+
+"""
+Management command to generate missing image variants.
+
+Variants are made in the background after each upload, so this is only
+needed for images uploaded before the pipeline existed, or whose job
+failed. Images are processed one at a time in this process.
+"""
+
+MODELS = {Recipe: ('recipes',), Profile: ('profiles',)}
+
+
+class Command(BaseCommand):
+    help = 'Generate the resized variants of recipe and profile images.'
+
+    def handle(self, *args, **options):
+        generated = failed = 0
+        for model, namespaces in MODELS.items():
+            queryset = model.objects.only('pk', 'image', 'image_variants')
+            for instance in queryset.iterator():
+                if not needs_variants(instance):
+                    continue
+                try:
+                    generate_variants(model, instance.pk, namespaces)
+                except Exception as error:
+                    failed += 1
+                    self.stderr.write(
+                        f'{model._meta.label} {instance.pk}: {error}')
+                else:
+                    generated += 1
+        style = self.style.WARNING if failed else self.style.SUCCESS
+        self.stdout.write(style(
+            f'Generated variants for {generated} images, {failed} failed.'
+        ))
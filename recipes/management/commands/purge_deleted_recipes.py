@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from recipes.purge import purge_recipes, purgeable_recipes
+
+"""
+Management command to delete recipes left in 'pending_delete'.
+
+Run it periodically, e.g. nightly from a scheduler. Recipes are deleted
+once they have been pending deletion for RECIPE_PURGE_GRACE_DAYS, with
+their ingredient rows, likes, comments and feed entries removed in
+batches of '--batch-size' rows. The rows deleted per model and the
+throughput are reported.
+"""
+
+
+class Command(BaseCommand):
+    help = 'Delete recipes pending deletion for longer than the grace period.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-days', type=int,
+            default=settings.RECIPE_PURGE_GRACE_DAYS,
+            help='Days a recipe stays pending deletion before it is purged.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Rows deleted per statement.',
+        )
+        parser.add_argument(
+            '--recipes-per-transaction', type=int, default=50,
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only count the recipes due to be purged.',
+        )
+
+    def handle(self, *args, **options):
+        grace_days = options['grace_days']
+        if options['dry_run']:
+            count = purgeable_recipes(grace_days=grace_days).count()
+            self.stdout.write(f'{count} recipes are due to be purged.')
+            return
+
+        deleted, seconds = purge_recipes(
+            grace_days=grace_days,
+            batch_size=options['batch_size'],
+            recipes_per_transaction=options['recipes_per_transaction'],
+        )
+        for label, rows in sorted(deleted.items()):
+            self.stdout.write(f'{label}: {rows} rows')
+        total = sum(deleted.values())
+        rate = total / seconds if seconds else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Purged {deleted["recipes.Recipe"]} recipes, {total} rows in '
+            f'{seconds:.2f}s ({rate:.0f} rows/s).'
+        ))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from recipes.ingredient_index import build_postings, encode
+from recipes.models import IngredientPosting
+
+"""
+Management command to rebuild the ingredient inverted index.
+
+The postings are maintained incrementally, so this is only needed after
+writes that bypass the ORM signals, e.g. raw SQL or a restored backup.
+"""
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the ingredient to recipe inverted index from scratch.'
+
+    def handle(self, *args, **options):
+        postings = build_postings()
+        with transaction.atomic():
+            IngredientPosting.objects.all().delete()
+            IngredientPosting.objects.bulk_create([
+                IngredientPosting(ingredient_id=pk, recipe_ids=encode(ids))
+                for pk, ids in postings.items()
+            ], batch_size=500)
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {sum(len(ids) for ids in postings.values())} rows '
+            f'for {len(postings)} ingredients.'
+        ))
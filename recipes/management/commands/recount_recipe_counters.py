@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from comments.models import Comment
+from likes.models import Like
+from recipes.models import Recipe
+from tt_drf_api.counters import count_of, recount_counters
+
+"""
+Management command to reconcile the denormalized counters on Recipe.
+
+'likes_count' and 'comments_count' are kept by the Like and Comment
+signal handlers. This command recounts both from the like and comment
+tables and rewrites the recipes that disagree, see tt_drf_api.counters.
+"""
+
+
+def _actual_counts():
+    return {
+        'likes_count': count_of(Like.objects.all(), 'recipe'),
+        'comments_count': count_of(Comment.objects.all(), 'recipe'),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Recompute drifted likes_count and comments_count on recipes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Number of recipes checked per batch.',
+        )
+
+    def handle(self, *args, **options):
+        checked, fixed = recount_counters(
+            Recipe, _actual_counts, options['chunk_size']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Checked {checked} recipes, fixed {fixed} drifted counters.'
+        ))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from recipes.trending import update_scores
+
+"""
+Management command to update the trending recipe scores.
+
+Run it periodically, e.g. every 15 minutes from a scheduler. Each run only
+reads the likes and comments created since the previous one.
+"""
+
+
+class Command(BaseCommand):
+    help = 'Decay the trending scores and add recent likes and comments.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help='Recompute every score from the activity in the window.',
+        )
+
+    def handle(self, *args, **options):
+        updated, dropped = update_scores(rebuild=options['rebuild'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Updated {updated} trending scores, dropped {dropped}.'
+        ))
@@ -0,0 +1,134 @@
+# Generated by Django 4.2.16 on 2026-10-17 02:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+POSTGRES_FORWARD = [
+    """
+    ALTER TABLE recipes_recipesearchdocument
+    ADD COLUMN vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(ingredients, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(owner_name, '')), 'C')
+    ) STORED
+    """,
+    """
+    CREATE INDEX recipes_recipesearchdocument_vector_gin
+    ON recipes_recipesearchdocument USING gin (vector)
+    """,
+]
+
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS recipes_recipesearchdocument_vector_gin",
+    "ALTER TABLE recipes_recipesearchdocument DROP COLUMN IF EXISTS vector",
+]
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE recipes_recipesearch_fts USING fts5(
+        title, ingredients, owner_name,
+        content='recipes_recipesearchdocument',
+        content_rowid='recipe_id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER recipes_recipesearch_ai
+    AFTER INSERT ON recipes_recipesearchdocument BEGIN
+        INSERT INTO recipes_recipesearch_fts(
+            rowid, title, ingredients, owner_name)
+        VALUES (new.recipe_id, new.title, new.ingredients, new.owner_name);
+    END
+    """,
+    """
+    CREATE TRIGGER recipes_recipesearch_ad
+    AFTER DELETE ON recipes_recipesearchdocument BEGIN
+        INSERT INTO recipes_recipesearch_fts(
+            recipes_recipesearch_fts, rowid, title, ingredients, owner_name)
+        VALUES ('delete', old.recipe_id, old.title, old.ingredients,
+                old.owner_name);
+    END
+    """,
+    """
+    CREATE TRIGGER recipes_recipesearch_au
+    AFTER UPDATE ON recipes_recipesearchdocument BEGIN
+        INSERT INTO recipes_recipesearch_fts(
+            recipes_recipesearch_fts, rowid, title, ingredients, owner_name)
+        VALUES ('delete', old.recipe_id, old.title, old.ingredients,
+                old.owner_name);
+        INSERT INTO recipes_recipesearch_fts(
+            rowid, title, ingredients, owner_name)
+        VALUES (new.recipe_id, new.title, new.ingredients, new.owner_name);
+    END
+    """,
+]
+
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS recipes_recipesearch_au",
+    "DROP TRIGGER IF EXISTS recipes_recipesearch_ad",
+    "DROP TRIGGER IF EXISTS recipes_recipesearch_ai",
+    "DROP TABLE IF EXISTS recipes_recipesearch_fts",
+]
+
+
+def _run(schema_editor, statements):
+    for statement in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def create_search_index(apps, schema_editor):
+    _run(schema_editor, {
+        'postgresql': POSTGRES_FORWARD,
+        'sqlite': SQLITE_FORWARD,
+    })
+
+
+def drop_search_index(apps, schema_editor):
+    _run(schema_editor, {
+        'postgresql': POSTGRES_REVERSE,
+        'sqlite': SQLITE_REVERSE,
+    })
+
+
+def build_documents(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    RecipeSearchDocument = apps.get_model('recipes', 'RecipeSearchDocument')
+
+    ingredients = {}
+    for recipe_id, name in RecipeIngredient.objects.order_by('id').values_list(
+            'recipe_id', 'ingredient__name'):
+        ingredients.setdefault(recipe_id, []).append(name)
+
+    RecipeSearchDocument.objects.bulk_create([
+        RecipeSearchDocument(
+            recipe_id=recipe_id,
+            title=recipe_name,
+            owner_name=username,
+            ingredients=' '.join(ingredients.get(recipe_id, [])),
+        )
+        for recipe_id, recipe_name, username in Recipe.objects.values_list(
+            'id', 'recipe_name', 'owner__username')
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_recipe_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeSearchDocument',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='recipes.recipe')),
+                ('title', models.CharField(blank=True, max_length=255)),
+                ('ingredients', models.TextField(blank=True)),
+                ('owner_name', models.CharField(blank=True, max_length=150)),
+            ],
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(build_documents, migrations.RunPython.noop),
+    ]
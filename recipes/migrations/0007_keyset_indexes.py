@@ -0,0 +1,25 @@
+# Generated by Django 4.2.16 on 2026-10-17 02:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_recipe_search_document'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='recipe_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['status', '-likes_count', '-id'], name='recipe_status_likes_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['status', '-comments_count', '-id'], name='recipe_status_comments_idx'),
+        ),
+    ]
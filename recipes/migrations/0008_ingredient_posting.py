@@ -0,0 +1,41 @@
+# Generated by Django 4.2.16 on 2026-10-17 02:48
+
+from array import array
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_postings(apps, schema_editor):
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    IngredientPosting = apps.get_model('recipes', 'IngredientPosting')
+
+    postings = {}
+    rows = RecipeIngredient.objects.filter(
+        recipe__status='published'
+    ).order_by('ingredient_id', 'recipe_id').values_list(
+        'ingredient_id', 'recipe_id')
+    for ingredient_id, recipe_id in rows:
+        postings.setdefault(ingredient_id, array('q')).append(recipe_id)
+
+    IngredientPosting.objects.bulk_create([
+        IngredientPosting(ingredient_id=pk, recipe_ids=ids.tobytes())
+        for pk, ids in postings.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngredientPosting',
+            fields=[
+                ('ingredient', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='posting', serialize=False, to='recipes.ingredient')),
+                ('recipe_ids', models.BinaryField(default=bytes)),
+            ],
+        ),
+        migrations.RunPython(build_postings, migrations.RunPython.noop),
+    ]
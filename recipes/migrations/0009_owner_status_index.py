@@ -0,0 +1,17 @@
+# Generated by Django 4.2.16 on 2026-10-17 03:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_ingredient_posting'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['owner', 'status', '-created_at'], name='recipe_owner_status_idx'),
+        ),
+    ]
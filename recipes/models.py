@@ -1,5 +1,15 @@
+from collections import Counter
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import Greatest, Now
+from django.db.models.signals import post_save, post_delete
 from django.contrib.auth.models import User
+from profiles.models import adjust_profile_counter, adjust_profile_counters
+from tt_drf_api.cache import invalidate_on_change, invalidate_on_signal
+from tt_drf_api.images import (
+    forget_urls_on_change, generate_variants_on_save,
+)
+from .signals import recipes_status_changed
 
 """
 Models for the Recipe app.
@@ -11,6 +21,14 @@ This module defines the core models for the Recipe application, including:
   as the owner, recipe name, instructions, and publication status.
 - RecipeIngredient: Intermediate model connecting recipes to ingredients,
   storing details such as quantity and measurement.
+- RecipeSearchDocument: Pre-computed full-text search document for a recipe.
+- IngredientPosting: Inverted index from an ingredient to the published
+  recipes that use it.
+- TrendingScore: Time-decayed activity score of a recipe.
+
+The module also provides `adjust_recipe_counter`, used by the likes and
+comments apps to keep the denormalized counters on Recipe current, and
+keeps the owner's published 'recipes_count' on Profile current.
 
 Each model is designed to support the creation, management, and association
 of recipes and their components while maintaining flexibility for
@@ -43,6 +61,13 @@ class Recipe(models.Model):
     """
     Recipe model, related to 'owner', i.e. a User instance.
     Default image set so that we can always reference image.url.
+    'image_variants' records the resized copies of an uploaded image,
+    written by tt_drf_api.images.
+    'likes_count' and 'comments_count' are maintained by the Like and
+    Comment signal handlers, so listings don't need to aggregate.
+    'previous_status' is the status stored in the database when the
+    instance was loaded, refreshed or last saved, so save handlers can
+    detect status transitions.
     """
 
     STATUS_CHOICES = [
@@ -59,24 +84,79 @@ class Recipe(models.Model):
     image = models.ImageField(
         upload_to='images/', default='../default_profile_lpzfbh', blank=True
     )
+    image_variants = models.JSONField(default=dict, blank=True)
     status = models.CharField(
         max_length=20,
         choices=STATUS_CHOICES,
         default="pending_publish",
 
     )
+    likes_count = models.PositiveIntegerField(default=0)
+    comments_count = models.PositiveIntegerField(default=0)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination over published recipes
+            models.Index(
+                fields=['status', '-created_at', '-id'],
+                name='recipe_status_created_idx'),
+            models.Index(
+                fields=['status', '-likes_count', '-id'],
+                name='recipe_status_likes_idx'),
+            models.Index(
+                fields=['status', '-comments_count', '-id'],
+                name='recipe_status_comments_idx'),
+            # A profile's recipes and the owner's own drafts
+            models.Index(
+                fields=['owner', 'status', '-created_at'],
+                name='recipe_owner_status_idx'),
+        ]
 
     def __str__(self):
         return f'{self.id} {self.recipe_name}'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'status' in field_names:
+            instance._loaded_status = instance.status
+        return instance
+
+    @property
+    def previous_status(self):
+        return getattr(self, '_loaded_status', None)
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        if fields is None or 'status' in fields:
+            self._loaded_status = self.status
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._loaded_status = self.status
+
+
+def adjust_recipe_counter(recipe_id, field, delta):
+    """
+    Atomically add 'delta' to one of the counter columns on a Recipe.
+
+    The update is done with an F() expression so concurrent likes and
+    comments can't overwrite each other, and is clamped at zero so a
+    drifted counter never violates the positive constraint.
+    """
+    Recipe.objects.filter(pk=recipe_id).update(
+        **{field: Greatest(F(field) + delta, 0)}
+    )
+
 
 class RecipeIngredient(models.Model):
     """
     Intermediate model to store the relationship between Recipe and Ingredient,
     including the quantity and measurement.
+    'previous_ingredient_id' is the ingredient stored in the database when
+    the instance was loaded, refreshed or last saved, so save handlers can
+    detect a change.
     """
     recipe = models.ForeignKey(
         Recipe, on_delete=models.CASCADE, related_name='recipe_ingredients')
@@ -91,3 +171,134 @@ class RecipeIngredient(models.Model):
                 f'{self.quantity} {self.measure} of '
                 f'{self.ingredient} for {self.recipe}'
             )
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'ingredient_id' in field_names:
+            instance._loaded_ingredient_id = instance.ingredient_id
+        return instance
+
+    @property
+    def previous_ingredient_id(self):
+        return getattr(self, '_loaded_ingredient_id', None)
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        if fields is None or {'ingredient', 'ingredient_id'} & set(fields):
+            self._loaded_ingredient_id = self.ingredient_id
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._loaded_ingredient_id = self.ingredient_id
+
+
+class RecipeSearchDocument(models.Model):
+    """
+    Pre-computed search document for a recipe, kept current by the
+    handlers in recipes.search.
+
+    The text columns are the weighted parts of the document. The search
+    index itself is created by migration for the active database: a
+    generated 'vector' tsvector column with a GIN index on PostgreSQL, and
+    an FTS5 table kept in sync by triggers on SQLite.
+    """
+    recipe = models.OneToOneField(
+        Recipe, on_delete=models.CASCADE, primary_key=True,
+        related_name='search_document')
+    title = models.CharField(max_length=255, blank=True)
+    ingredients = models.TextField(blank=True)
+    owner_name = models.CharField(max_length=150, blank=True)
+
+    def __str__(self):
+        return f'Search document for {self.recipe_id}'
+
+
+class IngredientPosting(models.Model):
+    """
+    Inverted index entry for one ingredient, maintained by the handlers in
+    recipes.ingredient_index.
+
+    'recipe_ids' is a packed, sorted array of 64-bit recipe ids, with one
+    entry per RecipeIngredient row of a published recipe.
+    """
+    ingredient = models.OneToOneField(
+        Ingredient, on_delete=models.CASCADE, primary_key=True,
+        related_name='posting')
+    recipe_ids = models.BinaryField(default=bytes)
+
+    def __str__(self):
+        return f'Posting for {self.ingredient_id}'
+
+
+class TrendingScore(models.Model):
+    """
+    Time-decayed like and comment activity of a recipe, materialized by
+    the update_trending_scores command, see recipes.trending.
+
+    Only published recipes have a score. 'computed_at' is when 'score'
+    was last decayed to.
+    """
+    recipe = models.OneToOneField(
+        Recipe, on_delete=models.CASCADE, primary_key=True,
+        related_name='trending')
+    score = models.FloatField(default=0)
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            # Scanned in order by the trending list
+            models.Index(
+                fields=['-score', '-recipe'], name='trending_score_idx'),
+        ]
+
+    def __str__(self):
+        return f'Trending score for {self.recipe_id}'
+
+
+def touch_recipe(sender, instance, **kwargs):
+    """
+    Bump the recipe's updated_at when one of its ingredient rows changes,
+    since the rows are part of the recipe's representation.
+    """
+    Recipe.objects.filter(pk=instance.recipe_id).update(updated_at=Now())
+
+
+def count_published_recipe(sender, instance, created, **kwargs):
+    was_published = instance.previous_status == 'published'
+    is_published = instance.status == 'published'
+    if was_published != is_published:
+        adjust_profile_counter(
+            instance.owner_id, 'recipes_count', 1 if is_published else -1
+        )
+
+
+def uncount_deleted_recipe(sender, instance, **kwargs):
+    if instance.status == 'published':
+        adjust_profile_counter(instance.owner_id, 'recipes_count', -1)
+
+
+def count_published_recipes(sender, recipes, **kwargs):
+    """
+    `count_published_recipe` for a batch of status changes.
+    """
+    deltas = Counter()
+    for recipe in recipes:
+        was_published = recipe.previous_status == 'published'
+        is_published = recipe.status == 'published'
+        if was_published != is_published:
+            deltas[recipe.owner_id] += 1 if is_published else -1
+    adjust_profile_counters('recipes_count', deltas)
+
+
+post_save.connect(touch_recipe, sender=RecipeIngredient)
+post_delete.connect(touch_recipe, sender=RecipeIngredient)
+
+post_save.connect(count_published_recipe, sender=Recipe)
+post_delete.connect(uncount_deleted_recipe, sender=Recipe)
+recipes_status_changed.connect(count_published_recipes, sender=Recipe)
+invalidate_on_change(Recipe, 'recipes', 'profiles')
+invalidate_on_signal(recipes_status_changed, Recipe, 'recipes', 'profiles')
+invalidate_on_change(RecipeIngredient, 'recipes')
+generate_variants_on_save(Recipe, 'recipes')
+forget_urls_on_change(Recipe)
@@ -0,0 +1,63 @@
+from collections import defaultdict
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from .models import Recipe
+from .signals import recipes_status_changed
+
+"""
+Bulk status changes of recipes by staff.
+
+Saving recipes one by one runs every post_save handler per recipe. Here
+the requested statuses are checked against the recipes' current ones,
+applied with one UPDATE per target status, and announced with a single
+recipes_status_changed signal, so the ingredient index, feeds, trending
+scores and response caches each handle the whole batch at once.
+
+Functions:
+    - change_statuses: Applies {recipe id: status} and reports the result.
+"""
+
+
+def change_statuses(transitions):
+    """
+    Set each recipe in 'transitions', {recipe id: valid status}, to its
+    status. Raises a ValidationError, without changing anything, if a
+    recipe does not exist. Returns ({status: [changed recipe ids]},
+    [unchanged recipe ids]).
+    """
+    with transaction.atomic():
+        recipes = list(
+            Recipe.objects.select_for_update()
+            .filter(pk__in=transitions)
+            .only('id', 'owner_id', 'created_at', 'status')
+            .order_by('pk')
+        )
+        missing = set(transitions) - {recipe.pk for recipe in recipes}
+        if missing:
+            raise ValidationError({'transitions': [
+                'Unknown recipes: '
+                f'{", ".join(str(pk) for pk in sorted(missing))}.'
+            ]})
+
+        changed = [
+            recipe for recipe in recipes
+            if recipe.status != transitions[recipe.pk]
+        ]
+        by_status = defaultdict(list)
+        for recipe in changed:
+            recipe.status = transitions[recipe.pk]
+            by_status[recipe.status].append(recipe.pk)
+
+        now = timezone.now()
+        for status, pks in by_status.items():
+            Recipe.objects.filter(pk__in=pks).update(
+                status=status, updated_at=now
+            )
+        if changed:
+            recipes_status_changed.send(sender=Recipe, recipes=changed)
+        for recipe in changed:
+            recipe._loaded_status = recipe.status
+
+    unchanged = [recipe.pk for recipe in recipes if recipe not in changed]
+    return dict(by_status), unchanged
@@ -0,0 +1,106 @@
+import time
+from collections import Counter
+from datetime import timedelta
+from django.conf import settings
+from django.db import models, router, transaction
+from django.utils import timezone
+from tt_drf_api.cache import bump_versions
+from .models import Recipe
+
+"""
+Purge of recipes marked for deletion.
+
+Recipes in 'pending_delete' whose last change is older than
+RECIPE_PURGE_GRACE_DAYS are deleted for good. Instead of Django's
+collector, which loads every related row into memory and sends a signal
+per row, the rows that cascade from a recipe are found from the model
+relations, e.g. ingredient rows, likes, comments and feed entries, and
+deleted with raw DELETE statements of at most 'batch_size' rows, children
+before parents.
+
+Raw deletes send no signals. The counters maintained by those signals
+live on the recipe itself, and a recipe is taken out of the ingredient
+index, the trending scores and feeds' fan-out when it leaves the
+published status, so only the response caches need to be invalidated.
+
+Each group of recipes is purged in its own transaction, so an interrupted
+purge is picked up by the next run.
+
+Functions:
+    - purgeable_recipes: Recipes due to be purged.
+    - purge_recipes: Deletes them in batches and counts the rows.
+"""
+
+
+def purgeable_recipes(now=None, grace_days=None):
+    if grace_days is None:
+        grace_days = settings.RECIPE_PURGE_GRACE_DAYS
+    cutoff = (now or timezone.now()) - timedelta(days=grace_days)
+    return Recipe.objects.filter(
+        status='pending_delete', updated_at__lt=cutoff
+    )
+
+
+def cascade_relations(model):
+    """
+    Return the (model, field name) of the relations whose rows have to be
+    deleted together with rows of 'model'.
+    """
+    relations = []
+    for relation in model._meta.related_objects:
+        if relation.many_to_many or relation.on_delete is models.DO_NOTHING:
+            continue
+        if relation.on_delete is not models.CASCADE:
+            raise ValueError(
+                f'Cannot purge {model._meta.label}: '
+                f'{relation.related_model._meta.label}.{relation.field.name} '
+                f'uses {relation.on_delete.__name__}.'
+            )
+        relations.append((relation.related_model, relation.field.name))
+    return relations
+
+
+def purge_rows(model, pks, batch_size, deleted):
+    """
+    Delete the rows of 'model' with primary keys 'pks' and everything
+    that cascades from them, 'batch_size' rows per statement. Adds the
+    number of deleted rows per model to the 'deleted' Counter.
+    """
+    for related_model, field in cascade_relations(model):
+        children = related_model._base_manager.filter(
+            **{f'{field}__in': pks}
+        ).order_by().values_list('pk', flat=True)
+        while True:
+            batch = list(children[:batch_size])
+            if not batch:
+                break
+            purge_rows(related_model, batch, batch_size, deleted)
+
+    using = router.db_for_write(model)
+    for start in range(0, len(pks), batch_size):
+        rows = model._base_manager.filter(pk__in=pks[start:start + batch_size])
+        deleted[model._meta.label] += rows._raw_delete(using)
+
+
+def purge_recipes(
+        now=None, grace_days=None, batch_size=1000,
+        recipes_per_transaction=50):
+    """
+    Purge the recipes due, 'recipes_per_transaction' at a time. Returns
+    (Counter of deleted rows per model label, seconds taken).
+    """
+    started = time.monotonic()
+    deleted = Counter()
+    queryset = purgeable_recipes(now, grace_days).order_by('pk')
+    while True:
+        with transaction.atomic():
+            pks = list(
+                queryset.select_for_update()
+                .values_list('pk', flat=True)[:recipes_per_transaction]
+            )
+            if not pks:
+                break
+            purge_rows(Recipe, pks, batch_size, deleted)
+    if deleted:
+        bump_versions('recipes', 'profiles')
+    return deleted, time.monotonic() - started
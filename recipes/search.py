@@ -0,0 +1,160 @@
+import re
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_save, post_delete
+from rest_framework import filters
+from rest_framework.settings import api_settings
+from .models import Ingredient, Recipe, RecipeIngredient, RecipeSearchDocument
+
+"""
+Full-text search for recipes.
+
+Each recipe has a RecipeSearchDocument holding its weighted search text:
+the recipe name (weight A), its ingredient names (B) and the owner's
+username (C). The database keeps the actual index: a generated tsvector
+column with a GIN index on PostgreSQL, and an FTS5 table on SQLite (DEV).
+
+The signal handlers in this module update only the part of a document
+that changed, and RecipeSearchFilter serves ranked results from the index
+instead of `icontains` scans across joins.
+
+Functions:
+    - index_recipe: Refreshes the title and owner part of a document.
+    - index_recipe_ingredients: Refreshes the ingredient part of a document.
+    - search_terms: Splits a search string into safe query terms.
+
+Classes:
+    - RecipeSearchFilter: DRF filter backend for the `search` parameter.
+"""
+
+SQLITE_TABLE = 'recipes_recipesearch_fts'
+DOCUMENT_TABLE = RecipeSearchDocument._meta.db_table
+RECIPE_TABLE = Recipe._meta.db_table
+
+
+def search_terms(search):
+    """
+    Return the word tokens of a search string. Everything else is dropped,
+    so the terms can be embedded in tsquery and FTS5 query syntax.
+    """
+    return re.findall(r'\w+', search.lower())
+
+
+def index_recipe(recipe):
+    """
+    Create or refresh the title and owner part of a recipe's document.
+    """
+    RecipeSearchDocument.objects.update_or_create(
+        recipe_id=recipe.pk,
+        defaults={
+            'title': recipe.recipe_name,
+            'owner_name': recipe.owner.username,
+        },
+    )
+
+
+def index_recipe_ingredients(recipe_id):
+    """
+    Refresh the ingredient part of a recipe's document. Only updates an
+    existing document, so it is safe to call while the recipe itself is
+    being deleted.
+    """
+    names = RecipeIngredient.objects.filter(
+        recipe_id=recipe_id
+    ).order_by('id').values_list('ingredient__name', flat=True)
+    RecipeSearchDocument.objects.filter(recipe_id=recipe_id).update(
+        ingredients=' '.join(names)
+    )
+
+
+def recipe_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields and not {'recipe_name', 'owner'} & set(update_fields):
+        return
+    index_recipe(instance)
+
+
+def recipe_ingredient_changed(sender, instance, **kwargs):
+    index_recipe_ingredients(instance.recipe_id)
+
+
+def ingredient_saved(sender, instance, created, **kwargs):
+    if created:
+        return
+    recipe_ids = RecipeIngredient.objects.filter(
+        ingredient=instance
+    ).values_list('recipe_id', flat=True).distinct()
+    for recipe_id in recipe_ids:
+        index_recipe_ingredients(recipe_id)
+
+
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    # Logins save only 'last_login', skip those.
+    if created or (update_fields and 'username' not in update_fields):
+        return
+    RecipeSearchDocument.objects.filter(
+        recipe__owner=instance
+    ).exclude(owner_name=instance.username).update(
+        owner_name=instance.username
+    )
+
+
+post_save.connect(recipe_saved, sender=Recipe)
+post_save.connect(recipe_ingredient_changed, sender=RecipeIngredient)
+post_delete.connect(recipe_ingredient_changed, sender=RecipeIngredient)
+post_save.connect(ingredient_saved, sender=Ingredient)
+post_save.connect(user_saved, sender=User)
+
+
+def _match_sql(terms):
+    """
+    Return the SQL matching recipe ids, the SQL ranking the current recipe
+    row and the query parameter, for the active database.
+    """
+    if connection.vendor == 'postgresql':
+        query = ' & '.join(f'{term}:*' for term in terms)
+        match = (
+            f"SELECT recipe_id FROM {DOCUMENT_TABLE} "
+            f"WHERE vector @@ to_tsquery('simple', %s)"
+        )
+        rank = (
+            f"SELECT ts_rank(vector, to_tsquery('simple', %s)) "
+            f"FROM {DOCUMENT_TABLE} "
+            f"WHERE recipe_id = {RECIPE_TABLE}.id"
+        )
+    else:
+        query = ' '.join(f'"{term}"*' for term in terms)
+        match = (
+            f"SELECT rowid FROM {SQLITE_TABLE} "
+            f"WHERE {SQLITE_TABLE} MATCH %s"
+        )
+        # bm25() is lower for better matches; the weights follow the
+        # A/B/C weights used on PostgreSQL.
+        rank = (
+            f"SELECT -bm25({SQLITE_TABLE}, 10.0, 4.0, 1.0) "
+            f"FROM {SQLITE_TABLE} "
+            f"WHERE {SQLITE_TABLE} MATCH %s "
+            f"AND rowid = {RECIPE_TABLE}.id"
+        )
+    return match, rank, query
+
+
+class RecipeSearchFilter(filters.BaseFilterBackend):
+    """
+    Filters recipes by the `search` query parameter using the full-text
+    index, ordered by relevance. Place it before OrderingFilter so an
+    explicit `ordering` parameter still wins.
+    """
+    search_param = api_settings.SEARCH_PARAM
+
+    def filter_queryset(self, request, queryset, view):
+        terms = search_terms(request.query_params.get(self.search_param, ''))
+        if not terms:
+            return queryset
+
+        match, rank, query = _match_sql(terms)
+        return queryset.filter(
+            id__in=RawSQL(match, (query,))
+        ).annotate(
+            search_rank=RawSQL(rank, (query,))
+        ).order_by('-search_rank', '-created_at')
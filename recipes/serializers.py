@@ -1,6 +1,16 @@
+from collections import Counter
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from rest_framework import serializers
+from .ingredient_index import add_rows, remove_rows
 from .models import Recipe, Measurement, Ingredient, RecipeIngredient
+from .search import index_recipe_ingredients
+from .vocabulary import ingredients, measurements
 from likes.models import Like
+from tt_drf_api.fieldsets import SparseFieldsMixin
+from tt_drf_api.images import ImageURLField, variant_urls
+from tt_drf_api.uploads import ImageUploadSerializerMixin
+from tt_drf_api.viewer import ViewerListSerializer, ViewerSerializerMixin
 
 
 class MeasurementSerializer(serializers.ModelSerializer):
@@ -23,7 +33,8 @@ class IngredientSerializer(serializers.ModelSerializer):
         fields = ['id', 'name']
 
 
-class RecipeIngredientSerializer(serializers.ModelSerializer):
+class RecipeIngredientSerializer(
+        ViewerSerializerMixin, serializers.ModelSerializer):
     """
     Serializer for the RecipeIngredient model.
     - Handles the nesting of ingredient and measurement data.
@@ -47,12 +58,23 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
             ingredient and measurement.
         - `create`: Creates a new RecipeIngredient instance.
         - `update`: Updates an existing RecipeIngredient instance.
+        - `setup_eager_loading`: Applies the joins needed to serialize a
+            queryset of ingredient rows.
     """
     ingredient = serializers.CharField()  # Accept ingredient name as a string
     measure = serializers.CharField()  # Accept measure name as a string
     owner = serializers.ReadOnlyField(source='recipe.owner.username')
     is_owner = serializers.SerializerMethodField()
 
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        """
+        Select the recipe owner, ingredient and measurement with each row.
+        """
+        return queryset.select_related(
+            'recipe__owner', 'ingredient', 'measure'
+        )
+
     def get_is_owner(self, obj):
         """
         Determines if the logged-in user is the owner of the recipe.
@@ -65,8 +87,7 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
             bool: True if the user owns the recipe, False otherwise.
         """
         if isinstance(obj, RecipeIngredient):
-            request = self.context['request']
-            return request.user == obj.recipe.owner
+            return self.viewer.is_owner(obj.recipe.owner_id)
         return False
 
     def validate(self, data):
@@ -93,16 +114,11 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
                 "You are not authorized to modify this recipe."
             )
 
-        # Convert ingredient and measurement names to instances
-        ingredient_name = data.get('ingredient')
-        measure_name = data.get('measure')
-
-        ingredient, _ = Ingredient.objects.get_or_create(name=ingredient_name)
-        measure, _ = Measurement.objects.get_or_create(measure=measure_name)
-
-        # Replace string data with instances
-        data['ingredient'] = ingredient
-        data['measure'] = measure
+        # Replace ingredient and measurement names with instances
+        if 'ingredient' in data:
+            data['ingredient'] = ingredients.get(data['ingredient'])
+        if 'measure' in data:
+            data['measure'] = measurements.get(data['measure'])
 
         return data
 
@@ -129,22 +145,7 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
         Returns:
             RecipeIngredient: The updated instance.
         """
-        # Handle updates for nested fields
-        if 'ingredient' in validated_data:
-            ingredient_name = validated_data.pop('ingredient')
-            ingredient, _ = Ingredient.objects.get_or_create(
-                name=ingredient_name
-                )
-            instance.ingredient = ingredient
-
-        if 'measure' in validated_data:
-            measure_name = validated_data.pop('measure')
-            measure, _ = Measurement.objects.get_or_create(
-                measure=measure_name
-                )
-            instance.measure = measure
-
-        # Update other fields
+        # Update all fields, validate() already resolved the names
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
 
@@ -157,9 +158,31 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
             'id', 'recipe', 'ingredient', 'quantity', 'measure',
             'is_owner', 'owner'
             ]
+        list_serializer_class = ViewerListSerializer
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class NestedRecipeIngredientSerializer(RecipeIngredientSerializer):
+    """
+    Serializer for the ingredient rows written together with a recipe.
+    - The recipe comes from the parent serializer, so it is read-only.
+    - Names are kept as strings here; RecipeSerializer resolves all of them
+      at once when the rows are saved.
+    - `id` is optional and identifies an existing row to update.
+    """
+    id = serializers.IntegerField(required=False)
+    ingredient = serializers.CharField(max_length=255)
+    measure = serializers.CharField(max_length=50)
+
+    def validate(self, data):
+        return data
+
+    class Meta(RecipeIngredientSerializer.Meta):
+        read_only_fields = ['recipe']
+
+
+class RecipeSerializer(
+        SparseFieldsMixin, ImageUploadSerializerMixin, ViewerSerializerMixin,
+        serializers.ModelSerializer):
     """
     Serializer for the Recipe model.
     - Provides detailed representation of recipe data.
@@ -170,31 +193,59 @@ class RecipeSerializer(serializers.ModelSerializer):
         - `id`: Unique identifier for the recipe.
         - `recipe_name`: Name of the recipe.
         - `image`: Recipe image (optional).
+        - `image_variants`: URLs of the thumb, card and full size copies
+            of the image, or null until they are generated.
         - `intro`: Short introduction or description of the recipe.
         - `instruction`: Detailed instructions for the recipe.
         - `owner`: Username of the recipe owner.
         - `profile_id`: ID of the owner's profile (for frontend linking).
         - `profile_image`: URL of the owner's profile image.
-        - `recipe_ingredients`: Nested list of associated ingredients.
+        - `recipe_ingredients`: Nested list of associated ingredients,
+            writable on create and update.
         - `status`: Recipe status, default value is pending_publish.
         - `created_at`: Timestamp for when the recipe was created.
         - `updated_at`: Timestamp for when the recipe was last updated.
         - `is_owner`: Indicates if the logged-in user owns the recipe.
 
+    Pass `fields` to serialize only some of the fields, e.g.
+    `summary_fields` for list screens. Uploaded images are limited to 2MB
+    and 4096px a side, checked before the image is decoded.
+
     Methods:
         - `get_is_owner`: Checks if the logged-in user is the owner of
             the recipe.
-        - `validate_image`: Ensures uploaded image meets size and resolution
-            constraints.
+        - `get_like_id`: Returns the id of the logged-in user's like.
+        - `setup_eager_loading`: Applies the joins and prefetches needed to
+            serialize a queryset of recipes, for all or some fields.
+        - `to_representation`: Prefetches the ingredient rows of a recipe
+            that was loaded without them.
+        - `prime_viewer`: Resolves the logged-in user's likes for a page
+            of recipes in one query.
+        - `validate_recipe_ingredients`: Ensures row ids are not repeated.
+        - `create` / `update`: Save the recipe and its ingredient rows in
+            one transaction.
+        - `save_recipe_ingredients`: Applies the submitted rows as a diff
+            against the recipe's current rows.
     """
     owner = serializers.ReadOnlyField(source='owner.username')
     is_owner = serializers.SerializerMethodField()
     profile_id = serializers.ReadOnlyField(source='owner.profile.id')
-    profile_image = serializers.ReadOnlyField(source='owner.profile.image.url')
-    recipe_ingredients = RecipeIngredientSerializer(many=True, read_only=True)
+    profile_image = ImageURLField(source='owner.profile.image')
+    recipe_ingredients = NestedRecipeIngredientSerializer(
+        many=True, required=False
+    )
     like_id = serializers.SerializerMethodField()
     likes_count = serializers.ReadOnlyField()
     comments_count = serializers.ReadOnlyField()
+    image_variants = serializers.SerializerMethodField()
+
+    # Long text columns that are not loaded unless their field is wanted.
+    deferrable_fields = ('intro', 'instruction')
+    summary_fields = (
+        'id', 'recipe_name', 'image', 'image_variants', 'owner',
+        'profile_id', 'profile_image', 'created_at', 'updated_at',
+        'is_owner', 'like_id', 'likes_count', 'comments_count', 'status',
+    )
 
     status = serializers.ChoiceField(  # Add status field
         choices=[
@@ -205,34 +256,156 @@ class RecipeSerializer(serializers.ModelSerializer):
         required=False,
     )
 
-    def validate_image(self, value):
+    @classmethod
+    def setup_eager_loading(cls, queryset, fields=None):
         """
-        Validates uploaded image size and dimensions.
+        Join the owner and their profile, and prefetch the ingredient rows
+        with their ingredient and measurement. The prefetched rows get the
+        parent recipe assigned, so 'recipe.owner' costs nothing.
 
-        Args:
-            value (ImageField): The uploaded image.
-
-        Raises:
-            serializers.ValidationError: If the image exceeds size or
-            dimension limits.
+        If 'fields' is given, long text columns, joins and prefetches
+        that none of those fields need are left out.
+        """
+        if fields is None:
+            fields = cls.Meta.fields
+        if {'owner', 'profile_id', 'profile_image'} & set(fields):
+            queryset = queryset.select_related('owner__profile')
+        if 'recipe_ingredients' in fields:
+            queryset = queryset.prefetch_related(cls.ingredients_prefetch())
+        deferred = [name for name in cls.deferrable_fields
+                    if name not in fields]
+        return queryset.defer(*deferred) if deferred else queryset
+
+    @staticmethod
+    def ingredients_prefetch():
+        return Prefetch(
+            'recipe_ingredients',
+            queryset=RecipeIngredient.objects.select_related(
+                'ingredient', 'measure'
+            ),
+        )
+
+    def to_representation(self, instance):
+        """
+        Prefetch the ingredient rows of a recipe that was not loaded with
+        setup_eager_loading, e.g. one that was just created or updated.
+        """
+        prefetched = getattr(instance, '_prefetched_objects_cache', {})
+        if ('recipe_ingredients' in self.fields and
+                'recipe_ingredients' not in prefetched):
+            prefetch_related_objects([instance], self.ingredients_prefetch())
+        return super().to_representation(instance)
 
-        Returns:
-            ImageField: The validated image.
+    def validate_recipe_ingredients(self, value):
         """
-        if value.size > 1024 * 1024 * 2:
-            raise serializers.ValidationError(
-                'Image size exceeds 2MB.'
-            )
-        if value.image.width > 4096:
-            raise serializers.ValidationError(
-                'Image width is larger than 4096px.'
-            )
-        if value.image.height > 4096:
+        Ensures each existing row is submitted at most once.
+        """
+        ids = [row['id'] for row in value if 'id' in row]
+        if len(ids) != len(set(ids)):
             raise serializers.ValidationError(
-                'Image height is larger than 4096px.'
+                'Each ingredient row can only be submitted once.'
             )
         return value
 
+    @transaction.atomic
+    def create(self, validated_data):
+        rows = validated_data.pop('recipe_ingredients', None)
+        recipe = super().create(validated_data)
+        if rows:
+            self.save_recipe_ingredients(recipe, rows)
+        return recipe
+
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        rows = validated_data.pop('recipe_ingredients', None)
+        recipe = super().update(instance, validated_data)
+        if rows is not None:
+            self.save_recipe_ingredients(recipe, rows)
+        return recipe
+
+    def save_recipe_ingredients(self, recipe, rows):
+        """
+        Replaces the recipe's ingredient rows with 'rows'.
+
+        Submitted rows are matched to existing rows by id, or else by
+        ingredient name. Matched rows are updated only if they changed;
+        the rest are inserted, and unmatched existing rows are deleted.
+        Names are resolved through the vocabulary caches.
+
+        Bulk inserts and updates skip model signals, so the search
+        document and the ingredient index are refreshed here.
+        """
+        ingredient_names = ingredients.get_many(
+            [row['ingredient'] for row in rows]
+        )
+        measure_names = measurements.get_many(
+            [row['measure'] for row in rows]
+        )
+        existing = {row.id: row for row in recipe.recipe_ingredients.all()}
+
+        unknown = [
+            row['id'] for row in rows
+            if 'id' in row and row['id'] not in existing
+        ]
+        if unknown:
+            raise serializers.ValidationError({
+                'recipe_ingredients': (
+                    f'Unknown ingredient row ids: {unknown}.'
+                )
+            })
+
+        submitted_ids = {row['id'] for row in rows if 'id' in row}
+        unclaimed = {}
+        for current in existing.values():
+            if current.id not in submitted_ids:
+                unclaimed.setdefault(current.ingredient_id, current)
+
+        to_create, to_update, claimed, added, removed = [], [], set(), [], []
+        for row in rows:
+            ingredient = ingredient_names[row['ingredient']]
+            measure = measure_names[row['measure']]
+            if 'id' in row:
+                current = existing[row['id']]
+            else:
+                current = unclaimed.pop(ingredient.id, None)
+            if current is None:
+                to_create.append(RecipeIngredient(
+                    recipe=recipe, ingredient=ingredient, measure=measure,
+                    quantity=row['quantity'],
+                ))
+                added.append(ingredient.id)
+                continue
+
+            claimed.add(current.id)
+            changed = (
+                current.ingredient_id != ingredient.id or
+                current.measure_id != measure.id or
+                current.quantity != row['quantity']
+            )
+            if current.ingredient_id != ingredient.id:
+                removed.append(current.ingredient_id)
+                added.append(ingredient.id)
+            if changed:
+                current.ingredient = ingredient
+                current.measure = measure
+                current.quantity = row['quantity']
+                to_update.append(current)
+
+        RecipeIngredient.objects.bulk_create(to_create)
+        RecipeIngredient.objects.bulk_update(
+            to_update, ['ingredient', 'measure', 'quantity']
+        )
+        # Deletes still send post_delete, which keeps both indexes current.
+        RecipeIngredient.objects.filter(
+            pk__in=existing.keys() - claimed
+        ).delete()
+
+        if to_create or to_update:
+            index_recipe_ingredients(recipe.pk)
+            if recipe.status == 'published':
+                remove_rows(recipe.pk, removed)
+                add_rows(recipe.pk, added)
+
     def get_is_owner(self, obj):
         """
         Determines if the logged-in user is the owner of the recipe.
@@ -243,23 +416,58 @@ class RecipeSerializer(serializers.ModelSerializer):
         Returns:
             bool: True if the user owns the recipe, False otherwise.
         """
-        request = self.context['request']
-        return request.user == obj.owner
+        return self.viewer.is_owner(obj.owner_id)
 
     def get_like_id(self, obj):
-        user = self.context['request'].user
-        if user.is_authenticated:
-            like = Like.objects.filter(
-                owner=user, recipe=obj
-            ).first()
-            return like.id if like else None
-        return None
+        return self.viewer.lookup(Like, 'recipe', obj.id)
+
+    def get_image_variants(self, obj):
+        return variant_urls(obj)
+
+    def prime_viewer(self, instances):
+        if 'like_id' in self.fields:
+            self.viewer.resolve(
+                Like, 'recipe', [obj.id for obj in instances]
+            )
 
     class Meta:
         model = Recipe
         fields = [
-            'id', 'recipe_name', 'image', 'intro', 'instruction',
-            'owner', 'profile_id', 'profile_image', 'recipe_ingredients',
-            'created_at', 'updated_at', 'is_owner', 'like_id',
-            'likes_count', 'comments_count', 'status',
+            'id', 'recipe_name', 'image', 'image_variants', 'intro',
+            'instruction', 'owner', 'profile_id', 'profile_image',
+            'recipe_ingredients', 'created_at', 'updated_at', 'is_owner',
+            'like_id', 'likes_count', 'comments_count', 'status',
         ]
+        list_serializer_class = ViewerListSerializer
+
+
+class RecipeTransitionSerializer(serializers.Serializer):
+    """
+    One requested status change of a recipe.
+    """
+    id = serializers.IntegerField()
+    status = serializers.ChoiceField(choices=Recipe.STATUS_CHOICES)
+
+
+class RecipeModerationSerializer(serializers.Serializer):
+    """
+    Serializer for a staff request changing the status of many recipes,
+    up to MAX_TRANSITIONS at once. A recipe may be listed only once.
+    """
+    MAX_TRANSITIONS = 500
+
+    transitions = RecipeTransitionSerializer(
+        many=True, allow_empty=False, max_length=MAX_TRANSITIONS
+    )
+
+    def validate_transitions(self, value):
+        counts = Counter(transition['id'] for transition in value)
+        repeated = sorted(pk for pk, count in counts.items() if count > 1)
+        if repeated:
+            raise serializers.ValidationError(
+                f'Recipes listed more than once: '
+                f'{", ".join(str(pk) for pk in repeated)}.'
+            )
+        return {
+            transition['id']: transition['status'] for transition in value
+        }
@@ -0,0 +1,14 @@
+from django.dispatch import Signal
+
+"""
+Signals of the Recipe app.
+
+recipes_status_changed is sent once for a batch of recipes whose status
+was changed with a queryset update, which sends no post_save. 'recipes'
+lists the changed recipes with 'id', 'owner_id', 'created_at' and the new
+'status' loaded; 'previous_status' is the status before the change, as
+after a save. Handlers that follow status transitions on post_save
+connect here as well.
+"""
+
+recipes_status_changed = Signal()
@@ -1,7 +1,35 @@
+from datetime import timedelta
+from io import BytesIO, StringIO
 from django.contrib.auth.models import User
-from .models import Recipe, RecipeIngredient, Ingredient, Measurement
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.storage import InMemoryStorage, default_storage
+from django.core.management import call_command
+import threading
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import AsyncRequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+from PIL import Image
+from . import vocabulary
+from .models import (
+    Recipe, RecipeIngredient, Ingredient, Measurement, TrendingScore,
+)
+from .purge import purge_recipes
+from .trending import update_scores
+from .views import RecipeDetail, RecipeList
+from comments.models import Comment
+from feeds.models import FeedEntry
+from followers.graph import follow_graph
+from followers.models import Follower
+from likes.models import Like
 from rest_framework import status
 from rest_framework.test import APITestCase
+from tt_drf_api.cache import get_or_compute
+from tt_drf_api.images import clear_urls
+from tt_drf_api.pagination import encode_cursor
 
 
 class RecipeListViewTests(APITestCase):
@@ -28,6 +56,23 @@ class RecipeListViewTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data['results']), 1)
 
+    def test_filter_recipes_of_followed_users(self):
+        """
+        Test that the following filter lists the recipes of the users a
+        profile follows.
+        """
+        follow_graph.clear()
+        Follower.objects.create(owner=self.kalle, followed=self.other_user)
+        for owner in (self.kalle, self.other_user):
+            Recipe.objects.create(
+                owner=owner, recipe_name=owner.username, status='published')
+        response = self.client.get(
+            '/recipes/?owner__followed__owner__profile='
+            f'{self.kalle.profile.id}')
+        self.assertEqual(
+            [r['recipe_name'] for r in response.data['results']],
+            ['other_user'])
+
     def test_logged_in_user_can_create_recipe(self):
         """
         Test that a logged-in user can create a new recipe.
@@ -205,6 +250,7 @@ class RecipeIngredientViewTests(APITestCase):
                 owner=self.kalle, recipe_name='Test Recipe')
         self.ingredient = Ingredient.objects.create(name='Sugar')
         self.measurement = Measurement.objects.create(measure='grams')
+        vocabulary.clear()
 
     def test_logged_in_user_can_add_ingredient_to_own_recipe(self):
         """
@@ -256,3 +302,1465 @@ class RecipeIngredientViewTests(APITestCase):
         response = self.client.delete(f'/ingredients/{recipe_ingredient.id}/')
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertEqual(RecipeIngredient.objects.count(), 0)
+
+
+class RecipeCounterTests(APITestCase):
+    """
+    Test cases for the maintained likes_count and comments_count columns.
+    """
+
+    def setUp(self):
+        """
+        Create test users and a published recipe.
+        """
+        self.kalle = User.objects.create_user(
+            username='kalle', password='kula')
+        self.other_user = User.objects.create_user(
+            username='other_user', password='password')
+        self.recipe = Recipe.objects.create(
+            owner=self.kalle, recipe_name='Counted', status='published')
+
+    def test_like_and_comment_update_counters(self):
+        """
+        Test that creating and deleting likes and comments keeps the
+        counters on the recipe current.
+        """
+        like = Like.objects.create(owner=self.other_user, recipe=self.recipe)
+        Comment.objects.create(
+            owner=self.other_user, recipe=self.recipe, content='Yum')
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.likes_count, 1)
+        self.assertEqual(self.recipe.comments_count, 1)
+
+        like.delete()
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.likes_count, 0)
+
+    def test_cascade_delete_updates_counters(self):
+        """
+        Test that deleting a user removes their likes and comments from
+        the counters through the cascade.
+        """
+        Like.objects.create(owner=self.other_user, recipe=self.recipe)
+        Comment.objects.create(
+            owner=self.other_user, recipe=self.recipe, content='Yum')
+        self.other_user.delete()
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.likes_count, 0)
+        self.assertEqual(self.recipe.comments_count, 0)
+
+    def test_list_orders_by_likes_count(self):
+        """
+        Test that the recipe list can be ordered by the stored counter.
+        """
+        popular = Recipe.objects.create(
+            owner=self.kalle, recipe_name='Popular', status='published')
+        Like.objects.create(owner=self.other_user, recipe=popular)
+        response = self.client.get('/recipes/?ordering=-likes_count')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['recipe_name'], 'Popular')
+        self.assertEqual(response.data['results'][0]['likes_count'], 1)
+
+    def test_recount_command_fixes_drift(self):
+        """
+        Test that the reconciliation command repairs drifted counters.
+        """
+        Like.objects.create(owner=self.other_user, recipe=self.recipe)
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            likes_count=7, comments_count=3)
+        call_command(
+            'recount_recipe_counters', chunk_size=1, stdout=StringIO())
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.likes_count, 1)
+        self.assertEqual(self.recipe.comments_count, 0)
+
+
+class RecipeViewerTests(APITestCase):
+    """
+    Test cases for the viewer-dependent fields on recipes.
+    """
+
+    def setUp(self):
+        """
+        Create test users and two published recipes, one of them liked.
+        """
+        self.kalle = User.objects.create_user(
+            username='kalle', password='kula')
+        self.other_user = User.objects.create_user(
+            username='other_user', password='password')
+        self.liked = Recipe.objects.create(
+            owner=self.kalle, recipe_name='Liked', status='published')
+        Recipe.objects.create(
+            owner=self.kalle, recipe_name='Not liked', status='published')
+        self.like = Like.objects.create(
+            owner=self.other_user, recipe=self.liked)
+
+    def test_like_id_resolved_for_page(self):
+        """
+        Test that like_id and is_owner are set per row on the list.
+        """
+        self.client.login(username='other_user', password='password')
+        response = self.client.get('/recipes/')
+        rows = {r['recipe_name']: r for r in response.data['results']}
+        self.assertEqual(rows['Liked']['like_id'], self.like.id)
+        self.assertIsNone(rows['Not liked']['like_id'])
+        self.assertFalse(rows['Liked']['is_owner'])
+
+    def test_like_id_on_detail(self):
+        """
+        Test that like_id is resolved on the detail view.
+        """
+        self.client.login(username='other_user', password='password')
+        response = self.client.get(f'/recipes/{self.liked.id}/')
+        self.assertEqual(response.data['like_id'], self.like.id)
+
+    def test_anonymous_viewer_has_no_like_id(self):
+        """
+        Test that anonymous users get no like_id and are never owners.
+        """
+        response = self.client.get('/recipes/')
+        for row in response.data['results']:
+            self.assertIsNone(row['like_id'])
+            self.assertFalse(row['is_owner'])
+
+
+class RecipeQueryBudgetTests(APITestCase):
+    """
+    Pin the number of queries used by the recipe endpoints, so that an
+    N+1 regression in the serializers fails the test run.
+    """
+
+    def setUp(self):
+        """
+        Create three published recipes with three ingredients each, and
+        like every recipe.
+        """
+        self.kalle = User.objects.create_user(
+            username='kalle', password='kula')
+        self.other_user = User.objects.create_user(
+            username='other_user', password='password')
+        measure = Measurement.objects.create(measure='grams')
+        for i in range(3):
+            recipe = Recipe.objects.create(
+                owner=self.kalle if i % 2 else self.other_user,
+                recipe_name=f'Recipe {i}', status='published')
+            for name in ['Flour', 'Sugar', 'Salt']:
+                RecipeIngredient.objects.create(
+                    recipe=recipe, quantity='1', measure=measure,
+                    ingredient=Ingredient.objects.get_or_create(
+                        name=name)[0])
+            Like.objects.create(owner=self.kalle, recipe=recipe)
+        self.recipe = recipe
+
+    def test_recipe_list_query_count(self):
+        """
+        Count and page; the summary fields need no ingredient prefetch.
+        """
+        with self.assertNumQueries(2):
+            response = self.client.get('/recipes/')
+        self.assertEqual(len(response.data['results']), 3)
+
+    def test_full_recipe_list_query_count(self):
+        """
+        Count, page and ingredient prefetch.
+        """
+        with self.assertNumQueries(3):
+            response = self.client.get('/recipes/?fields=*')
+        self.assertEqual(len(response.data['results']), 3)
+
+    def test_recipe_list_query_count_logged_in(self):
+        """
+        Session and user lookups, plus one query for the viewer's likes.
+        """
+        self.client.login(username='kalle', password='kula')
+        with self.assertNumQueries(5):
+            self.client.get('/recipes/')
+
+    def test_recipe_detail_query_count(self):
+        """
+        The ETag validator row, recipe row and ingredient prefetch.
+        """
+        with self.assertNumQueries(3):
+            self.client.get(f'/recipes/{self.recipe.id}/')
+
+    def test_recipe_ingredient_list_query_count(self):
+        """
+        Count and page, with recipe owner, ingredient and measure joined.
+        """
+        with self.assertNumQueries(2):
+            response = self.client.get('/ingredients/')
+        self.assertEqual(len(response.data['results']), 9)
+
+    def test_recipe_ingredient_detail_query_count(self):
+        """
+        A single joined row.
+        """
+        ingredient = RecipeIngredient.objects.first()
+        with self.assertNumQueries(1):
+            self.client.get(f'/ingredients/{ingredient.id}/')
+
+
+class RecipeSearchTests(APITestCase):
+    """
+    Test cases for the full-text recipe search.
+    """
+
+    def setUp(self):
+        """
+        Create published recipes where 'Tomato' appears in a title, an
+        ingredient list, and both.
+        """
+        self.kalle = User.objects.create_user(
+            username='kalle', password='kula')
+        self.grams = Measurement.objects.create(measure='grams')
+        self.tomato = Ingredient.objects.create(name='Tomato')
+        self.in_ingredients = self.create_recipe('Pasta', [self.tomato])
+        self.in_title = self.create_recipe('Tomato soup', [])
+        self.create_recipe('Pancakes', [])
+
+    def create_recipe(self, name, ingredients):
+        recipe = Recipe.objects.create(
+            owner=self.kalle, recipe_name=name, status='published')
+        for ingredient in ingredients:
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=ingredient, quantity='1',
+                measure=self.grams)
+        return recipe
+
+    def search(self, query):
+        response = self.client.get('/recipes/', {'search': query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [r['recipe_name'] for r in response.data['results']]
+
+    def test_title_matches_rank_above_ingredient_matches(self):
+        """
+        Test that the weighted title ranks above the ingredient list.
+        """
+        self.assertEqual(self.search('tomato'), ['Tomato soup', 'Pasta'])
+
+    def test_prefix_and_owner_search(self):
+        """
+        Test that prefixes and the owner's username match.
+        """
+        self.assertEqual(self.search('panc'), ['Pancakes'])
+        self.assertEqual(len(self.search('kalle')), 3)
+
+    def test_multiple_matching_ingredients_do_not_duplicate(self):
+        """
+        Test that a recipe is returned once even if several ingredients
+        match the search.
+        """
+        RecipeIngredient.objects.create(
+            recipe=self.in_ingredients, quantity='2', measure=self.grams,
+            ingredient=Ingredient.objects.create(name='Tomato paste'))
+        self.assertEqual(self.search('tomato').count('Pasta'), 1)
+
+    def test_document_follows_ingredient_and_title_changes(self):
+        """
+        Test that the document is updated when ingredients or the recipe
+        name change.
+        """
+        RecipeIngredient.objects.filter(recipe=self.in_ingredients).delete()
+        self.assertEqual(self.search('tomato'), ['Tomato soup'])
+
+        self.in_title.recipe_name = 'Gazpacho'
+        self.in_title.save()
+        self.assertEqual(self.search('tomato'), [])
+        self.assertEqual(self.search('gazpacho'), ['Gazpacho'])
+
+    def test_explicit_ordering_overrides_rank(self):
+        """
+        Test that the ordering parameter still applies to search results.
+        """
+        Like.objects.create(owner=self.kalle, recipe=self.in_ingredients)
+        names = self.client.get(
+            '/recipes/', {'search': 'tomato', 'ordering': '-likes_count'}
+        ).data['results']
+        self.assertEqual(names[0]['recipe_name'], 'Pasta')
+
+
+class RecipeCursorPaginationTests(APITestCase):
+    """
+    Test cases for keyset paging of the recipe list.
+    """
+
+    def setUp(self):
+        """
+        Create more published recipes than fit on one page, with a few
+        sharing the same likes_count.
+        """
+        self.kalle = User.objects.create_user(
+            username='kalle', password='kula')
+        for i in range(13):
+            Recipe.objects.create(
+                owner=self.kalle, recipe_name=f'Recipe {i}',
+                status='published', likes_count=i % 3)
+
+    def walk(self, url):
+        """
+        Follow 'next' links and return every recipe name seen.
+        """
+        names = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            names += [r['recipe_name'] for r in response.data['results']]
+            url = response.data['next']
+        return names
+
+    def test_cursor_walks_all_recipes_newest_first(self):
+        """
+        Test that following cursors returns every recipe exactly once in
+        the default order.
+        """
+        names = self.walk('/recipes/?cursor=')
+        self.assertEqual(names, [f'Recipe {i}' for i in range(12, -1, -1)])
+
+    def test_cursor_is_stable_when_ordering_by_counter(self):
+        """
+        Test that ties on likes_count neither repeat nor skip recipes.
+        """
+        names = self.walk('/recipes/?ordering=-likes_count&cursor=')
+        self.assertEqual(len(names), 13)
+        self.assertEqual(len(set(names)), 13)
+        likes = [int(name.split()[1]) % 3 for name in names]
+        self.assertEqual(likes, sorted(likes, reverse=True))
+
+    def test_cursor_for_other_ordering_is_rejected(self):
+        """
+        Test that a cursor cannot be reused with a different ordering.
+        """
+        next_url = self.client.get('/recipes/?cursor=').data['next']
+        response = self.client.get(next_url + '&ordering=likes_count')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_cursor_is_rejected(self):
+        """
+        Test that a malformed cursor returns a 400.
+        """
+        response = self.client.get('/recipes/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_cursor_with_invalid_position_is_rejected(self):
+        """
+        Test that a well-formed cursor holding a missing value or a
+        non-integer id returns a 400.
+        """
+        now = timezone.now().isoformat()
+        for position in ([now, 'abc'], [None, 1], [now, [1]], [[1], 1]):
+            cursor = encode_cursor('-created_at', position)
+            response = self.client.get(f'/recipes/?cursor={cursor}')
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST, position)
+
+    def test_page_numbers_still_work(self):
+        """
+        Test that requests without a cursor keep page-number paging.
+        """
+        response = self.client.get('/recipes/?page=2')
+        self.assertEqual(response.data['count'], 13)
+        self.assertEqual(len(response.data['results']), 3)
+
+
+class RecipeCookWithTests(APITestCase):
+    """
+    Test cases for finding recipes by the ingredients a user has.
+    """
+
+    def setUp(self):
+        """
+        Create published recipes sharing some ingredients, and a draft.
+        """
+        self.kalle = User.objects.create_user(
+            username='kalle', password='kula')
+        self.grams = Measurement.objects.create(measure='grams')
+        self.tomato = Ingredient.objects.create(name='Tomato')
+        self.basil = Ingredient.objects.create(name='Basil')
+        self.flour = Ingredient.objects.create(name='Flour')
+        self.salad = self.create_recipe('Salad', [self.tomato, self.basil])
+        self.soup = self.create_recipe('Soup', [self.tomato])
+        self.bread = self.create_recipe('Bread', [self.flour])
+        self.draft = self.create_recipe(
+            'Draft', [self.tomato, self.basil], status='draft')
+
+    def create_recipe(self, name, ingredients, status='published'):
+        recipe = Recipe.objects.create(
+            owner=self.kalle, recipe_name=name, status=status)
+        for ingredient in ingredients:
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=ingredient, quantity='1',
+                measure=self.grams)
+        return recipe
+
+    def cook_with(self, ingredients):
+        response = self.client.get(
+            '/recipes/cook-with/', {'ingredients': ingredients})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [
+            (r['recipe_name'], r['matched_ingredients'])
+            for r in response.data['results']
+        ]
+
+    def test_recipes_are_ranked_by_matched_ingredients(self):
+        """
+        Test that recipes covering more ingredients come first, names
+        match case-insensitively and drafts are left out.
+        """
+        self.assertEqual(
+            self.cook_with('tomato, BASIL'), [('Salad', 2), ('Soup', 1)])
+
+    def test_index_follows_ingredient_changes(self):
+        """
+        Test that changing, deleting and adding ingredient rows update the
+        index.
+        """
+        row = self.soup.recipe_ingredients.get()
+        row.ingredient = self.flour
+        row.save()
+        self.assertEqual(self.cook_with('flour'), [('Bread', 1), ('Soup', 1)])
+
+        row.delete()
+        self.assertEqual(self.cook_with('flour'), [('Bread', 1)])
+
+        RecipeIngredient.objects.create(
+            recipe=self.draft, ingredient=self.flour, quantity='1',
+            measure=self.grams)
+        self.assertEqual(self.cook_with('flour'), [('Bread', 1)])
+
+    def test_refreshed_row_is_not_indexed_twice(self):
+        """
+        Test that a row changed elsewhere and then refreshed is not added
+        to the index again when it is saved.
+        """
+        row = self.soup.recipe_ingredients.get()
+        other = RecipeIngredient.objects.get(pk=row.pk)
+        other.ingredient = self.flour
+        other.save()
+        row.refresh_from_db()
+        row.quantity = '2'
+        row.save()
+        self.assertEqual(self.cook_with('flour'), [('Bread', 1), ('Soup', 1)])
+
+    def test_index_follows_publishing(self):
+        """
+        Test that publishing and unpublishing a recipe updates the index.
+        """
+        self.draft.status = 'published'
+        self.draft.save()
+        self.salad.status = 'draft'
+        self.salad.save()
+        self.assertEqual(
+            self.cook_with('tomato,basil'), [('Draft', 2), ('Soup', 1)])
+
+    def test_missing_ingredients_are_rejected(self):
+        """
+        Test that the ingredients parameter is required.
+        """
+        response = self.client.get('/recipes/cook-with/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_rebuild_command_matches_incremental_index(self):
+        """
+        Test that rebuilding the index gives the same results.
+        """
+        before = self.cook_with('tomato,basil,flour')
+        call_command('rebuild_ingredient_index', stdout=StringIO())
+        self.assertEqual(self.cook_with('tomato,basil,flour'), before)
+
+
+class RecipeNestedIngredientTests(APITestCase):
+    """
+    Test cases for writing ingredient rows together with a recipe.
+    """
+
+    def setUp(self):
+        self.kalle = User.objects.create_user(
+            username='kalle', password='kula')
+        self.client.login(username='kalle', password='kula')
+        vocabulary.clear()
+
+    def create(self, rows):
+        response = self.client.post('/recipes/', {
+            'recipe_name': 'Salad', 'recipe_ingredients': rows,
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data
+
+    def publish(self, recipe_id):
+        recipe = Recipe.objects.get(pk=recipe_id)
+        recipe.status = 'published'
+        recipe.save()
+
+    def rows(self, count):
+        return [
+            {'ingredient': f'Ingredient {i}', 'quantity': str(i),
+             'measure': 'grams'}
+            for i in range(count)
+        ]
+
+    def test_create_with_ingredients(self):
+        """
+        Test that rows are created with new ingredients and measurements,
+        and that the recipe is searchable by them.
+        """
+        data = self.create([
+            {'ingredient': 'Tomato', 'quantity': '2', 'measure': 'pieces'},
+            {'ingredient': 'Basil', 'quantity': '1', 'measure': 'bunch'},
+        ])
+        self.assertEqual(
+            [row['ingredient'] for row in data['recipe_ingredients']],
+            ['Tomato', 'Basil'])
+        self.assertEqual(Ingredient.objects.count(), 2)
+        self.publish(data['id'])
+        response = self.client.get('/recipes/', {'search': 'basil'})
+        self.assertEqual(response.data['count'], 1)
+        response = self.client.get(
+            '/recipes/cook-with/', {'ingredients': 'tomato'})
+        self.assertEqual(response.data['results'][0]['id'], data['id'])
+
+    def test_create_queries_do_not_grow_with_rows(self):
+        """
+        Test that creating 20 rows costs as many queries as creating 2.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create(self.rows(1))
+        with CaptureQueriesContext(connection) as few:
+            self.create(self.rows(3)[1:])
+        with CaptureQueriesContext(connection) as many:
+            self.create(self.rows(23)[3:])
+        self.assertEqual(len(few), len(many))
+
+    def test_update_applies_a_diff(self):
+        """
+        Test that rows matched by id or ingredient name are kept, new rows
+        are added and missing rows are deleted.
+        """
+        data = self.create(self.rows(3))
+        self.publish(data['id'])
+        kept_by_id, kept_by_name, dropped = data['recipe_ingredients']
+        response = self.client.patch(f'/recipes/{data["id"]}/', {
+            'recipe_ingredients': [
+                {'id': kept_by_id['id'], 'ingredient': 'Ingredient 0',
+                 'quantity': '5', 'measure': 'grams'},
+                {'ingredient': 'Ingredient 1', 'quantity': '1',
+                 'measure': 'grams'},
+                {'ingredient': 'Pepper', 'quantity': '1',
+                 'measure': 'pinch'},
+            ],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = response.data['recipe_ingredients']
+        self.assertEqual(rows[0]['id'], kept_by_id['id'])
+        self.assertEqual(rows[0]['quantity'], '5')
+        self.assertEqual(rows[1]['id'], kept_by_name['id'])
+        self.assertEqual(rows[2]['ingredient'], 'Pepper')
+        self.assertFalse(
+            RecipeIngredient.objects.filter(id=dropped['id']).exists())
+        response = self.client.get(
+            '/recipes/cook-with/', {'ingredients': 'pepper,ingredient 2'})
+        self.assertEqual(
+            [r['matched_ingredients'] for r in response.data['results']],
+            [1])
+
+    def test_update_without_ingredients_keeps_rows(self):
+        """
+        Test that omitting recipe_ingredients leaves the rows alone.
+        """
+        data = self.create(self.rows(2))
+        self.client.patch(
+            f'/recipes/{data["id"]}/', {'intro': 'Fresh'}, format='json')
+        self.assertEqual(RecipeIngredient.objects.count(), 2)
+
+    def test_unknown_row_id_is_rejected(self):
+        """
+        Test that ids of rows from another recipe are rejected and nothing
+        is changed.
+        """
+        other = self.create(self.rows(1))
+        data = self.create(self.rows(1))
+        response = self.client.patch(f'/recipes/{data["id"]}/', {
+            'recipe_name': 'Renamed',
+            'recipe_ingredients': [
+                {'id': other['recipe_ingredients'][0]['id'],
+                 'ingredient': 'Salt', 'quantity': '1', 'measure': 'pinch'},
+            ],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Recipe.objects.filter(recipe_name='Renamed').exists())
+        self.assertFalse(Ingredient.objects.filter(name='Salt').exists())
+
+
+class VocabularyCacheTests(APITestCase):
+    """
+    Test cases for the ingredient and measurement name caches.
+    """
+
+    def setUp(self):
+        self.kalle = User.objects.create_user(
+            username='kalle', password='kula', is_staff=True)
+        self.recipe = Recipe.objects.create(
+            owner=self.kalle, recipe_name='Salad')
+        vocabulary.clear()
+
+    def add_ingredient(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/ingredients/', {
+                'recipe': self.recipe.id, 'ingredient': 'Tomato',
+                'quantity': '2', 'measure': 'pieces',
+            })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response
+
+    def test_repeated_names_are_served_from_the_cache(self):
+        """
+        Test that names created once are not looked up again.
+        """
+        self.client.login(username='kalle', password='kula')
+        self.add_ingredient()
+        self.add_ingredient()
+        self.assertEqual(Ingredient.objects.count(), 1)
+        stats = vocabulary.ingredients.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    def test_rolled_back_names_are_not_cached(self):
+        """
+        Test that names created in a rolled back transaction are looked
+        up again.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    vocabulary.ingredients.get('Tomato')
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertEqual(vocabulary.ingredients.stats()['size'], 0)
+        tomato = vocabulary.ingredients.get('Tomato')
+        self.assertTrue(Ingredient.objects.filter(pk=tomato.pk).exists())
+
+    @override_settings(VOCABULARY_CACHE_SIZE=2)
+    def test_cache_is_bounded(self):
+        """
+        Test that the least recently used names are evicted.
+        """
+        for name in ['Tomato', 'Basil', 'Tomato', 'Salt']:
+            with self.captureOnCommitCallbacks(execute=True):
+                vocabulary.ingredients.get(name)
+        self.assertEqual(
+            list(vocabulary.ingredients.entries), ['Tomato', 'Salt'])
+
+    @override_settings(VOCABULARY_CACHE='default')
+    def test_shared_cache_is_used_by_other_processes(self):
+        """
+        Test that a process with an empty local cache reads names from the
+        shared cache without querying the database.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            tomato = vocabulary.ingredients.get('Tomato')
+        vocabulary.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                vocabulary.ingredients.get('Tomato').pk, tomato.pk)
+
+    def test_deleted_names_are_evicted(self):
+        """
+        Test that deleting an ingredient removes it from the cache.
+        """
+        vocabulary.ingredients.warm_up()
+        basil = Ingredient.objects.create(name='Basil')
+        vocabulary.ingredients.warm_up()
+        basil.delete()
+        self.assertNotIn('Basil', vocabulary.ingredients.entries)
+
+    def test_stats_are_staff_only(self):
+        """
+        Test that only staff users can read the cache counters.
+        """
+        response = self.client.get('/vocabulary/stats/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.client.login(username='kalle', password='kula')
+        response = self.client.get('/vocabulary/stats/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            set(response.data), {'ingredients', 'measurements'})
+
+
+class RecipeResponseCacheTests(APITestCase):
+    """
+    Test cases for the anonymous recipe list response cache.
+    """
+
+    def setUp(self):
+        self.kalle = User.objects.create_user(
+            username='kalle', password='kula')
+        self.recipe = Recipe.objects.create(
+            owner=self.kalle, recipe_name='Salad', status='published')
+
+    def test_anonymous_list_is_cached(self):
+        """
+        Test that a repeated anonymous request, with its parameters in
+        another order, runs no queries.
+        """
+        first = self.client.get('/recipes/?ordering=-likes_count&search=sal')
+        with self.assertNumQueries(0):
+            second = self.client.get(
+                '/recipes/?search=sal&ordering=-likes_count')
+        self.assertEqual(second.data, first.data)
+
+    def test_logged_in_list_is_not_cached(self):
+        """
+        Test that logged-in users always get a fresh response.
+        """
+        self.client.login(username='kalle', password='kula')
+        self.client.get('/recipes/')
+        Recipe.objects.filter(pk=self.recipe.pk).update(recipe_name='Soup')
+        response = self.client.get('/recipes/')
+        self.assertEqual(response.data['results'][0]['recipe_name'], 'Soup')
+
+    def test_changes_invalidate_cached_lists(self):
+        """
+        Test that likes and comments bump the cached recipe lists.
+        """
+        self.client.get('/recipes/')
+        Like.objects.create(owner=self.kalle, recipe=self.recipe)
+        Comment.objects.create(
+            owner=self.kalle, recipe=self.recipe, content='Nice')
+        response = self.client.get('/recipes/')
+        self.assertEqual(response.data['results'][0]['likes_count'], 1)
+        self.assertEqual(response.data['results'][0]['comments_count'], 1)
+
+    def test_follows_invalidate_filtered_lists(self):
+        """
+        Test that following and unfollowing bump the recipe lists
+        filtered by follows.
+        """
+        reader = User.objects.create_user(username='reader', password='pass')
+        url = ('/recipes/?owner__followed__owner__profile='
+               f'{reader.profile.id}')
+        self.assertEqual(self.client.get(url).data['count'], 0)
+        follow = Follower.objects.create(owner=reader, followed=self.kalle)
+        self.assertEqual(self.client.get(url).data['count'], 1)
+        follow.delete()
+        self.assertEqual(self.client.get(url).data['count'], 0)
+
+    def test_username_change_invalidates_cached_lists(self):
+        """
+        Test that a new username shows in the cached list, and that
+        logins leave it cached.
+        """
+        self.client.get('/recipes/')
+        self.client.login(username='kalle', password='kula')
+        self.client.logout()
+        with self.assertNumQueries(0):
+            self.client.get('/recipes/')
+        self.kalle.username = 'karl'
+        self.kalle.save()
+        response = self.client.get('/recipes/')
+        self.assertEqual(response.data['results'][0]['owner'], 'karl')
+
+    def test_simultaneous_misses_are_coalesced(self):
+        """
+        Test that a request missing a key another request is computing
+        waits for that result instead of computing it again.
+        """
+        cache.add('coalesce:lock', 1)
+        timer = threading.Timer(0.2, cache.set, ['coalesce', 'computed'])
+        timer.start()
+
+        def compute():
+            raise AssertionError('Computed twice')
+
+        self.assertEqual(get_or_compute('coalesce', compute, 60), 'computed')
+        timer.join()
+        cache.delete_many(['coalesce', 'coalesce:lock'])
+
+
+class RecipeConditionalGetTests(APITestCase):
+    """
+    Test cases for ETag on the recipe detail endpoint.
+    """
+
+    def setUp(self):
+        self.kalle = User.objects.create_user(
+            username='kalle', password='kula')
+        self.recipe = Recipe.objects.create(
+            owner=self.kalle, recipe_name='Salad', status='published')
+        self.url = f'/recipes/{self.recipe.id}/'
+
+    def test_unchanged_recipe_is_not_modified(self):
+        """
+        Test that a matching ETag gets a 304 from the validator query
+        alone.
+        """
+        response = self.client.get(self.url)
+        with self.assertNumQueries(1):
+            not_modified = self.client.get(
+                self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(
+            not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_if_modified_since_is_ignored(self):
+        """
+        Test that no Last-Modified is sent and If-Modified-Since alone
+        never gets a 304, since a like changes the recipe without
+        changing a timestamp.
+        """
+        response = self.client.get(self.url)
+        self.assertNotIn('Last-Modified', response)
+        Like.objects.create(owner=self.kalle, recipe=self.recipe)
+        response = self.client.get(
+            self.url, HTTP_IF_MODIFIED_SINCE=http_date())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['likes_count'], 1)
+
+    def test_counters_and_ingredients_change_the_etag(self):
+        """
+        Test that a like and a new ingredient row change the ETag.
+        """
+        etag = self.client.get(self.url)['ETag']
+        Like.objects.create(owner=self.kalle, recipe=self.recipe)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['likes_count'], 1)
+
+        etag = response['ETag']
+        RecipeIngredient.objects.create(
+            recipe=self.recipe, quantity='1',
+            ingredient=Ingredient.objects.create(name='Tomato'),
+            measure=Measurement.objects.create(measure='grams'))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_etag_depends_on_the_user(self):
+        """
+        Test that an anonymous ETag does not match for a logged-in user.
+        """
+        etag = self.client.get(self.url)['ETag']
+        self.client.login(username='kalle', password='kula')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('Cookie', response['Vary'])
+
+
+class RecipeFieldsetTests(APITestCase):
+    """
+    Test cases for selecting recipe fields with `fields` and `omit`.
+    """
+
+    def setUp(self):
+        kalle = User.objects.create_user(username='kalle', password='kula')
+        recipe = Recipe.objects.create(
+            owner=kalle, recipe_name='Salad', status='published',
+            instruction='Chop and mix.')
+        RecipeIngredient.objects.create(
+            recipe=recipe, quantity='1',
+            ingredient=Ingredient.objects.create(name='Tomato'),
+            measure=Measurement.objects.create(measure='grams'))
+        self.url = f'/recipes/{recipe.id}/'
+
+    def test_list_defaults_to_summary(self):
+        """
+        Test that the list leaves out long text and ingredient rows.
+        """
+        row = self.client.get('/recipes/').data['results'][0]
+        self.assertIn('likes_count', row)
+        self.assertNotIn('instruction', row)
+        self.assertNotIn('recipe_ingredients', row)
+
+    def test_fields_are_selected_and_left_out_of_sql(self):
+        """
+        Test that only the requested fields are serialized, and that
+        unrequested text columns are not loaded.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/recipes/?fields=id,recipe_name')
+        self.assertEqual(
+            set(response.data['results'][0]), {'id', 'recipe_name'})
+        self.assertNotIn('instruction', queries[-1]['sql'])
+        self.assertNotIn('auth_user', queries[-1]['sql'])
+
+    def test_omit_on_detail(self):
+        """
+        Test that omitted fields are dropped from the detail response.
+        """
+        response = self.client.get(self.url, {'omit': 'recipe_ingredients'})
+        self.assertEqual(response.data['instruction'], 'Chop and mix.')
+        self.assertNotIn('recipe_ingredients', response.data)
+
+    def test_unknown_fields_are_rejected(self):
+        """
+        Test that unknown field names return a 400.
+        """
+        response = self.client.get('/recipes/?fields=id,secret')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AuditQueryPlansTests(APITestCase):
+    """
+    Test cases for the audit_query_plans management command.
+    """
+
+    def test_audit_explains_every_endpoint(self):
+        """
+        Test that the endpoints are requested and their plans read, and
+        that the keyset index serves the recipe list.
+        """
+        kalle = User.objects.create_user(username='kalle', password='kula')
+        Recipe.objects.create(
+            owner=kalle, recipe_name='Salad', status='published')
+        out = StringIO()
+        call_command(
+            'audit_query_plans', user='kalle', verbosity=2, stdout=out)
+        output = out.getvalue()
+        self.assertIn('/recipes/ -> 200', output)
+        self.assertIn('/feed/ -> 200', output)
+        self.assertIn('recipe_status_created_idx', output)
+        self.assertIn('flagged plan lines.', output)
+
+
+def png_upload(width, height, name='image.png'):
+    buffer = BytesIO()
+    Image.new('RGB', (width, height)).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/png')
+
+
+@override_settings(
+    DEFAULT_FILE_STORAGE='django.core.files.storage.InMemoryStorage')
+class RecipeImageUploadTests(APITestCase):
+    """
+    Test cases for the early rejection of recipe image uploads.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass')
+        self.client.login(username='user', password='pass')
+
+    def post_image(self, image):
+        return self.client.post(
+            '/recipes/', {'recipe_name': 'Pie', 'image': image},
+            format='multipart',
+        )
+
+    def test_small_image_is_accepted(self):
+        """
+        Test that an image within the limits is saved.
+        """
+        response = self.post_image(png_upload(64, 48))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIn('image', Recipe.objects.get().image.name)
+
+    def test_upload_over_size_limit_is_aborted(self):
+        """
+        Test that reading stops at the size limit and reports the field.
+        """
+        with override_settings(IMAGE_UPLOAD_MAX_SIZE=2**20):
+            response = self.post_image(SimpleUploadedFile(
+                'big.png', b'x' * (3 * 2**19), 'image/png'))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['image'], ['Image size exceeds 1MB.'])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_oversized_body_is_rejected_before_reading(self):
+        """
+        Test that a Content-Length no valid upload can have is rejected.
+        """
+        with override_settings(
+                IMAGE_UPLOAD_MAX_SIZE=1024, DATA_UPLOAD_MAX_MEMORY_SIZE=1024):
+            response = self.post_image(
+                SimpleUploadedFile('big.png', b'x' * 4096, 'image/png'))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('non_field_errors', response.data)
+
+    def test_dimensions_read_from_header(self):
+        """
+        Test that an image wider than the limit is rejected.
+        """
+        with override_settings(IMAGE_UPLOAD_MAX_DIMENSION=100):
+            response = self.post_image(png_upload(101, 10))
+        self.assertEqual(
+            response.data['image'], ['Image width is larger than 100px.'])
+
+
+@override_settings(
+    DEFAULT_FILE_STORAGE='django.core.files.storage.InMemoryStorage',
+    IMAGE_VARIANTS_SYNC=True)
+class RecipeImageVariantTests(APITestCase):
+    """
+    Test cases for the resized variants of recipe images.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass')
+        self.client.login(username='user', password='pass')
+
+    def variant_size(self, url):
+        name = Recipe.objects.get().image_variants[url]
+        with default_storage.open(name) as file:
+            return Image.open(file).size
+
+    def test_variants_generated_after_upload(self):
+        """
+        Test that uploading an image records and serves its variants.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                '/recipes/',
+                {'recipe_name': 'Pie', 'image': png_upload(800, 600)},
+                format='multipart',
+            )
+        recipe = Recipe.objects.get()
+        self.assertEqual(recipe.image_variants['source'], recipe.image.name)
+        self.assertEqual(self.variant_size('thumb'), (150, 150))
+        self.assertEqual(self.variant_size('card'), (600, 400))
+        self.assertEqual(self.variant_size('full'), (800, 600))
+
+        response = self.client.get(f'/recipes/{recipe.id}/')
+        self.assertEqual(
+            set(response.data['image_variants']), {'thumb', 'card', 'full'})
+
+    def test_default_and_replaced_images_have_no_variants(self):
+        """
+        Test that the default image is not resized, and that variants of
+        a replaced image are not served.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = Recipe.objects.create(owner=self.user, recipe_name='Pie')
+        self.assertEqual(recipe.image_variants, {})
+        Recipe.objects.filter(pk=recipe.pk).update(
+            image_variants={'source': 'images/old.png'})
+        response = self.client.get(f'/recipes/{recipe.id}/')
+        self.assertIsNone(response.data['image_variants'])
+
+    def test_command_generates_missing_variants(self):
+        """
+        Test that generate_image_variants backfills existing images.
+        """
+        recipe = Recipe.objects.create(owner=self.user, recipe_name='Pie')
+        name = default_storage.save('images/pie.png', png_upload(300, 300))
+        Recipe.objects.filter(pk=recipe.pk).update(image=name)
+        out = StringIO()
+        call_command('generate_image_variants', stdout=out)
+        self.assertIn('Generated variants for 1 images', out.getvalue())
+        self.assertEqual(self.variant_size('full'), (300, 300))
+
+
+class CountingStorage(InMemoryStorage):
+    """
+    Storage counting the URLs it builds.
+    """
+    urls_built = 0
+
+    def url(self, name):
+        CountingStorage.urls_built += 1
+        return super().url(name)
+
+
+@override_settings(
+    DEFAULT_FILE_STORAGE='recipes.tests.CountingStorage',
+    RESPONSE_CACHE_TIMEOUT=0)
+class ImageURLCacheTests(APITestCase):
+    """
+    Test cases for the per-process cache of image URLs.
+    """
+
+    def setUp(self):
+        clear_urls()
+        CountingStorage.urls_built = 0
+        self.user = User.objects.create_user(username='user', password='pass')
+        for name in ('Pie', 'Soup', 'Bread'):
+            Recipe.objects.create(
+                owner=self.user, recipe_name=name, status='published')
+
+    def test_urls_built_once_per_image(self):
+        """
+        Test that a page of recipes by one author builds each distinct
+        URL once, also across requests.
+        """
+        response = self.client.get('/recipes/')
+        self.assertEqual(len(response.data['results']), 3)
+        # The default recipe image and the default profile image.
+        self.assertEqual(CountingStorage.urls_built, 2)
+        self.client.get('/recipes/')
+        self.assertEqual(CountingStorage.urls_built, 2)
+
+    def test_saving_the_profile_forgets_its_url(self):
+        """
+        Test that saving a profile drops the cached URL of its image.
+        """
+        self.client.get('/recipes/')
+        self.user.profile.save()
+        response = self.client.get('/recipes/')
+        self.assertEqual(CountingStorage.urls_built, 3)
+        self.assertEqual(
+            response.data['results'][0]['profile_image'],
+            self.user.profile.image.url)
+
+
+class RecipeTrendingTests(APITestCase):
+    """
+    Test cases for the trending scores and /recipes/trending/.
+    """
+
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(username=f'user{i}', password='pass')
+            for i in range(3)
+        ]
+        self.pie, self.soup, self.draft = (
+            Recipe.objects.create(
+                owner=self.users[0], recipe_name=name, status=status)
+            for name, status in (('Pie', 'published'),
+                                 ('Soup', 'published'),
+                                 ('Draft', 'pending_publish'))
+        )
+
+    def test_ranked_by_recent_activity(self):
+        """
+        Test that comments outweigh likes, recipes without activity and
+        unpublished recipes are left out.
+        """
+        for user in self.users:
+            Like.objects.create(owner=user, recipe=self.pie)
+        for user in self.users[:2]:
+            Comment.objects.create(owner=user, recipe=self.soup, content='Yum')
+        Like.objects.create(owner=self.users[0], recipe=self.draft)
+        Recipe.objects.create(
+            owner=self.users[1], recipe_name='Quiet', status='published')
+
+        update_scores()
+        response = self.client.get('/recipes/trending/')
+        self.assertEqual(
+            [row['recipe_name'] for row in response.data['results']],
+            ['Soup', 'Pie'])
+
+    def test_scores_decay_incrementally(self):
+        """
+        Test that a later run halves the scores after one half-life and
+        adds only the activity since the previous run.
+        """
+        Like.objects.create(owner=self.users[0], recipe=self.pie)
+        now = timezone.now()
+        update_scores(now=now)
+        self.assertAlmostEqual(
+            TrendingScore.objects.get().score, 1.0, places=3)
+
+        later = now + timedelta(hours=24)
+        Like.objects.create(owner=self.users[1], recipe=self.pie)
+        Like.objects.filter(owner=self.users[1]).update(created_at=later)
+        update_scores(now=later)
+        self.assertAlmostEqual(
+            TrendingScore.objects.get().score, 1.5, places=3)
+
+    def test_unpublished_and_faded_scores_are_dropped(self):
+        """
+        Test that scores of unpublished recipes and scores that decayed
+        below the minimum are deleted.
+        """
+        Like.objects.create(owner=self.users[0], recipe=self.pie)
+        Like.objects.create(owner=self.users[0], recipe=self.soup)
+        now = timezone.now()
+        update_scores(now=now)
+        self.soup.status = 'pending_delete'
+        self.soup.save()
+        update_scores(now=now + timedelta(hours=1))
+        self.assertEqual(
+            list(TrendingScore.objects.values_list('recipe', flat=True)),
+            [self.pie.id])
+        update_scores(now=now + timedelta(days=30))
+        self.assertFalse(TrendingScore.objects.exists())
+
+    def test_trending_list_query_count(self):
+        """
+        Test the anonymous trending page stays at a count and a page query.
+        """
+        Like.objects.create(owner=self.users[0], recipe=self.pie)
+        update_scores()
+        with override_settings(RESPONSE_CACHE_TIMEOUT=0):
+            with self.assertNumQueries(2):
+                self.client.get('/recipes/trending/')
+
+
+class RecipePurgeTests(APITestCase):
+    """
+    Test cases for purging recipes pending deletion.
+    """
+
+    def setUp(self):
+        vocabulary.clear()
+        self.user = User.objects.create_user(username='user', password='pass')
+        self.other = User.objects.create_user(username='other', password='x')
+        self.old, self.recent, self.published = (
+            Recipe.objects.create(
+                owner=self.user, recipe_name=name, status=status)
+            for name, status in (('Old', 'pending_delete'),
+                                 ('Recent', 'pending_delete'),
+                                 ('Kept', 'published'))
+        )
+        measure = Measurement.objects.create(measure='g')
+        for recipe in (self.old, self.recent, self.published):
+            for name in ('Flour', 'Sugar', 'Salt'):
+                RecipeIngredient.objects.create(
+                    recipe=recipe, quantity='1', measure=measure,
+                    ingredient=Ingredient.objects.get_or_create(name=name)[0])
+            for user in (self.user, self.other):
+                Like.objects.create(owner=user, recipe=recipe)
+                Comment.objects.create(
+                    owner=user, recipe=recipe, content='Yum')
+            FeedEntry.objects.create(
+                follower=self.other, recipe=recipe,
+                created_at=recipe.created_at)
+        Recipe.objects.filter(pk__in=[self.old.pk, self.published.pk]).update(
+            updated_at=timezone.now() - timedelta(days=31))
+
+    def test_purges_expired_recipes_with_their_rows(self):
+        """
+        Test that only recipes past the grace period are deleted, together
+        with all their rows, in batches smaller than the row count.
+        """
+        deleted, _ = purge_recipes(batch_size=2)
+        self.assertEqual(deleted['recipes.Recipe'], 1)
+        self.assertEqual(deleted['recipes.RecipeIngredient'], 3)
+        self.assertEqual(deleted['likes.Like'], 2)
+        self.assertEqual(deleted['comments.Comment'], 2)
+        self.assertEqual(deleted['feeds.FeedEntry'], 1)
+        self.assertEqual(
+            set(Recipe.objects.values_list('recipe_name', flat=True)),
+            {'Recent', 'Kept'})
+        for model in (RecipeIngredient, Like, Comment, FeedEntry):
+            self.assertFalse(model.objects.filter(recipe=self.old).exists())
+            self.assertTrue(
+                model.objects.filter(recipe=self.published).exists())
+        self.published.refresh_from_db()
+        self.assertEqual(self.published.likes_count, 2)
+        self.assertEqual(purge_recipes()[0], {})
+
+    def test_purge_invalidates_cached_lists(self):
+        """
+        Test that cached recipe lists drop purged recipes.
+        """
+        # Queryset updates bypass the signals that invalidate the cache.
+        Recipe.objects.filter(pk=self.old.pk).update(status='published')
+        self.assertEqual(self.client.get('/recipes/').data['count'], 2)
+        Recipe.objects.filter(pk=self.old.pk).update(status='pending_delete')
+        purge_recipes()
+        self.assertEqual(self.client.get('/recipes/').data['count'], 1)
+
+    def test_command_reports_throughput(self):
+        """
+        Test the command reports the purged rows and honours --grace-days.
+        """
+        out = StringIO()
+        call_command('purge_deleted_recipes', '--dry-run', stdout=out)
+        self.assertIn('1 recipes are due', out.getvalue())
+        out = StringIO()
+        call_command(
+            'purge_deleted_recipes', '--grace-days', '0', '--batch-size', '1',
+            stdout=out)
+        self.assertIn('Purged 2 recipes', out.getvalue())
+        self.assertIn('rows/s', out.getvalue())
+        self.assertEqual(Recipe.objects.get(), self.published)
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=60)
+class RecipeModerationTests(APITestCase):
+    """
+    Test cases for bulk status changes by staff.
+    """
+
+    def setUp(self):
+        vocabulary.clear()
+        cache.clear()
+        self.staff = User.objects.create_user(
+            username='staff', password='pass', is_staff=True)
+        self.author = User.objects.create_user(username='author', password='x')
+        self.reader = User.objects.create_user(username='reader', password='x')
+        Follower.objects.create(owner=self.reader, followed=self.author)
+        self.tomato = Ingredient.objects.create(name='Tomato')
+        self.grams = Measurement.objects.create(measure='grams')
+
+    def create_recipes(self, count, status):
+        recipes = []
+        for i in range(count):
+            recipe = Recipe.objects.create(
+                owner=self.author, recipe_name=f'{status} {i}', status=status)
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=self.tomato, quantity='1',
+                measure=self.grams)
+            recipes.append(recipe)
+        return recipes
+
+    def moderate(self, recipes, status):
+        return self.client.post('/recipes/moderation/', {'transitions': [
+            {'id': recipe.id, 'status': status} for recipe in recipes
+        ]}, format='json')
+
+    def cook_with_names(self):
+        response = self.client.get(
+            '/recipes/cook-with/', {'ingredients': 'tomato'})
+        return {row['recipe_name'] for row in response.data['results']}
+
+    def test_only_staff_can_moderate(self):
+        """
+        Test that other users are refused.
+        """
+        recipe, = self.create_recipes(1, 'pending_publish')
+        self.client.force_authenticate(self.author)
+        response = self.moderate([recipe], 'published')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_transitions_update_indexes_feeds_and_caches(self):
+        """
+        Test that one request publishes and unpublishes recipes, and that
+        the feeds, ingredient index, trending scores and cached lists
+        follow.
+        """
+        drafts = self.create_recipes(2, 'pending_publish')
+        published = self.create_recipes(2, 'published')
+        Like.objects.create(owner=self.reader, recipe=published[0])
+        update_scores()
+        self.assertEqual(self.client.get('/recipes/').data['count'], 2)
+
+        self.client.force_authenticate(self.staff)
+        response = self.client.post('/recipes/moderation/', {'transitions': [
+            {'id': drafts[0].id, 'status': 'published'},
+            {'id': drafts[1].id, 'status': 'published'},
+            {'id': published[0].id, 'status': 'pending_delete'},
+            {'id': published[1].id, 'status': 'published'},
+        ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {
+            'changed': {
+                'published': [drafts[0].id, drafts[1].id],
+                'pending_delete': [published[0].id],
+            },
+            'unchanged': [published[1].id],
+        })
+
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get('/recipes/').data['count'], 3)
+        self.assertEqual(
+            self.cook_with_names(),
+            {'pending_publish 0', 'pending_publish 1', 'published 1'})
+        self.assertEqual(
+            set(FeedEntry.objects.values_list('recipe', flat=True)),
+            {drafts[0].id, drafts[1].id, published[1].id})
+        self.assertFalse(TrendingScore.objects.exists())
+
+    def test_query_count_does_not_grow_with_batch(self):
+        """
+        Test that moderating more recipes takes no more queries.
+        """
+        self.client.force_authenticate(self.staff)
+        small = self.create_recipes(2, 'pending_publish')
+        large = self.create_recipes(6, 'published')
+        with CaptureQueriesContext(connection) as first:
+            self.moderate(small, 'published')
+        with CaptureQueriesContext(connection) as second:
+            self.moderate(large, 'pending_publish')
+        self.assertLessEqual(len(second), len(first))
+
+    def test_invalid_requests_change_nothing(self):
+        """
+        Test that unknown recipes and repeated recipes are rejected.
+        """
+        recipe, = self.create_recipes(1, 'pending_publish')
+        self.client.force_authenticate(self.staff)
+        response = self.client.post('/recipes/moderation/', {'transitions': [
+            {'id': recipe.id, 'status': 'published'},
+            {'id': recipe.id + 100, 'status': 'published'},
+        ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.moderate([recipe, recipe], 'published')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.status, 'pending_publish')
+
+
+def async_get(view_class, path, user=None, **kwargs):
+    """
+    GET 'path' from the async read path of 'view_class'.
+    """
+    request = AsyncRequestFactory().get(
+        path, headers=kwargs.pop('headers', None))
+    if user is not None:
+        request._force_auth_user = user
+    view = view_class.as_view(async_reads=True)
+    return async_to_sync(view)(request, **kwargs)
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=0)
+class RecipeAsyncReadTests(APITestCase):
+    """
+    Test cases for the async read path of the recipe views.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass')
+        self.other = User.objects.create_user(username='other', password='x')
+        self.recipes = [
+            Recipe.objects.create(
+                owner=owner, recipe_name=name, status='published')
+            for owner, name in ((self.user, 'Pie'), (self.other, 'Soup'))
+        ]
+        self.draft = Recipe.objects.create(
+            owner=self.other, recipe_name='Draft')
+        RecipeIngredient.objects.create(
+            recipe=self.recipes[1], quantity='2',
+            ingredient=Ingredient.objects.create(name='Leek'),
+            measure=Measurement.objects.create(measure='pieces'))
+        Like.objects.create(owner=self.user, recipe=self.recipes[1])
+        self.client.force_authenticate(self.user)
+
+    def test_list_matches_sync_path(self):
+        """
+        Test that the async list returns the same data with the same
+        queries as the sync list.
+        """
+        path = '/recipes/?fields=*'
+        with CaptureQueriesContext(connection) as sync_queries:
+            expected = self.client.get(path).data
+        with CaptureQueriesContext(connection) as async_queries:
+            response = async_get(RecipeList, path, user=self.user)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, expected)
+        self.assertEqual(len(async_queries), len(sync_queries))
+
+    def test_detail_matches_sync_path(self):
+        """
+        Test that the async detail returns the same data and answers
+        conditional requests.
+        """
+        pk = self.recipes[1].pk
+        expected = self.client.get(f'/recipes/{pk}/')
+        response = async_get(RecipeDetail, f'/recipes/{pk}/', user=self.user,
+                             pk=pk)
+        self.assertEqual(response.data, expected.data)
+        self.assertEqual(response['ETag'], expected['ETag'])
+
+        response = async_get(
+            RecipeDetail, f'/recipes/{pk}/', user=self.user, pk=pk,
+            headers={'If-None-Match': expected['ETag']})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_detail_hides_other_users_drafts(self):
+        """
+        Test that the async detail answers 404 for invisible recipes.
+        """
+        response = async_get(
+            RecipeDetail, f'/recipes/{self.draft.pk}/', user=self.user,
+            pk=self.draft.pk)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_writes_use_sync_view(self):
+        """
+        Test that other methods are handled by the sync view.
+        """
+        request = AsyncRequestFactory().post(
+            '/recipes/', {'recipe_name': 'Stew'},
+            content_type='application/json')
+        request._force_auth_user = self.user
+        view = RecipeList.as_view(async_reads=True)
+        response = async_to_sync(view)(request)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(Recipe.objects.filter(recipe_name='Stew').exists())
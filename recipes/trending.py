@@ -0,0 +1,121 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max, Q
+from django.db.models.signals import post_save
+from django.utils import timezone
+from comments.models import Comment
+from likes.models import Like
+from tt_drf_api.cache import bump_versions
+from .models import Recipe, TrendingScore
+from .signals import recipes_status_changed
+
+"""
+Trending recipes.
+
+A recipe's trending score is the sum of its recent likes and comments,
+each weighted by TRENDING_WEIGHTS and decayed exponentially with its age,
+halving every TRENDING_HALF_LIFE hours. Because every event decays at the
+same rate, the scores can be brought forward incrementally: multiply all
+stored scores by the decay since the last run, then add the events that
+arrived since then. Scores below TRENDING_MIN_SCORE are dropped, and so is
+the score of a recipe as soon as it leaves the published status, so the
+list reads the score index in order without filtering on recipes.
+
+The first run, and a rebuild, add the events of the last TRENDING_WINDOW
+hours; older events would add almost nothing.
+
+Likes and comments deleted after they were counted keep their share of
+the score until it decays.
+
+Functions:
+    - update_scores: Brings the score table up to date.
+"""
+
+
+def decay(hours):
+    return 0.5 ** (hours / settings.TRENDING_HALF_LIFE)
+
+
+def age_in_hours(now, then):
+    return (now - then).total_seconds() / 3600
+
+
+def collect_activity(since, now):
+    """
+    Return {recipe_id: decayed weight} of the likes and comments created
+    in the interval (since, now].
+    """
+    weights = settings.TRENDING_WEIGHTS
+    activity = {}
+    for model, weight in ((Like, weights['like']),
+                          (Comment, weights['comment'])):
+        events = model.objects.filter(
+            created_at__gt=since, created_at__lte=now,
+            recipe__status='published',
+        ).order_by().values_list('recipe_id', 'created_at')
+        for recipe_id, created_at in events.iterator():
+            activity[recipe_id] = activity.get(recipe_id, 0) + (
+                weight * decay(age_in_hours(now, created_at))
+            )
+    return activity
+
+
+@transaction.atomic
+def update_scores(now=None, rebuild=False):
+    """
+    Decay the stored scores to 'now' and add the activity since the last
+    run. Returns (number of scores updated, number of scores dropped).
+    """
+    now = now or timezone.now()
+    if rebuild:
+        TrendingScore.objects.all().delete()
+
+    last = TrendingScore.objects.aggregate(last=Max('computed_at'))['last']
+    if last is None:
+        last = now - timedelta(hours=settings.TRENDING_WINDOW)
+    else:
+        TrendingScore.objects.update(
+            score=F('score') * decay(age_in_hours(now, last)),
+            computed_at=now,
+        )
+
+    activity = collect_activity(last, now)
+    existing = TrendingScore.objects.in_bulk(list(activity))
+    for recipe_id, score in existing.items():
+        score.score += activity.pop(recipe_id)
+    TrendingScore.objects.bulk_update(
+        existing.values(), ['score'], batch_size=500)
+    TrendingScore.objects.bulk_create([
+        TrendingScore(recipe_id=recipe_id, score=score, computed_at=now)
+        for recipe_id, score in activity.items()
+    ], batch_size=500)
+
+    dropped, _ = TrendingScore.objects.filter(
+        Q(score__lt=settings.TRENDING_MIN_SCORE) |
+        ~Q(recipe__status='published')
+    ).delete()
+
+    transaction.on_commit(lambda: bump_versions('recipes'))
+    return len(existing) + len(activity), dropped
+
+
+def recipe_status_changed(sender, instance, created, **kwargs):
+    """
+    Drop the score of a recipe that stops being published.
+    """
+    was_published = instance.previous_status == 'published'
+    if was_published and instance.status != 'published':
+        TrendingScore.objects.filter(recipe=instance.pk).delete()
+
+
+def batch_status_changed(sender, recipes, **kwargs):
+    TrendingScore.objects.filter(recipe__in=[
+        recipe.pk for recipe in recipes
+        if recipe.previous_status == 'published'
+        and recipe.status != 'published'
+    ]).delete()
+
+
+post_save.connect(recipe_status_changed, sender=Recipe)
+recipes_status_changed.connect(batch_status_changed, sender=Recipe)
@@ -4,6 +4,10 @@ from recipes import views
 urlpatterns = [
     path('recipes/', views.RecipeList.as_view()),
     path('recipes/<int:pk>/', views.RecipeDetail.as_view()),
+    path('recipes/cook-with/', views.RecipeCookWithList.as_view()),
+    path('recipes/trending/', views.RecipeTrendingList.as_view()),
+    path('recipes/moderation/', views.RecipeModeration.as_view()),
+    path('vocabulary/stats/', views.vocabulary_stats),
     path('ingredients/', views.RecipeIngredientList.as_view()),
     path('ingredients/<int:pk>/', views.RecipeIngredientDetail.as_view()),
 ]
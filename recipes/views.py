@@ -1,9 +1,27 @@
-from django.db.models import Count, Q
+from functools import reduce
+from operator import or_
+from django.db.models import IntegerField, OuterRef, Q, Subquery, Value
 from rest_framework import generics, permissions, filters
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
 from django_filters.rest_framework import DjangoFilterBackend
-from .models import Recipe, RecipeIngredient
-from .serializers import RecipeSerializer, RecipeIngredientSerializer
+from .ingredient_index import match_recipes
+from .models import Ingredient, Recipe, RecipeIngredient
+from .moderation import change_statuses
+from .search import RecipeSearchFilter
+from .serializers import (
+    RecipeIngredientSerializer, RecipeModerationSerializer, RecipeSerializer,
+)
+from .vocabulary import VOCABULARIES
+from followers.filters import FollowGraphFilter
+from likes.models import Like
+from tt_drf_api.async_views import AsyncReadMixin
+from tt_drf_api.cache import AnonymousResponseCacheMixin
+from tt_drf_api.conditional import ConditionalRetrieveMixin
+from tt_drf_api.fieldsets import SparseFieldsetViewMixin
+from tt_drf_api.pagination import KeysetPagination
 from tt_drf_api.permissions import IsOwnerOrReadOnly
 
 """
@@ -12,41 +30,56 @@ Views for the Recipe app.
 This module provides API views for managing recipes and their ingredients,
 allowing users to create, update, delete, and retrieve data. The views are
 designed with permissions to ensure proper access control and include
-support for filtering, searching, and ordering.
+support for filtering, searching, and ordering. The recipe lists and
+detail can serve reads asynchronously, see tt_drf_api.async_views.
 
 Classes:
     - RecipeList: Handles listing and creation of recipes. Supports filters,
-      search, and ordering for published recipes, while authenticated users
-      can manage their own drafts and deletions.
+      ranked full-text search, and ordering for published recipes, while
+      authenticated users can manage their own drafts and deletions. Lists
+      a summary of each recipe unless other fields are requested.
     - RecipeDetail: Provides detailed view of a recipe, allowing owners to
       update or delete their recipes. Handles access control based on recipe
-      ownership and status.
+      ownership and status, and answers conditional GET requests.
+    - RecipeCookWithList: Lists published recipes ranked by how many of
+      their ingredients are covered by a given list of ingredient names.
+    - RecipeTrendingList: Lists published recipes by their trending score.
+    - RecipeModeration: Lets staff change the status of many recipes at
+      once.
     - RecipeIngredientList: Manages listing and creation of recipe ingredients.
       Ensures that only recipe owners can add ingredients to their recipes.
     - RecipeIngredientDetail: Provides detail, update, and delete operations
       for a specific recipe ingredient. Restricted to the recipe owner.
+
+Functions:
+    - vocabulary_stats: Staff-only hit/miss counters of this process's
+      ingredient and measurement name caches.
 """
 
 
-class RecipeList(generics.ListCreateAPIView):
+class RecipeList(
+        AnonymousResponseCacheMixin, AsyncReadMixin, SparseFieldsetViewMixin,
+        generics.ListCreateAPIView):
     serializer_class = RecipeSerializer
+    summary_fields = RecipeSerializer.summary_fields
+    cache_namespace = 'recipes'
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = KeysetPagination
+    keyset_fields = ['created_at', 'likes_count', 'comments_count']
 
     filter_backends = [
+        RecipeSearchFilter,
         filters.OrderingFilter,
-        filters.SearchFilter,
         DjangoFilterBackend,
+        FollowGraphFilter,
     ]
     filterset_fields = [
-        'owner__followed__owner__profile',
         'likes__owner__profile',
         'owner__profile',
     ]
-    search_fields = [
-        'owner__username',
-        'recipe_name',
-        'recipe_ingredients__ingredient__name',
-    ]
+    follow_graph_filters = {
+        'owner__followed__owner__profile': 'following',
+    }
     ordering_fields = [
         'likes_count',
         'comments_count',
@@ -58,10 +91,7 @@ class RecipeList(generics.ListCreateAPIView):
         Return recipes based on query parameters.
         """
         user = self.request.user
-        queryset = Recipe.objects.annotate(
-            likes_count=Count('likes', distinct=True),
-            comments_count=Count('comment', distinct=True)
-        ).order_by('-created_at')
+        queryset = Recipe.objects.order_by('-created_at')
 
         # Parse the 'status' query parameter
         status_filter = self.request.query_params.getlist('status')
@@ -81,25 +111,32 @@ class RecipeList(generics.ListCreateAPIView):
             # Default: Show only published recipes
             queryset = queryset.filter(status='published')
 
-        return queryset
+        return RecipeSerializer.setup_eager_loading(
+            queryset, fields=self.get_fieldset()
+        )
 
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user, status='pending_publish')
 
 
-class RecipeDetail(generics.RetrieveUpdateDestroyAPIView):
+class RecipeDetail(
+        ConditionalRetrieveMixin, AsyncReadMixin, SparseFieldsetViewMixin,
+        generics.RetrieveUpdateDestroyAPIView):
     serializer_class = RecipeSerializer
     permission_classes = [IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
+    validator_fields = (
+        'updated_at', 'likes_count', 'comments_count',
+        'owner__profile__updated_at', 'viewer_like_id',
+    )
 
     def get_queryset(self):
         """
         Return recipes based on query parameters and ownership.
         """
         user = self.request.user
-        queryset = Recipe.objects.annotate(
-            likes_count=Count('likes', distinct=True),
-            comments_count=Count('comment', distinct=True)
-        ).order_by('created_at')
+        queryset = RecipeSerializer.setup_eager_loading(
+            Recipe.objects.order_by('created_at'), fields=self.get_fieldset()
+        )
 
         if user.is_authenticated:
             return queryset.filter(
@@ -109,11 +146,116 @@ class RecipeDetail(generics.RetrieveUpdateDestroyAPIView):
 
         return queryset.filter(status='published')
 
+    def get_validator_queryset(self):
+        """
+        Add the id of the logged-in user's like, which is part of the
+        response.
+        """
+        queryset = super().get_validator_queryset()
+        if not self.request.user.is_authenticated:
+            return queryset.annotate(
+                viewer_like_id=Value(None, IntegerField())
+            )
+        return queryset.annotate(
+            viewer_like_id=Subquery(
+                Like.objects.filter(
+                    owner_id=self.request.user.pk, recipe=OuterRef('pk')
+                ).order_by().values('id')[:1]
+            )
+        )
+
+
+class RecipeCookWithList(generics.ListAPIView):
+    """
+    API view to find published recipes for the ingredients a user has.
+
+    Takes `?ingredients=tomato,basil` and ranks recipes by how many of
+    their ingredient rows are covered, best matches first. Matching runs
+    on the ingredient inverted index; only the recipes on the returned
+    page are loaded.
+    """
+    serializer_class = RecipeSerializer
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+
+    def get_ingredient_ids(self):
+        names = {
+            name.strip()
+            for value in self.request.query_params.getlist('ingredients')
+            for name in value.split(',')
+            if name.strip()
+        }
+        if not names:
+            raise ValidationError({
+                'ingredients': 'Provide at least one ingredient name.'
+            })
+        return Ingredient.objects.filter(
+            reduce(or_, (Q(name__iexact=name) for name in names))
+        ).values_list('id', flat=True)
+
+    def list(self, request, *args, **kwargs):
+        ranked = match_recipes(list(self.get_ingredient_ids()))
+        page = self.paginate_queryset(ranked)
+        recipes = RecipeSerializer.setup_eager_loading(
+            Recipe.objects.filter(
+                pk__in=[pk for pk, _ in page], status='published'
+            )
+        ).in_bulk()
+        matched = [(recipes[pk], count) for pk, count in page if pk in recipes]
+
+        data = self.get_serializer(
+            [recipe for recipe, _ in matched], many=True
+        ).data
+        for row, (_, count) in zip(data, matched):
+            row['matched_ingredients'] = count
+        return self.get_paginated_response(data)
+
+
+class RecipeTrendingList(
+        AnonymousResponseCacheMixin, AsyncReadMixin, SparseFieldsetViewMixin,
+        generics.ListAPIView):
+    """
+    API view listing published recipes by recent like and comment
+    activity, read from the scores materialized by the
+    update_trending_scores command.
+    """
+    serializer_class = RecipeSerializer
+    summary_fields = RecipeSerializer.summary_fields
+    cache_namespace = 'recipes'
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+
+    def get_queryset(self):
+        # Only published recipes have a score.
+        queryset = Recipe.objects.filter(
+            trending__isnull=False
+        ).order_by('-trending__score', '-trending__recipe')
+        return RecipeSerializer.setup_eager_loading(
+            queryset, fields=self.get_fieldset()
+        )
+
+
+class RecipeModeration(generics.GenericAPIView):
+    """
+    Staff-only API view changing the status of many recipes in one
+    request, see recipes.moderation.
+    """
+    serializer_class = RecipeModerationSerializer
+    permission_classes = [permissions.IsAdminUser]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        changed, unchanged = change_statuses(
+            serializer.validated_data['transitions']
+        )
+        return Response({'changed': changed, 'unchanged': unchanged})
+
 
 class RecipeIngredientList(generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     serializer_class = RecipeIngredientSerializer
-    queryset = RecipeIngredient.objects.all()
+    queryset = RecipeIngredientSerializer.setup_eager_loading(
+        RecipeIngredient.objects.all()
+    )
 
     def perform_create(self, serializer):
         recipe = serializer.validated_data.get('recipe')
@@ -128,4 +270,18 @@ class RecipeIngredientList(generics.ListCreateAPIView):
 class RecipeIngredientDetail(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = RecipeIngredientSerializer
     permission_classes = [IsOwnerOrReadOnly]
-    queryset = RecipeIngredient.objects.all()
+    queryset = RecipeIngredientSerializer.setup_eager_loading(
+        RecipeIngredient.objects.all()
+    )
+
+
+@api_view()
+@permission_classes([permissions.IsAdminUser])
+def vocabulary_stats(request):
+    """
+    Return the size and hit/miss counters of the vocabulary caches of the
+    worker process that serves the request.
+    """
+    return Response({
+        name: vocabulary.stats() for name, vocabulary in VOCABULARIES.items()
+    })
@@ -0,0 +1,215 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from .models import Ingredient, Measurement
+
+"""
+Name lookups for the ingredient and measurement vocabularies.
+
+Both tables are small and almost append-only, and every ingredient row
+that is written names one of each. VocabularyCache keeps a bounded
+name -> id map in each worker process, optionally backed by a shared
+Django cache (VOCABULARY_CACHE), so the write path rarely has to query
+either table.
+
+Missing names are created with `bulk_create(ignore_conflicts=True)` and
+read back, so two requests adding the same name at once both end up with
+the row that won. Created names are only cached once the transaction
+commits, so a rolled back insert never leaves a dangling id.
+
+Renamed and deleted rows are evicted from the local map of the process
+that changed them; other processes drop them when they fall out of their
+LRU map or the shared cache entry expires.
+
+Objects:
+    - ingredients / measurements: The caches used by the serializers.
+    - warm_up: Preloads both caches, called from wsgi.py when
+      VOCABULARY_WARM_UP is set.
+    - clear: Empties both caches and resets their counters.
+"""
+
+
+class VocabularyCache:
+    """
+    Thread-safe, bounded (LRU) map from the unique 'field' of 'model' to
+    the row id, with hit and miss counters.
+    """
+
+    def __init__(self, model, field):
+        self.model = model
+        self.field = field
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def max_size(self):
+        return settings.VOCABULARY_CACHE_SIZE
+
+    @property
+    def shared(self):
+        alias = settings.VOCABULARY_CACHE
+        return caches[alias] if alias else None
+
+    def shared_key(self, name):
+        digest = hashlib.sha1(name.encode()).hexdigest()
+        return f'vocabulary:{self.model._meta.label_lower}:{digest}'
+
+    def instance(self, pk, name):
+        """
+        Return a model instance with only its id and name loaded, enough
+        to assign to a foreign key and to serialize.
+        """
+        obj = self.model(pk=pk, **{self.field: name})
+        obj._state.adding = False
+        return obj
+
+    def get(self, name):
+        return self.get_many([name])[name]
+
+    def get_many(self, names):
+        """
+        Return {name: instance} for the given names, creating missing rows.
+        """
+        names = set(names)
+        found = self._get_local(names)
+        missing = names - found.keys()
+
+        if missing and self.shared is not None:
+            keys = {self.shared_key(name): name for name in missing}
+            for key, pk in self.shared.get_many(keys).items():
+                found[keys[key]] = pk
+            missing -= found.keys()
+            self._set_local({name: found[name] for name in keys.values()
+                             if name in found})
+
+        if missing:
+            existing, created = self._load(missing)
+            found.update(existing)
+            found.update(created)
+            self._remember(existing)
+            transaction.on_commit(lambda: self._remember(created))
+
+        return {name: self.instance(found[name], name) for name in names}
+
+    def _get_local(self, names):
+        found = {}
+        with self.lock:
+            for name in names:
+                pk = self.entries.get(name)
+                if pk is None:
+                    self.misses += 1
+                    continue
+                self.hits += 1
+                self.entries.move_to_end(name)
+                found[name] = pk
+        return found
+
+    def _remember(self, mapping):
+        if not mapping:
+            return
+        self._set_local(mapping)
+        if self.shared is not None:
+            self.shared.set_many(
+                {self.shared_key(name): pk for name, pk in mapping.items()},
+                settings.VOCABULARY_CACHE_TIMEOUT,
+            )
+
+    def _set_local(self, mapping):
+        with self.lock:
+            self.entries.update(mapping)
+            for name in mapping:
+                self.entries.move_to_end(name)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def _load(self, names):
+        """
+        Return ({name: id} of existing rows, {name: id} of rows inserted
+        now) for 'names'. Rows inserted concurrently are picked up by the
+        second read and count as inserted.
+        """
+        lookup = f'{self.field}__in'
+        existing = dict(
+            self.model.objects.filter(**{lookup: names})
+            .values_list(self.field, 'pk')
+        )
+        missing = names - existing.keys()
+        if not missing:
+            return existing, {}
+        self.model.objects.bulk_create(
+            [self.model(**{self.field: name}) for name in missing],
+            ignore_conflicts=True,
+        )
+        created = dict(
+            self.model.objects.filter(**{lookup: missing})
+            .values_list(self.field, 'pk')
+        )
+        return existing, created
+
+    def warm_up(self):
+        """
+        Load the most recently added names, up to the size of the cache.
+        """
+        rows = self.model.objects.order_by('-pk').values_list(
+            self.field, 'pk'
+        )[:self.max_size]
+        self._set_local(dict(reversed(rows)))
+
+    def discard(self, pk):
+        """
+        Forget every name mapped to 'pk'.
+        """
+        with self.lock:
+            for name in [n for n, v in self.entries.items() if v == pk]:
+                del self.entries[name]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self.lock:
+            return {
+                'size': len(self.entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+ingredients = VocabularyCache(Ingredient, 'name')
+measurements = VocabularyCache(Measurement, 'measure')
+VOCABULARIES = {'ingredients': ingredients, 'measurements': measurements}
+
+
+def warm_up():
+    for vocabulary in VOCABULARIES.values():
+        vocabulary.warm_up()
+
+
+def clear():
+    for vocabulary in VOCABULARIES.values():
+        vocabulary.clear()
+
+
+def vocabulary_changed(sender, instance, created=False, **kwargs):
+    if created:
+        return
+    vocabulary = ingredients if sender is Ingredient else measurements
+    vocabulary.discard(instance.pk)
+    if vocabulary.shared is not None:
+        name = getattr(instance, vocabulary.field)
+        vocabulary.shared.delete(vocabulary.shared_key(name))
+
+
+post_save.connect(vocabulary_changed, sender=Ingredient)
+post_delete.connect(vocabulary_changed, sender=Ingredient)
+post_save.connect(vocabulary_changed, sender=Measurement)
+post_delete.connect(vocabulary_changed, sender=Measurement)
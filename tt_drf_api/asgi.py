@@ -9,8 +9,23 @@ https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tt_drf_api.settings')
+# Serve reads from the async views; ASYNC_READ_VIEWS=0 turns them off.
+os.environ.setdefault('ASYNC_READ_VIEWS', '1')
 
 application = get_asgi_application()
+
+if settings.VOCABULARY_WARM_UP:
+    from recipes.vocabulary import warm_up
+    warm_up()
+
+if settings.FOLLOW_GRAPH_WARM_UP:
+    from followers.graph import follow_graph
+    follow_graph.build()
+
+if settings.PROFILE_INDEX_WARM_UP:
+    from profiles.autocomplete import prefix_index
+    prefix_index.build()
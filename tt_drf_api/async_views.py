@@ -0,0 +1,155 @@
+import asyncio
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import prefetch_related_objects
+from django.http import Http404
+from django.utils.decorators import classonlymethod
+from rest_framework.response import Response
+
+"""
+Async read path for generic list and detail views.
+
+DRF views are synchronous: under ASGI every request holds a thread for its
+whole duration, so a slow database caps concurrency at the size of the
+thread pool. AsyncReadMixin serves GET and HEAD from coroutines instead.
+The page or object is read, then the prefetches and the viewer relations
+the serializer needs are queried together with asyncio.gather, and only
+then is the data serialized.
+
+Django 4.2's async ORM still runs each query on the request's sync
+thread, one at a time, since they share its connection; the event loop
+is free while they run, and the gathered queries overlap as soon as the
+ORM can run them concurrently. Authentication, filter backends and
+pagination are synchronous DRF code and run through `sync_to_async`, as
+does serialization, so a lazily loaded relation still works. Other
+methods are passed to the synchronous view unchanged.
+
+The async path is used when ASYNC_READ_VIEWS is set, which asgi.py does
+by default, or when `as_view(async_reads=True)` is called.
+
+Classes:
+    - AsyncReadMixin: Async GET for ListModelMixin and RetrieveModelMixin
+      views.
+"""
+
+SAFE_READS = ('GET', 'HEAD')
+
+
+class AsyncReadMixin:
+    """
+    Serves GET and HEAD requests with `alist` or `aretrieve`. Views that
+    customize `list` or `retrieve` override the async version as well.
+    """
+    async_reads = None
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        enabled = initkwargs.get('async_reads', cls.async_reads)
+        if enabled is None:
+            enabled = settings.ASYNC_READ_VIEWS
+        if not enabled:
+            return view
+        sync_view = sync_to_async(view)
+
+        async def async_view(request, *args, **kwargs):
+            if request.method not in SAFE_READS:
+                return await sync_view(request, *args, **kwargs)
+            self = cls(**initkwargs)
+            self.setup(request, *args, **kwargs)
+            return await self.adispatch(request, *args, **kwargs)
+
+        for attr in ('cls', 'initkwargs', 'view_class', 'view_initkwargs'):
+            setattr(async_view, attr, getattr(view, attr))
+        async_view.csrf_exempt = True
+        return async_view
+
+    async def adispatch(self, request, *args, **kwargs):
+        """
+        `dispatch` for GET and HEAD.
+        """
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        try:
+            # Authentication, permissions and throttling may query.
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            if hasattr(self, 'retrieve'):
+                response = await self.aretrieve(request, *args, **kwargs)
+            else:
+                response = await self.alist(request, *args, **kwargs)
+        except Exception as exc:
+            response = await sync_to_async(self.handle_exception)(exc)
+        self.response = self.finalize_response(
+            request, response, *args, **kwargs
+        )
+        return self.response
+
+    async def aget_queryset(self):
+        """
+        Return the filtered queryset without its prefetches, and the
+        prefetch lookups, which `hydrate` runs separately.
+        """
+        queryset = await sync_to_async(self.filter_queryset)(
+            self.get_queryset()
+        )
+        return (
+            queryset.prefetch_related(None),
+            queryset._prefetch_related_lookups,
+        )
+
+    async def hydrate(self, serializer, instances, lookups):
+        """
+        Run the prefetches and the viewer lookups of 'serializer' for
+        'instances' concurrently.
+        """
+        tasks = []
+        if lookups:
+            tasks.append(
+                sync_to_async(prefetch_related_objects)(instances, *lookups)
+            )
+        if hasattr(serializer, 'aprime_viewer'):
+            tasks.append(serializer.aprime_viewer(instances))
+        await asyncio.gather(*tasks)
+
+    async def serialize(self, serializer):
+        return await sync_to_async(lambda: serializer.data)()
+
+    async def alist(self, request, *args, **kwargs):
+        queryset, lookups = await self.aget_queryset()
+        page = await sync_to_async(self.paginate_queryset)(queryset)
+        instances = page if page is not None else [
+            obj async for obj in queryset
+        ]
+        serializer = self.get_serializer(instances, many=True)
+        await self.hydrate(serializer.child, instances, lookups)
+        data = await self.serialize(serializer)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    async def aget_object(self):
+        """
+        `get_object` with the async ORM. Returns the object and the
+        prefetch lookups still to run for it.
+        """
+        queryset, lookups = await self.aget_queryset()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            obj = await queryset.aget(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            )
+        except (queryset.model.DoesNotExist, TypeError, ValueError,
+                ValidationError):
+            raise Http404
+        await sync_to_async(self.check_object_permissions)(self.request, obj)
+        return obj, lookups
+
+    async def aretrieve(self, request, *args, **kwargs):
+        instance, lookups = await self.aget_object()
+        serializer = self.get_serializer(instance)
+        await self.hydrate(serializer, [instance], lookups)
+        return Response(await self.serialize(serializer))
@@ -0,0 +1,196 @@
+import hashlib
+import time
+import uuid
+from functools import partial
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from rest_framework import status
+from rest_framework.response import Response
+
+"""
+Response cache for anonymous list requests.
+
+Anonymous visitors all see the same published data, so a list response
+can be cached by its normalized URL and shared between them. Every cache
+namespace (e.g. 'recipes') has a version that is part of the entry keys;
+changing a model the namespace depends on replaces the version, which
+orphans all of the namespace's entries at once. Orphaned entries expire
+on their own.
+
+When an entry is missing, one request computes it while simultaneous
+requests for the same key wait for the result instead of all querying
+the database.
+
+Functions:
+    - bump_versions: Invalidates the entries of one or more namespaces.
+    - invalidate_on_change: Bumps namespaces when a model is saved or
+      deleted.
+    - invalidate_on_signal: Bumps namespaces when a custom signal is
+      sent.
+    - get_or_compute: Cache lookup with miss coalescing.
+
+Classes:
+    - AnonymousResponseCacheMixin: Caches `list()` for anonymous requests.
+"""
+
+LOCK_TIMEOUT = 10
+POLL_INTERVAL = 0.05
+
+
+def get_cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def version_key(namespace):
+    return f'response:{namespace}:version'
+
+
+def get_version(namespace):
+    cache = get_cache()
+    key = version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def bump_versions(*namespaces):
+    """
+    Give each namespace a new version. Random versions rather than a
+    counter, so an evicted version key can never bring old entries back.
+    """
+    get_cache().set_many(
+        {version_key(namespace): uuid.uuid4().hex for namespace in namespaces},
+        None,
+    )
+
+
+def invalidation_handler(*namespaces, fields=None):
+    """
+    Signal handler bumping 'namespaces' right away, and again on commit
+    so a response cached from data that was not yet committed is dropped
+    as well. With 'fields', saves limited to other fields are ignored.
+    """
+    def handler(sender, update_fields=None, **kwargs):
+        if fields and update_fields and not fields.intersection(update_fields):
+            return
+        bump_versions(*namespaces)
+        transaction.on_commit(partial(bump_versions, *namespaces))
+    return handler
+
+
+def invalidate_on_change(model, *namespaces, fields=None):
+    """
+    Bump 'namespaces' whenever 'model' is saved or deleted. 'fields', a
+    set of field names, skips saves with `update_fields` that contain
+    none of them.
+    """
+    handler = invalidation_handler(*namespaces, fields=fields)
+    uid = f'response-cache:{model._meta.label}:{",".join(namespaces)}'
+    post_save.connect(handler, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(handler, sender=model, weak=False, dispatch_uid=uid)
+
+
+def invalidate_on_signal(signal, sender, *namespaces):
+    """
+    Bump 'namespaces' whenever 'signal' is sent by 'sender', e.g. for
+    batch updates that send no post_save.
+    """
+    handler = invalidation_handler(*namespaces)
+    uid = f'response-cache:{sender._meta.label}:{",".join(namespaces)}'
+    signal.connect(handler, sender=sender, weak=False, dispatch_uid=uid)
+
+
+def response_cache_key(namespace, request):
+    """
+    Key for a request in the current version of a namespace. The query
+    parameters are sorted so equivalent URLs share an entry.
+    """
+    params = sorted(
+        (name, sorted(values))
+        for name, values in request.query_params.lists()
+    )
+    url = f'{request.get_host()}{request.path}?{params}'
+    digest = hashlib.sha1(url.encode()).hexdigest()
+    return f'response:{namespace}:{get_version(namespace)}:{digest}'
+
+
+def get_or_compute(key, compute, timeout):
+    """
+    Return the cached value for 'key', or compute and cache it. Only one
+    caller computes a missing value; the others wait for it, up to
+    LOCK_TIMEOUT seconds, and then compute it themselves. 'compute' may
+    return None to skip caching.
+    """
+    cache = get_cache()
+    value = cache.get(key)
+    if value is not None:
+        return value
+
+    lock = f'{key}:lock'
+    if cache.add(lock, 1, LOCK_TIMEOUT):
+        try:
+            value = compute()
+            if value is not None:
+                cache.set(key, value, timeout)
+        finally:
+            cache.delete(lock)
+        return value
+
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        value = cache.get(key)
+        if value is not None:
+            return value
+        if cache.get(lock) is None:
+            break
+    return compute()
+
+
+class AnonymousResponseCacheMixin:
+    """
+    Caches the data of successful `list()` responses to anonymous
+    requests for RESPONSE_CACHE_TIMEOUT seconds. Views set
+    `cache_namespace`, which models invalidate via `invalidate_on_change`.
+    """
+    cache_namespace = None
+
+    def list(self, request, *args, **kwargs):
+        timeout = settings.RESPONSE_CACHE_TIMEOUT
+        if request.user.is_authenticated or not timeout:
+            return super().list(request, *args, **kwargs)
+
+        response = None
+
+        def compute():
+            nonlocal response
+            response = super(AnonymousResponseCacheMixin, self).list(
+                request, *args, **kwargs
+            )
+            if response.status_code == status.HTTP_200_OK:
+                return response.data
+            return None
+
+        data = get_or_compute(
+            response_cache_key(self.cache_namespace, request),
+            compute, timeout,
+        )
+        if data is None:
+            return response
+        return Response(data)
+
+    async def alist(self, request, *args, **kwargs):
+        """
+        `list` for AsyncReadMixin views. Cached responses are read and
+        computed by the synchronous `list`, whose lock waits would block
+        the event loop.
+        """
+        timeout = settings.RESPONSE_CACHE_TIMEOUT
+        if request.user.is_authenticated or not timeout:
+            return await super().alist(request, *args, **kwargs)
+        return await sync_to_async(self.list)(request, *args, **kwargs)
@@ -0,0 +1,68 @@
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+"""
+Reconciliation of denormalized counter columns.
+
+Counters kept by signal handlers can drift when rows are written around
+the ORM (raw SQL, bulk updates and deletes, restores). `recount_counters`
+walks a table in primary key chunks, finds the rows whose stored counters
+differ from the real counts and rewrites only those rows. The
+recount_recipe_counters and recount_profile_counters commands use it.
+
+Functions:
+    - count_of: Correlated subquery counting related rows.
+    - recount_counters: Fixes the drifted counters of a model.
+"""
+
+
+def count_of(queryset, field, outer='pk'):
+    """
+    Correlated subquery counting the rows of 'queryset' whose 'field'
+    equals the outer row's 'outer'.
+    """
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef(outer)})
+        .order_by().values(field)
+        .annotate(n=Count('id')).values('n')
+    ), 0)
+
+
+def recount_counters(model, counts, chunk_size=1000):
+    """
+    Rewrite the counters of 'model' rows that have drifted, 'chunk_size'
+    rows at a time. 'counts' returns {counter field: count expression},
+    e.g. built with `count_of`. Returns (rows checked, rows fixed).
+    """
+    last_pk = 0
+    checked = fixed = 0
+
+    while True:
+        ids = list(
+            model.objects.filter(pk__gt=last_pk)
+            .order_by('pk')
+            .values_list('pk', flat=True)[:chunk_size]
+        )
+        if not ids:
+            break
+        last_pk = ids[-1]
+        checked += len(ids)
+
+        drift = Q()
+        for field in counts():
+            drift |= ~Q(**{field: F(f'actual_{field}')})
+        drifted = list(
+            model.objects.filter(pk__in=ids)
+            .annotate(**{
+                f'actual_{field}': count
+                for field, count in counts().items()
+            })
+            .filter(drift)
+            .values_list('pk', flat=True)
+        )
+        if drifted:
+            # Recount inside the UPDATE itself so rows written since the
+            # check above are not lost.
+            fixed += model.objects.filter(pk__in=drifted).update(**counts())
+
+    return checked, fixed
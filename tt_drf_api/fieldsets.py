@@ -0,0 +1,85 @@
+from rest_framework.exceptions import ValidationError
+
+"""
+Sparse fieldsets.
+
+Clients pass `?fields=a,b` to get only the named fields of each object,
+or `?omit=a,b` to drop fields, from a view that uses
+SparseFieldsetViewMixin. The view hands the selected field names both to
+its serializer, which drops the other fields, and to the serializer's
+`setup_eager_loading`, which can then leave out the columns, joins and
+prefetches only those fields need.
+
+Classes:
+    - SparseFieldsMixin: Serializer mixin taking a `fields` argument.
+    - SparseFieldsetViewMixin: View mixin parsing `fields` and `omit`.
+"""
+
+
+class SparseFieldsMixin:
+    """
+    Serializer mixin that keeps only the fields named in the optional
+    `fields` argument.
+    """
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class SparseFieldsetViewMixin:
+    """
+    View mixin selecting the serializer fields of GET responses from the
+    `fields` and `omit` query parameters. `fields=*` selects every field.
+
+    Views can set `summary_fields` for the fields used when no `fields`
+    parameter is given, e.g. a compact representation for list screens.
+    """
+    summary_fields = None
+
+    def get_fieldset(self):
+        """
+        Return the selected field names, or None for all fields. Raises a
+        ValidationError for unknown names.
+        """
+        if self.request.method != 'GET':
+            return None
+        if hasattr(self, '_fieldset'):
+            return self._fieldset
+
+        available = self.get_serializer_class().Meta.fields
+        params = self.request.query_params
+        fields = self.parse_names(params.get('fields'))
+        omit = self.parse_names(params.get('omit'))
+
+        if fields == ['*']:
+            fields = None
+        elif fields is None and self.summary_fields is not None:
+            fields = list(self.summary_fields)
+
+        unknown = set(fields or []) | set(omit or [])
+        unknown -= set(available)
+        if unknown:
+            raise ValidationError({
+                'fields': f'Unknown fields: {", ".join(sorted(unknown))}.'
+            })
+
+        if omit:
+            fields = [
+                name for name in (fields or available) if name not in omit
+            ]
+        self._fieldset = fields
+        return fields
+
+    @staticmethod
+    def parse_names(value):
+        names = [name.strip() for name in (value or '').split(',')]
+        return [name for name in names if name] or None
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.get_fieldset()
+        if fields is not None:
+            kwargs.setdefault('fields', fields)
+        return super().get_serializer(*args, **kwargs)
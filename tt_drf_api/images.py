@@ -0,0 +1,254 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from io import BytesIO
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.signals import setting_changed
+from django.db import connections, transaction
+from django.db.models.signals import post_save, post_delete
+from django.utils import timezone
+from PIL import Image, ImageOps, features
+from rest_framework import serializers
+from .cache import bump_versions
+
+"""
+Resized variants of uploaded images.
+
+List screens show recipe and profile images in small slots, so serving the
+original upload wastes bandwidth. After an image is uploaded, a worker
+thread writes a fixed set of variants next to it through the same storage
+and records their names in the model's 'image_variants' field:
+
+    - thumb: 150x150, cropped to fill.
+    - card: 600x400, cropped to fill.
+    - full: fits within 1600x1600.
+
+Variants are WebP when Pillow supports it and JPEG otherwise. The record
+keeps the name of the image they were made from ('source'); variants of an
+image that has since been replaced are not served, and a job whose image
+was replaced while it ran does not store its result.
+
+Set IMAGE_VARIANTS_SYNC to generate variants inline, e.g. in tests.
+
+Building a storage URL is string work, and signing for Cloudinary, that
+list pages repeat for every row showing the same profile image. URLs are
+kept in a bounded per-process map keyed by storage class and file name.
+Replacing an image gives it a new name; saving or deleting an object also
+forgets the URLs of its current image and variants, in case a storage
+reuses names.
+
+Functions:
+    - generate_variants_on_save: Connects the pipeline to a model.
+    - generate_variants: Writes and records the variants of one object.
+    - variant_urls: The URLs of an object's current variants.
+    - file_url / storage_url: Cached storage URLs.
+    - forget_urls_on_change: Drops a model's cached URLs on save and
+      delete.
+
+Classes:
+    - ImageURLField: Read-only serializer field for a cached image URL.
+"""
+
+logger = logging.getLogger(__name__)
+
+VARIANTS = {
+    'thumb': ((150, 150), True),
+    'card': ((600, 400), True),
+    'full': ((1600, 1600), False),
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+_urls = OrderedDict()
+_urls_lock = threading.Lock()
+
+
+def storage_url(storage, name):
+    """
+    Return storage.url(name), from the cache when possible.
+    """
+    key = (storage.__class__, name)
+    with _urls_lock:
+        url = _urls.get(key)
+        if url is not None:
+            _urls.move_to_end(key)
+            return url
+    url = storage.url(name)
+    with _urls_lock:
+        _urls[key] = url
+        while len(_urls) > settings.IMAGE_URL_CACHE_SIZE:
+            _urls.popitem(last=False)
+    return url
+
+
+def file_url(file):
+    """
+    Cached equivalent of 'file.url' for a FieldFile.
+    """
+    return storage_url(file.storage, file.name)
+
+
+def forget_urls(*names):
+    with _urls_lock:
+        for key in [key for key in _urls if key[1] in names]:
+            del _urls[key]
+
+
+def clear_urls():
+    with _urls_lock:
+        _urls.clear()
+
+
+def forget_urls_on_change(model):
+    """
+    Forget the cached URLs of an object's image and variants whenever it
+    is saved or deleted.
+    """
+    def handler(sender, instance, **kwargs):
+        forget_urls(instance.image.name, *instance.image_variants.values())
+
+    uid = f'image-urls:{model._meta.label}'
+    post_save.connect(handler, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(handler, sender=model, weak=False, dispatch_uid=uid)
+
+
+class ImageURLField(serializers.ReadOnlyField):
+    """
+    Read-only field serializing an image, e.g. 'owner.profile.image', as
+    its cached URL.
+    """
+
+    def to_representation(self, value):
+        return file_url(value) if value else None
+
+
+def storage_setting_changed(setting, **kwargs):
+    if setting in ('DEFAULT_FILE_STORAGE', 'STORAGES', 'MEDIA_URL'):
+        clear_urls()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_VARIANT_WORKERS,
+                thread_name_prefix='image-variants',
+            )
+        return _executor
+
+
+def variant_format():
+    return ('WEBP', 'webp') if features.check('webp') else ('JPEG', 'jpg')
+
+
+def needs_variants(instance):
+    """
+    True if the object has an uploaded image without current variants.
+    Default images are shared and not resized.
+    """
+    image = instance.image
+    if not image or image.name == image.field.default:
+        return False
+    return instance.image_variants.get('source') != image.name
+
+
+def render_variant(original, size, crop):
+    if crop:
+        image = ImageOps.fit(original, size, Image.LANCZOS)
+    else:
+        image = original.copy()
+        image.thumbnail(size, Image.LANCZOS)
+    image_format, _ = variant_format()
+    buffer = BytesIO()
+    image.save(
+        buffer, image_format, quality=settings.IMAGE_VARIANT_QUALITY,
+        optimize=True,
+    )
+    return buffer.getvalue()
+
+
+def generate_variants(model, pk, namespaces=()):
+    """
+    Write the variants of the image of 'model' 'pk' and record them,
+    unless the image has been replaced in the meantime.
+    """
+    instance = model.objects.filter(pk=pk).only('pk', 'image').first()
+    if instance is None or not instance.image:
+        return
+    source = instance.image.name
+    storage = instance.image.storage
+
+    with storage.open(source) as file:
+        original = ImageOps.exif_transpose(Image.open(file)).convert('RGB')
+    stem = os.path.splitext(os.path.basename(source))[0]
+    _, extension = variant_format()
+
+    variants = {'source': source}
+    for name, (size, crop) in VARIANTS.items():
+        variants[name] = storage.save(
+            f'variants/{stem}_{name}.{extension}',
+            ContentFile(render_variant(original, size, crop)),
+        )
+
+    updated = model.objects.filter(pk=pk, image=source).update(
+        image_variants=variants, updated_at=timezone.now(),
+    )
+    if updated and namespaces:
+        bump_versions(*namespaces)
+
+
+def run_job(model, pk, namespaces):
+    try:
+        generate_variants(model, pk, namespaces)
+    except Exception:
+        logger.exception(
+            'Image variants of %s %s failed', model._meta.label, pk)
+    finally:
+        # Worker threads open their own database connections.
+        if not settings.IMAGE_VARIANTS_SYNC:
+            connections.close_all()
+
+
+def schedule_variants(model, pk, namespaces):
+    job = partial(run_job, model, pk, namespaces)
+    if settings.IMAGE_VARIANTS_SYNC:
+        job()
+    else:
+        get_executor().submit(job)
+
+
+def generate_variants_on_save(model, *namespaces):
+    """
+    Schedule variants whenever 'model' is saved with a new image, once the
+    transaction commits. 'namespaces' are the response cache namespaces
+    that include the variants.
+    """
+    def handler(sender, instance, **kwargs):
+        if needs_variants(instance):
+            transaction.on_commit(
+                partial(schedule_variants, sender, instance.pk, namespaces)
+            )
+
+    uid = f'image-variants:{model._meta.label}'
+    post_save.connect(handler, sender=model, weak=False, dispatch_uid=uid)
+
+
+def variant_urls(instance):
+    """
+    Return {variant: url} for the current image of 'instance', or None
+    while there are no variants of it.
+    """
+    variants = instance.image_variants
+    if not variants or variants.get('source') != instance.image.name:
+        return None
+    storage = instance.image.storage
+    return {name: storage_url(storage, variants[name]) for name in VARIANTS}
+
+
+setting_changed.connect(storage_setting_changed)
@@ -0,0 +1,169 @@
+import base64
+import binascii
+import json
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+"""
+Keyset (cursor) pagination.
+
+Page-number pagination runs a COUNT(*) for every page and an OFFSET that
+gets slower the deeper a client scrolls. Infinite-scroll clients only
+ever ask for the next page, so KeysetPagination lets them pass `?cursor=`
+instead: the page is then read with a `WHERE (key, id) < (value, id)`
+range on an index, and no count is run.
+
+A cursor encodes the ordering it was created for and the (value, id) of
+the last row on the page, so it stays stable when the list is ordered by
+a counter such as 'likes_count' where many rows share a value.
+
+Functions:
+    - encode_cursor / decode_cursor: Build and parse cursor tokens.
+    - decode_position: Parse a token issued for a known ordering.
+    - keyset_filter: Q object selecting the rows after a position.
+
+Classes:
+    - KeysetPagination: Page-number pagination with an opt-in cursor mode.
+"""
+
+
+def encode_cursor(ordering, position):
+    """
+    Encode an ordering such as '-created_at' and the position (value, id)
+    of the last row seen as an opaque token.
+    """
+    payload = json.dumps({'o': ordering, 'p': position}, default=str)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """
+    Return the (ordering, position) stored in a token, or raise a DRF
+    ValidationError if the token is malformed.
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        ordering, position = payload['o'], payload['p']
+        if not isinstance(ordering, str) or len(position) != 2:
+            raise ValueError
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise ValidationError({'cursor': 'Invalid cursor.'})
+    return ordering, position
+
+
+def decode_position(token, ordering, field):
+    """
+    Return the (value, id) position stored in a token, with the value
+    converted by the model field it was read from and the id by int().
+    Raises a DRF ValidationError if the token was issued for another
+    ordering or either part is invalid.
+    """
+    token_ordering, (value, pk) = decode_cursor(token)
+    if token_ordering != ordering:
+        raise ValidationError({
+            'cursor': 'Cursor does not match the requested ordering.'
+        })
+    try:
+        if value is None or isinstance(pk, bool):
+            raise ValueError
+        value = field.to_python(value)
+        if value is None:
+            raise ValueError
+        return value, int(pk)
+    except (DjangoValidationError, TypeError, ValueError):
+        raise ValidationError({'cursor': 'Invalid cursor.'})
+
+
+def keyset_filter(field, descending, value, pk, pk_field='id'):
+    """
+    Q object for the rows after (value, pk) in the given direction, with
+    'pk_field' breaking ties between rows that share a value.
+    """
+    op = 'lt' if descending else 'gt'
+    return (
+        Q(**{f'{field}__{op}': value}) |
+        Q(**{field: value, f'{pk_field}__{op}': pk})
+    )
+
+
+class KeysetPagination(PageNumberPagination):
+    """
+    Page-number pagination, plus a keyset mode used when the request has a
+    `cursor` parameter (empty for the first page).
+
+    Views list the fields that can be used as keys in `keyset_fields`,
+    each of which should be indexed together with 'id'. The ordering
+    applied by the view (or the model's default ordering) picks the key.
+    """
+    cursor_query_param = 'cursor'
+    default_keyset_fields = ('created_at',)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = self.cursor_query_param in request.query_params
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_keyset_ordering(queryset, view)
+        field = self.ordering.lstrip('-')
+        descending = self.ordering.startswith('-')
+        id_ordering = '-id' if descending else 'id'
+        queryset = queryset.order_by(self.ordering, id_ordering)
+
+        token = request.query_params[self.cursor_query_param]
+        if token:
+            value, pk = decode_position(
+                token, self.ordering, queryset.model._meta.get_field(field)
+            )
+            queryset = queryset.filter(
+                keyset_filter(field, descending, value, pk)
+            )
+
+        rows = list(queryset[:self.page_size + 1])
+        page = rows[:self.page_size]
+        self.next_position = None
+        if len(rows) > self.page_size:
+            last = page[-1]
+            self.next_position = (getattr(last, field), last.pk)
+        return page
+
+    def get_keyset_ordering(self, queryset, view):
+        """
+        Return the first ordering term of the queryset if it can be used
+        as a key, e.g. '-created_at' or 'likes_count'.
+        """
+        allowed = getattr(view, 'keyset_fields', self.default_keyset_fields)
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        first = ordering[0] if ordering else '-created_at'
+        if not isinstance(first, str) or first.lstrip('-') not in allowed:
+            raise ValidationError({
+                'cursor': (
+                    'Cursor pagination supports ordering by: '
+                    f'{", ".join(allowed)}.'
+                )
+            })
+        return first
+
+    def get_next_cursor_link(self):
+        if self.next_position is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            encode_cursor(self.ordering, self.next_position),
+        )
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_next_cursor_link(),
+            'previous': None,
+            'results': data,
+        })
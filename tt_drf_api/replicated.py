@@ -0,0 +1,200 @@
+import threading
+import time
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+"""
+In-process indexes kept current through a shared log.
+
+An index held in each process's memory answers lookups without queries,
+but has to see the changes other processes make. Every change appends
+the id of what changed, e.g. a user, to a log in a shared cache; before
+reading, a process re-reads the ids logged since it last looked, one
+query for all of them. Replaying an entry only re-reads rows, so
+applying one twice is harmless. A process that finds entries missing
+from the log, because they expired or the cache was cleared, or that is
+too far behind, rebuilds the index.
+
+The log only works in a cache every process shares, e.g. Redis. While
+<prefix>_CACHE is None, which settings.py leaves it at without REDIS_URL,
+the index is not used and subclasses answer from the database instead.
+`manage.py check --deploy` reports an index logging to a per-process
+cache such as LocMemCache, where other workers would never see a change.
+
+A subclass sets `log_name` and `settings_prefix`, which names the
+<prefix>_CACHE, <prefix>_LOG_TIMEOUT and <prefix>_MAX_REPLAY settings,
+and implements `build` and `reload`.
+
+Functions:
+    - check_shared_caches: Deploy check of the indexes' cache aliases.
+
+Classes:
+    - ReplicatedIndex: Base class of the indexes.
+"""
+
+PROCESS_LOCAL_CACHES = (LocMemCache, DummyCache)
+
+# How long a missing log entry is waited for, since it is written just
+# after its sequence number is taken.
+GAP_GRACE = 1.0
+
+
+class ReplicatedIndex:
+    """
+    Base class of a thread-safe index replicated through a log of
+    changed ids. 'sequence' is the last log entry applied, or None before
+    the index is built.
+    """
+    log_name = None
+    settings_prefix = None
+    prefixes = []
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        ReplicatedIndex.prefixes.append(cls.settings_prefix)
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.build_lock = threading.Lock()
+        self.sequence = None
+        self.gap_since = None
+
+    def setting(self, name):
+        return getattr(settings, f'{self.settings_prefix}_{name}')
+
+    @property
+    def enabled(self):
+        """
+        Whether the index is used, i.e. a shared cache is configured.
+        """
+        return self.setting('CACHE') is not None
+
+    @property
+    def shared(self):
+        return caches[self.setting('CACHE')]
+
+    @property
+    def sequence_key(self):
+        return f'{self.log_name}:sequence'
+
+    def entry_key(self, number):
+        return f'{self.log_name}:entry:{number}'
+
+    def current_sequence(self):
+        return self.shared.get(self.sequence_key, 0)
+
+    def build(self):
+        """
+        Load the whole index. Implementations read `current_sequence()`
+        before loading and pass it to `built`.
+        """
+        raise NotImplementedError
+
+    def built(self, sequence):
+        self.sequence = sequence
+        self.gap_since = None
+
+    def reload(self, ids):
+        """
+        Re-read the rows of the logged 'ids' into the index.
+        """
+        raise NotImplementedError
+
+    def sync(self):
+        """
+        Bring the index up to date with the shared log.
+        """
+        if not self.enabled:
+            return
+        current = self.current_sequence()
+        with self.lock:
+            rebuild = self.replay(current)
+        if not rebuild:
+            return
+        # Loading the whole index doesn't hold the lock, so lookups go on
+        # meanwhile; the log position is read before loading, so changes
+        # made in the meantime are replayed by the next sync. One thread
+        # rebuilds, and the others check again once it is done.
+        with self.build_lock:
+            current = self.current_sequence()
+            with self.lock:
+                rebuild = self.replay(current)
+            if rebuild:
+                self.build()
+
+    def replay(self, current):
+        """
+        Apply the log entries up to 'current'. Returns True if the index
+        has to be rebuilt instead.
+        """
+        if self.sequence is None or current < self.sequence:
+            return True
+        if current - self.sequence > self.setting('MAX_REPLAY'):
+            return True
+        if current == self.sequence:
+            return False
+
+        numbers = range(self.sequence + 1, current + 1)
+        entries = self.shared.get_many([self.entry_key(n) for n in numbers])
+        ids = set()
+        applied = self.sequence
+        for number in numbers:
+            pk = entries.get(self.entry_key(number))
+            if pk is None:
+                break
+            ids.add(pk)
+            applied = number
+
+        if applied < current:
+            now = time.monotonic()
+            if self.gap_since is None:
+                self.gap_since = now
+            elif now - self.gap_since > GAP_GRACE:
+                return True
+        else:
+            self.gap_since = None
+        if ids:
+            self.reload(ids)
+        self.sequence = applied
+        return False
+
+    def publish(self, *ids):
+        """
+        Log that the rows of 'ids' changed, and apply it here if the index
+        is loaded.
+        """
+        if not self.enabled:
+            return
+        shared = self.shared
+        shared.add(self.sequence_key, 0, None)
+        timeout = self.setting('LOG_TIMEOUT')
+        for pk in ids:
+            number = shared.incr(self.sequence_key)
+            shared.set(self.entry_key(number), pk, timeout)
+        if self.sequence is not None:
+            self.sync()
+
+    def clear(self):
+        with self.lock:
+            self.sequence = None
+            self.gap_since = None
+
+
+@checks.register(checks.Tags.caches, deploy=True)
+def check_shared_caches(app_configs, **kwargs):
+    errors = []
+    for prefix in ReplicatedIndex.prefixes:
+        alias = getattr(settings, f'{prefix}_CACHE')
+        if alias is None:
+            continue
+        if isinstance(caches[alias], PROCESS_LOCAL_CACHES):
+            errors.append(checks.Error(
+                f'{prefix}_CACHE is {alias!r}, a cache of each process, so '
+                'other processes never see the changes it logs.',
+                hint='Set REDIS_URL, or point it at a shared cache.',
+                id='tt_drf_api.E001',
+            ))
+    return errors
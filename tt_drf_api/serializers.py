@@ -1,10 +1,11 @@
 from dj_rest_auth.serializers import UserDetailsSerializer
 from rest_framework import serializers
+from .images import ImageURLField
 
 
 class CurrentUserSerializer(UserDetailsSerializer):
     profile_id = serializers.ReadOnlyField(source='profile.id')
-    profile_image = serializers.ReadOnlyField(source='profile.image.url')
+    profile_image = ImageURLField(source='profile.image')
 
     class Meta(UserDetailsSerializer.Meta):
         fields = UserDetailsSerializer.Meta.fields + (
@@ -18,14 +18,20 @@ import dj_database_url
 if os.path.exists('env.py'):
     import env
 
+# Build paths inside the project like this: BASE_DIR / 'subdir'.
+BASE_DIR = Path(__file__).resolve().parent.parent
+
 CLOUDINARY_STORAGE = {
     'CLOUDINARY_URL' : os.environ.get('CLOUDINARY_URL')
 }
 MEDIA_URL = '/media/'
-DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
-
-# Build paths inside the project like this: BASE_DIR / 'subdir'.
-BASE_DIR = Path(__file__).resolve().parent.parent
+# MEDIA_STORAGE=local keeps uploads in MEDIA_ROOT instead of Cloudinary,
+# e.g. to run the image pipeline offline.
+if os.environ.get('MEDIA_STORAGE') == 'local':
+    DEFAULT_FILE_STORAGE = 'django.core.files.storage.FileSystemStorage'
+else:
+    DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
+MEDIA_ROOT = os.environ.get('MEDIA_ROOT', BASE_DIR / 'media')
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [(
@@ -37,6 +43,13 @@ REST_FRAMEWORK = {
         'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
     'DATETIME_FORMAT': '%d %b %Y',
+    # Reports oversized image uploads on their field, see
+    # tt_drf_api.uploads.
+    'DEFAULT_PARSER_CLASSES': [
+        'rest_framework.parsers.JSONParser',
+        'rest_framework.parsers.FormParser',
+        'tt_drf_api.uploads.ImageUploadParser',
+    ],
 }
 if 'DEV' not in os.environ:
     REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] = [
@@ -87,6 +100,7 @@ INSTALLED_APPS = [
     'comments',
     'likes',
     'followers',
+    'feeds',
 ]
 
 SITE_ID = 1
@@ -134,6 +148,101 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'tt_drf_api.wsgi.application'
 
+# Home feed: authors with more followers than this are merged into feeds
+# at read time instead of being fanned out to every follower.
+FEED_FANOUT_MAX_FOLLOWERS = 10000
+# Number of recent recipes copied into a feed when following someone.
+FEED_BACKFILL_LIMIT = 50
+
+# Follow graph index: the cache alias holding the log of follow changes
+# shared by all processes, how long log entries are kept, and how many
+# entries a process replays before it reloads the graph instead. The log
+# needs a cache every process shares; without REDIS_URL the graph is not
+# used and follows are queried instead.
+FOLLOW_GRAPH_CACHE = 'default' if 'REDIS_URL' in os.environ else None
+FOLLOW_GRAPH_LOG_TIMEOUT = 60 * 60
+FOLLOW_GRAPH_MAX_REPLAY = 10000
+# Load the follow graph when a worker starts rather than on first use,
+# and the most user ids a follow filter passes to the database as a list.
+FOLLOW_GRAPH_WARM_UP = 'FOLLOW_GRAPH_WARM_UP' in os.environ
+FOLLOW_GRAPH_FILTER_MAX_IDS = 1000
+
+# Who to follow: suggestions returned, seconds they are cached per user,
+# and follows read at most to compute them.
+FOLLOW_SUGGESTIONS_LIMIT = 20
+FOLLOW_SUGGESTIONS_TTL = 5 * 60
+FOLLOW_SUGGESTIONS_MAX_EDGES = 50000
+
+# Profile autocomplete: the prefix index's shared log, as for the follow
+# graph, loading it when a worker starts, the number of profiles returned,
+# and how many names a prefix must match for its result to be kept until
+# one of them changes. Without REDIS_URL the index is not used and
+# profiles are matched with a query instead.
+PROFILE_INDEX_CACHE = 'default' if 'REDIS_URL' in os.environ else None
+PROFILE_INDEX_LOG_TIMEOUT = 60 * 60
+PROFILE_INDEX_MAX_REPLAY = 10000
+PROFILE_INDEX_WARM_UP = 'PROFILE_INDEX_WARM_UP' in os.environ
+PROFILE_AUTOCOMPLETE_LIMIT = 10
+PROFILE_AUTOCOMPLETE_MEMO_MATCHES = 1000
+
+# Ingredient and measurement name lookups: entries kept per process, an
+# optional cache alias shared between processes, and whether wsgi.py and
+# asgi.py preload the names at startup.
+VOCABULARY_CACHE_SIZE = 5000
+VOCABULARY_CACHE = os.environ.get('VOCABULARY_CACHE')
+VOCABULARY_CACHE_TIMEOUT = 60 * 60 * 24
+VOCABULARY_WARM_UP = 'VOCABULARY_WARM_UP' in os.environ
+
+# Caches. Without REDIS_URL the default cache is an in-memory cache of
+# each process, so the response cache versions and anything else kept in
+# it are not shared between workers.
+if 'REDIS_URL' in os.environ:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+
+# Seconds anonymous recipe and profile list responses are cached for, 0 to
+# disable, and the cache alias they are stored in.
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 60))
+RESPONSE_CACHE_ALIAS = 'default'
+
+# Serve GET requests of the recipe, profile and comment views from async
+# handlers. asgi.py turns this on.
+ASYNC_READ_VIEWS = os.environ.get('ASYNC_READ_VIEWS') == '1'
+
+# Trending recipes: hours for a like or comment to lose half its weight,
+# hours of activity read on the first run, event weights, and the score
+# below which a recipe drops out.
+TRENDING_HALF_LIFE = 24
+TRENDING_WINDOW = 24 * 7
+TRENDING_WEIGHTS = {'like': 1.0, 'comment': 2.0}
+TRENDING_MIN_SCORE = 0.01
+
+# Days a recipe stays in 'pending_delete' before purge_deleted_recipes
+# deletes it for good.
+RECIPE_PURGE_GRACE_DAYS = 30
+
+# Image uploads: the upload handler stops reading a request once a file
+# passes IMAGE_UPLOAD_MAX_SIZE bytes.
+IMAGE_UPLOAD_MAX_SIZE = 2 * 1024 * 1024
+IMAGE_UPLOAD_MAX_DIMENSION = 4096
+FILE_UPLOAD_HANDLERS = [
+    'tt_drf_api.uploads.ImageSizeLimitUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+# Resized image variants: worker threads per process, encoder quality, and
+# whether to generate them inline instead of in the background.
+IMAGE_VARIANT_WORKERS = int(os.environ.get('IMAGE_VARIANT_WORKERS', 2))
+IMAGE_VARIANT_QUALITY = 82
+IMAGE_VARIANTS_SYNC = 'IMAGE_VARIANTS_SYNC' in os.environ
+# Storage URLs of images kept per process.
+IMAGE_URL_CACHE_SIZE = 10000
+
 
 # Database
 
@@ -0,0 +1,163 @@
+from django.conf import settings
+from django.core.exceptions import RequestDataTooBig
+from django.core.files.uploadhandler import FileUploadHandler
+from django.db import models
+from PIL import Image
+from rest_framework import parsers, serializers
+from rest_framework.settings import api_settings
+from .images import file_url
+
+"""
+Early rejection of image uploads.
+
+Django reads a whole multipart body before a serializer sees the files in
+it, and ImageField then has Pillow read through every uploaded image. An
+oversized upload would therefore tie up a worker and its memory until the
+end, only to be rejected by the serializer.
+
+ImageSizeLimitUploadHandler runs first in FILE_UPLOAD_HANDLERS and stops
+reading a request as soon as a file passes IMAGE_UPLOAD_MAX_SIZE, or
+before reading anything when Content-Length already shows the body cannot
+be valid. ImageUploadField checks the dimensions from the image header
+before Pillow verifies the rest of the file.
+
+The handler is installed for every view, so it raises ImageUploadTooLarge,
+a RequestDataTooBig that Django answers with 400 Bad Request wherever the
+body is read, e.g. by the admin or the CSRF middleware. ImageUploadParser,
+the API's multipart parser, reports it as a validation error on the file's
+field instead.
+
+Functions:
+    - check_image_upload: Size and header dimension checks.
+
+Classes:
+    - ImageUploadTooLarge: Raised when an upload passes the size limit.
+    - ImageSizeLimitUploadHandler: Aborts uploads past the size limit.
+    - ImageUploadParser: MultiPartParser turning ImageUploadTooLarge into
+      a ValidationError.
+    - ImageUploadField: ImageField running the checks before decoding,
+      serialized as a cached URL.
+    - ImageUploadSerializerMixin: Uses ImageUploadField for model image
+      fields.
+"""
+
+
+def size_error():
+    return f'Image size exceeds {settings.IMAGE_UPLOAD_MAX_SIZE // 2**20}MB.'
+
+
+class ImageUploadTooLarge(RequestDataTooBig):
+    """
+    An uploaded file, 'field_name', or the whole request body when it is
+    None, is larger than an image upload can be.
+    """
+
+    def __init__(self, field_name=None):
+        super().__init__(size_error())
+        self.field_name = field_name
+
+
+class ImageSizeLimitUploadHandler(FileUploadHandler):
+    """
+    Upload handler that passes chunks on to the next handler and raises
+    ImageUploadTooLarge once a file is larger than IMAGE_UPLOAD_MAX_SIZE.
+    """
+
+    def handle_raw_input(
+            self, input_data, META, content_length, boundary, encoding=None):
+        # The largest valid body is one image plus the form fields Django
+        # accepts next to it.
+        fields_limit = settings.DATA_UPLOAD_MAX_MEMORY_SIZE
+        if fields_limit is None:
+            return None
+        if content_length > settings.IMAGE_UPLOAD_MAX_SIZE + fields_limit:
+            raise ImageUploadTooLarge()
+        return None
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.IMAGE_UPLOAD_MAX_SIZE:
+            raise ImageUploadTooLarge(self.field_name)
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+
+class ImageUploadParser(parsers.MultiPartParser):
+    """
+    MultiPartParser reporting uploads stopped by
+    ImageSizeLimitUploadHandler as a 400 response naming the field.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return super().parse(stream, media_type, parser_context)
+        except ImageUploadTooLarge as exc:
+            key = exc.field_name or api_settings.NON_FIELD_ERRORS_KEY
+            raise serializers.ValidationError({key: [str(exc)]})
+
+
+def check_image_upload(file):
+    """
+    Raise a ValidationError if 'file' is too large or its header gives
+    dimensions above IMAGE_UPLOAD_MAX_DIMENSION. Files Pillow cannot
+    identify are left for ImageField to reject.
+    """
+    if file.size > settings.IMAGE_UPLOAD_MAX_SIZE:
+        raise serializers.ValidationError(size_error())
+    try:
+        # Image.open only parses the header; pixels are read on load().
+        width, height = Image.open(file).size
+    except Exception:
+        return
+    finally:
+        file.seek(0)
+
+    limit = settings.IMAGE_UPLOAD_MAX_DIMENSION
+    if width > limit:
+        raise serializers.ValidationError(
+            f'Image width is larger than {limit}px.'
+        )
+    if height > limit:
+        raise serializers.ValidationError(
+            f'Image height is larger than {limit}px.'
+        )
+
+
+class ImageUploadField(serializers.ImageField):
+    """
+    ImageField that checks the size and header dimensions of an upload
+    before ImageField reads the image through, and takes the URL of the
+    stored image from the URL cache.
+    """
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        if not getattr(self, 'use_url', api_settings.UPLOADED_FILES_USE_URL):
+            return value.name
+        url = file_url(value)
+        request = self.context.get('request', None)
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+    def to_internal_value(self, data):
+        if hasattr(data, 'size') and hasattr(data, 'seek'):
+            check_image_upload(data)
+        return super().to_internal_value(data)
+
+
+class ImageUploadSerializerMixin:
+    """
+    ModelSerializer mixin that maps model ImageFields to ImageUploadField.
+    """
+    serializer_field_mapping = {
+        **serializers.ModelSerializer.serializer_field_mapping,
+        models.ImageField: ImageUploadField,
+    }
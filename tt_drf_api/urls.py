@@ -14,6 +14,8 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
+from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
 from .views import root_route, logout_route
@@ -33,4 +35,7 @@ urlpatterns = [
     path('', include('comments.urls')),
     path('', include('likes.urls')),
     path('', include('followers.urls')),
+    path('', include('feeds.urls')),
 ]
+# Serves MEDIA_STORAGE=local uploads in development.
+urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -0,0 +1,185 @@
+import asyncio
+from contextlib import contextmanager
+from django.db import models
+from rest_framework import serializers
+
+"""
+Per-request viewer context.
+
+Serializers such as RecipeSerializer and ProfileSerializer expose fields
+that depend on the requesting user ('like_id', 'following_id',
+'is_owner'). Resolving these one row at a time costs a query per row, so
+the ViewerContext collects the ids of every object on the page and runs a
+single `IN (...)` query per relation. The context is stored on the request,
+so nested serializers and the list serializer share the same lookups.
+Async views resolve the relations with the async ORM, see `aprime_viewer`.
+
+Classes:
+    - ViewerContext: Caches the requesting user's relations to a set of
+      objects, keyed by relation.
+    - ViewerListSerializer: List serializer that lets its child prime the
+      viewer context with the whole page before rendering rows.
+    - ViewerSerializerMixin: Adds the `viewer` property and `prime_viewer`
+      hook to a serializer.
+"""
+
+
+class ViewerContext:
+    """
+    Holds the requesting user and the relations resolved for this request.
+
+    A relation is identified by a model and the field pointing at the
+    target object, e.g. (Like, 'recipe'), and the field pointing at the
+    viewer, 'owner' unless given, e.g. (Follower, 'owner', 'followed') for
+    the users following the viewer. Every resolved relation maps the
+    target id to the id of the viewer's row, or None when there is none.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self._relations = {}
+        self._collecting = None
+        self._done = set()
+
+    @property
+    def user_id(self):
+        return self.user.id if self.user.is_authenticated else None
+
+    def once(self, key, func):
+        """
+        Call 'func' the first time 'key' is passed during the request,
+        e.g. to sync a shared index before the first lookup.
+        """
+        if key not in self._done:
+            self._done.add(key)
+            func()
+
+    def is_owner(self, owner_id):
+        """
+        Compare against the owner's id so the owner row is never loaded.
+        """
+        return self.user_id is not None and owner_id == self.user_id
+
+    def _missing(self, model, field, target_ids, viewer_field):
+        resolved = self._relations.setdefault(
+            (model, field, viewer_field), {}
+        )
+        missing = {pk for pk in target_ids if pk not in resolved}
+        if missing and self.user_id is None:
+            resolved.update(dict.fromkeys(missing))
+            return resolved, set()
+        return resolved, missing
+
+    def _rows(self, model, field, missing, viewer_field):
+        return model.objects.filter(
+            **{viewer_field: self.user_id, f'{field}__in': missing}
+        ).order_by().values_list(field, 'id')
+
+    def resolve(self, model, field, target_ids, viewer_field='owner'):
+        """
+        Look up the viewer's rows of 'model' for all of 'target_ids' that
+        have not been resolved yet, using one query.
+        """
+        if self._collecting is not None:
+            self._collecting.append(
+                (model, field, list(target_ids), viewer_field)
+            )
+            return
+        resolved, missing = self._missing(
+            model, field, target_ids, viewer_field
+        )
+        if not missing:
+            return
+        rows = self._rows(model, field, missing, viewer_field)
+        resolved.update(dict.fromkeys(missing))
+        resolved.update(rows)
+
+    async def aresolve(self, model, field, target_ids, viewer_field='owner'):
+        """
+        `resolve` with the async ORM.
+        """
+        resolved, missing = self._missing(
+            model, field, target_ids, viewer_field
+        )
+        if not missing:
+            return
+        rows = [
+            row async for row in
+            self._rows(model, field, missing, viewer_field)
+        ]
+        resolved.update(dict.fromkeys(missing))
+        resolved.update(rows)
+
+    @contextmanager
+    def collect(self):
+        """
+        Record the arguments of `resolve` calls in the yielded list
+        instead of running them.
+        """
+        self._collecting = []
+        try:
+            yield self._collecting
+        finally:
+            self._collecting = None
+
+    def lookup(self, model, field, target_id, viewer_field='owner'):
+        """
+        Return the id of the viewer's row pointing at 'target_id'.
+        Falls back to resolving the single id, e.g. for detail views.
+        """
+        self.resolve(model, field, [target_id], viewer_field)
+        return self._relations[(model, field, viewer_field)][target_id]
+
+
+def get_viewer(context):
+    """
+    Return the ViewerContext for the request in a serializer context,
+    creating it on first use.
+    """
+    request = context['request']
+    viewer = getattr(request, '_viewer_context', None)
+    if viewer is None:
+        viewer = ViewerContext(request.user)
+        request._viewer_context = viewer
+    return viewer
+
+
+class ViewerListSerializer(serializers.ListSerializer):
+    """
+    List serializer that primes the viewer context for the whole page.
+    """
+
+    def to_representation(self, data):
+        if isinstance(data, models.manager.BaseManager):
+            data = data.all()
+        instances = list(data)
+        self.child.prime_viewer(instances)
+        return super().to_representation(instances)
+
+
+class ViewerSerializerMixin:
+    """
+    Mixin for serializers with viewer-dependent fields.
+
+    Subclasses override `prime_viewer` to resolve their relations for a
+    list of instances, read the results through `self.viewer`, and set
+    `list_serializer_class = ViewerListSerializer` on their Meta.
+    """
+
+    @property
+    def viewer(self):
+        return get_viewer(self.context)
+
+    def prime_viewer(self, instances):
+        pass
+
+    async def aprime_viewer(self, instances):
+        """
+        Async `prime_viewer`: the relations it resolves are queried with
+        the async ORM, all at once.
+        """
+        with self.viewer.collect() as relations:
+            self.prime_viewer(instances)
+        await asyncio.gather(
+            *(self.viewer.aresolve(*args) for args in relations)
+        )
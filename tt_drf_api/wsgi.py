@@ -9,8 +9,21 @@ https://docs.djangoproject.com/en/4.2/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tt_drf_api.settings')
 
 application = get_wsgi_application()
+
+if settings.VOCABULARY_WARM_UP:
+    from recipes.vocabulary import warm_up
+    warm_up()
+
+if settings.FOLLOW_GRAPH_WARM_UP:
+    from followers.graph import follow_graph
+    follow_graph.build()
+
+if settings.PROFILE_INDEX_WARM_UP:
+    from profiles.autocomplete import prefix_index
+    prefix_index.build()